@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Task, Note, WasteReport, Notification
+from .models import Task, Note, WasteReport, WasteReportMaterial, Notification, ClassificationCacheEntry, MediaBlob, WasteCategory, LegacyBuyerCategory
 
 @admin.register(Task)
 class TaskAdmin(admin.ModelAdmin):
@@ -15,13 +15,21 @@ class NoteAdmin(admin.ModelAdmin):
     search_fields = ['title', 'content']
     date_hierarchy = 'created_at'
 
+class WasteReportMaterialInline(admin.TabularInline):
+    model = WasteReportMaterial
+    extra = 0
+    readonly_fields = ['material', 'estimated_weight_kg', 'recyclable']
+    can_delete = False
+
 @admin.register(WasteReport)
 class WasteReportAdmin(admin.ModelAdmin):
-    list_display = ['user', 'waste_type', 'quantity_type', 'status', 'created_at', 'city']
-    list_filter = ['waste_type', 'status', 'waste_condition', 'created_at']
+    list_display = ['user', 'waste_type', 'quantity_type', 'status', 'classification_status', 'created_at', 'city']
+    list_filter = ['waste_type', 'status', 'waste_condition', 'classification_status', 'created_at']
     search_fields = ['user__username', 'waste_type', 'area', 'city', 'additional_notes']
     date_hierarchy = 'created_at'
-    readonly_fields = ['created_at', 'updated_at']
+    readonly_fields = ['created_at', 'updated_at', 'ai_classification', 'classification_error', 'classified_at',
+                       'estimated_weight_kg', 'recyclability_score']
+    inlines = [WasteReportMaterialInline]
     
     fieldsets = (
         ('User Information', {
@@ -33,6 +41,10 @@ class WasteReportAdmin(admin.ModelAdmin):
         ('Location', {
             'fields': ('location_auto', 'latitude', 'longitude', 'area', 'city', 'landmark')
         }),
+        ('AI Classification', {
+            'fields': ('classification_status', 'ai_classification', 'classification_error', 'classified_at',
+                       'estimated_weight_kg', 'recyclability_score')
+        }),
         ('Additional Information', {
             'fields': ('additional_notes', 'status', 'created_at', 'updated_at')
         }),
@@ -46,3 +58,30 @@ class NotificationAdmin(admin.ModelAdmin):
     search_fields = ['user__username', 'title', 'message']
     date_hierarchy = 'created_at'
     readonly_fields = ['created_at']
+
+
+@admin.register(ClassificationCacheEntry)
+class ClassificationCacheEntryAdmin(admin.ModelAdmin):
+    list_display = ['image_digest', 'hit_count', 'created_at', 'last_used_at']
+    search_fields = ['image_digest']
+    date_hierarchy = 'created_at'
+    readonly_fields = ['image_digest', 'result', 'hit_count', 'created_at', 'last_used_at']
+
+@admin.register(MediaBlob)
+class MediaBlobAdmin(admin.ModelAdmin):
+    list_display = ['name', 'size', 'ref_count', 'created_at']
+    search_fields = ['name', 'sha256']
+    date_hierarchy = 'created_at'
+    readonly_fields = ['name', 'sha256', 'size', 'ref_count', 'created_at']
+
+
+@admin.register(WasteCategory)
+class WasteCategoryAdmin(admin.ModelAdmin):
+    list_display = ['code', 'name']
+    search_fields = ['code', 'name']
+
+
+@admin.register(LegacyBuyerCategory)
+class LegacyBuyerCategoryAdmin(admin.ModelAdmin):
+    list_display = ['buyer', 'code']
+    search_fields = ['code', 'buyer__shop_name']
@@ -12,6 +12,8 @@ router.register(r'pickup-requests', api_views.PickupRequestViewSet, basename='pi
 router.register(r'ratings', api_views.BuyerRatingViewSet, basename='rating')
 router.register(r'pickup-history', api_views.PickupHistoryViewSet, basename='pickuphistory')
 router.register(r'notifications', api_views.NotificationViewSet, basename='notification')
+router.register(r'uploads', api_views.UploadSessionViewSet, basename='upload')
+router.register(r'saved-searches', api_views.SavedSearchViewSet, basename='savedsearch')
 
 # API URL patterns
 urlpatterns = [
@@ -1,29 +1,44 @@
-from rest_framework import viewsets, status, permissions, serializers
+from rest_framework import mixins, viewsets, status, permissions, serializers
 from rest_framework.decorators import action, api_view, permission_classes
 from rest_framework.response import Response
+from rest_framework.exceptions import PermissionDenied
 from rest_framework.authtoken.models import Token
 from rest_framework.permissions import IsAuthenticated, AllowAny
 from django.contrib.auth import authenticate
 from django.contrib.auth.models import User
-from django.db.models import Avg, Count, Sum
+from django.db.models import Count, Q
 from django.db import transaction
 from django.utils import timezone
-from cryptography.fernet import Fernet
+from django.conf import settings
+from decimal import Decimal, InvalidOperation
 import json
+import math
 
-from .models import Task, Note, WasteReport, Buyer, PickupRequest, BuyerRating, PickupHistory, Notification
+from .models import (
+    Task, Note, WasteReport, Buyer, PickupRequest, BuyerRating, PickupHistory, Notification, UploadSession, SavedSearch,
+    normalize_waste_category,
+)
 from .serializers import (
     UserSerializer, UserRegistrationSerializer, TaskSerializer, NoteSerializer,
-    WasteReportSerializer, WasteReportCreateSerializer, BuyerSerializer,
+    WasteReportSerializer, WasteReportCreateSerializer, WasteReportMaterialSerializer, BuyerSerializer,
     PickupRequestSerializer, PickupRequestCreateSerializer,
-    BuyerRatingSerializer, PickupHistorySerializer, NotificationSerializer
+    BuyerRatingSerializer, PickupHistorySerializer, NotificationSerializer, UploadSessionSerializer,
+    SavedSearchSerializer
 )
-from .waste_classifier import classify_waste_image
-
-
-# Encryption key for Aadhaar (in production, use environment variable)
-ENCRYPTION_KEY = Fernet.generate_key()
-cipher_suite = Fernet(ENCRYPTION_KEY)
+from .waste_classifier import classify_waste_image, classify_waste_images
+from .classification_cache import classification_cache
+from .image_hashing import near_duplicate_index
+from .classification_queue import classification_queue, is_stale_classification, schedule_classification
+from .classifier_client import classifier_client
+from .image_ingest import InvalidImageError, validate_image
+from .crypto import process_cipher
+from .single_flight import classification_flights
+from . import geo, resumable_uploads
+from .pagination import KeysetPagination, order_by_keyset
+from .search import search_reports, search_terms
+from .recommendations import candidate_index
+from .facets import FACET_FIELDS, apply_field_filters, cached_facet_counts, field_filters
+from .buyer_stats import buyer_stats
 
 
 # Authentication Views
@@ -87,6 +102,15 @@ def register_user(request):
                             'error': 'Aadhaar must be exactly 12 digits'
                         }, status=status.HTTP_400_BAD_REQUEST)
                     
+                    # Optional shop location, dropped unless both coordinates are valid
+                    try:
+                        latitude = round(float(request.data.get('latitude')), 5)
+                        longitude = round(float(request.data.get('longitude')), 5)
+                        if not (-90 <= latitude <= 90 and -180 <= longitude <= 180):
+                            raise ValueError
+                    except (TypeError, ValueError):
+                        latitude = longitude = None
+                    
                     # Parse waste types
                     if isinstance(waste_types, str):
                         try:
@@ -96,8 +120,8 @@ def register_user(request):
                     
                     print(f"Waste types: {waste_types}")
                     
-                    # Encrypt aadhaar
-                    encrypted_aadhaar = cipher_suite.encrypt(aadhaar.encode()).decode()
+                    # Encrypt aadhaar (in production, use a key from the environment)
+                    encrypted_aadhaar = process_cipher().encrypt(aadhaar.encode()).decode()
                     aadhaar_last_4 = aadhaar[-4:]
                     
                     print(f"Creating buyer profile for user {user.id}...")
@@ -112,8 +136,10 @@ def register_user(request):
                         shop_address=shop_address,
                         aadhaar_number=encrypted_aadhaar,
                         aadhaar_last_4=aadhaar_last_4,
-                        waste_categories_handled=waste_types
+                        latitude=latitude,
+                        longitude=longitude
                     )
+                    buyer.set_categories(waste_types if isinstance(waste_types, list) else [])
                     
                     print(f"Buyer profile created successfully: {buyer.id} - {buyer.shop_name}")
                     
@@ -269,6 +295,7 @@ class NoteViewSet(viewsets.ModelViewSet):
 # Waste Report ViewSet
 class WasteReportViewSet(viewsets.ModelViewSet):
     permission_classes = [IsAuthenticated]
+    pagination_class = KeysetPagination
     
     def get_serializer_class(self):
         if self.action == 'create':
@@ -281,43 +308,113 @@ class WasteReportViewSet(viewsets.ModelViewSet):
         # If user is a buyer, show ALL pending waste reports from all users
         if hasattr(user, 'buyer_profile'):
             # Buyers can see all pending reports (except their own if they are also a user)
-            return WasteReport.objects.filter(status='pending').order_by('-created_at')
+            return WasteReport.objects.filter(status='pending').prefetch_related('materials').order_by('-created_at')
         
         # Regular users only see their own reports
-        return WasteReport.objects.filter(user=user)
+        return WasteReport.objects.filter(user=user).prefetch_related('materials')
+    
+    # ?ordering= values accepted by the marketplace listing
+    # Unclassified reports (NULL weight/score) always sort last
+    # Each ends in a unique field so it can be used as a pagination keyset
+    ORDERING_FIELDS = {
+        'weight': ('estimated_weight_kg', '-created_at', '-id'),
+        '-weight': ('-estimated_weight_kg', '-created_at', '-id'),
+        'recyclability': ('recyclability_score', '-created_at', '-id'),
+        '-recyclability': ('-recyclability_score', '-created_at', '-id'),
+        'created_at': ('created_at', 'id'),
+        '-created_at': ('-created_at', '-id'),
+    }
+    
+    def get_keyset_ordering(self):
+        ordering = self.request.query_params.get('ordering')
+        if self.action == 'available' and ordering in self.ORDERING_FIELDS:
+            return self.ORDERING_FIELDS[ordering]
+        return self.ORDERING_FIELDS['-created_at']
+    
+    def _filter_by_classification(self, queryset):
+        """
+        Apply ?waste_type=, ?city=, ?waste_condition=, ?quantity_type= (comma-separated),
+        then ?material=, ?min_weight=, ?max_weight= and ?ordering= using the stored classification
+        """
+        params = self.request.query_params
+        queryset = apply_field_filters(queryset, field_filters(params))
+        
+        materials = [m.strip() for m in params.get('material', '').split(',') if m.strip()]
+        if materials:
+            queryset = queryset.filter(materials__material__in=materials).distinct()
+        
+        for param, lookup in (('min_weight', 'estimated_weight_kg__gte'), ('max_weight', 'estimated_weight_kg__lte')):
+            value = params.get(param)
+            if value:
+                try:
+                    value = Decimal(value)
+                except InvalidOperation:
+                    value = None
+                if value is None or not value.is_finite():
+                    raise serializers.ValidationError({param: 'Must be a number'})
+                queryset = queryset.filter(**{lookup: value})
+        
+        ordering = params.get('ordering')
+        if ordering:
+            if ordering not in self.ORDERING_FIELDS:
+                raise serializers.ValidationError({'ordering': f"Must be one of: {', '.join(self.ORDERING_FIELDS)}"})
+            queryset = order_by_keyset(queryset, self.ORDERING_FIELDS[ordering])
+        return queryset
     
     def perform_create(self, serializer):
         waste_report = serializer.save(user=self.request.user)
         
-        # Classify waste using AI if image is provided
+        # Classify waste using AI in the background if image is provided
         if waste_report.image:
-            try:
-                classification_result = classify_waste_image(waste_report.image)
-                if classification_result:
-                    waste_report.ai_classification = classification_result.get('category', '')
-                    waste_report.estimated_weight_kg = classification_result.get('estimated_weight_kg', 0)
-                    waste_report.material_breakdown = classification_result.get('material_breakdown', {})
-                    waste_report.recyclability_score = classification_result.get('recyclability_score', 0)
-                    waste_report.disposal_recommendations = classification_result.get('disposal_recommendations', [])
-                    waste_report.save()
-            except Exception as e:
-                print(f"AI Classification error: {e}")
+            schedule_classification(waste_report)
+    
+    @action(detail=True, methods=['get', 'post'])
+    def classification(self, request, pk=None):
+        """Poll AI classification status (GET) or retry a failed classification (POST)"""
+        waste_report = self.get_object()
+        
+        if request.method == 'POST':
+            if waste_report.user != request.user:
+                return Response({'error': 'Only the report owner can request classification'},
+                              status=status.HTTP_403_FORBIDDEN)
+            if not waste_report.image:
+                return Response({'error': 'Report has no image'},
+                              status=status.HTTP_400_BAD_REQUEST)
+            if (waste_report.classification_status in ['pending', 'processing']
+                    and not is_stale_classification(waste_report)):
+                return Response({'error': 'Classification already in progress'},
+                              status=status.HTTP_409_CONFLICT)
+            
+            schedule_classification(waste_report)
+            waste_report.refresh_from_db()
+        
+        return Response({
+            'id': waste_report.id,
+            'classification_status': waste_report.classification_status,
+            'ai_classification': waste_report.ai_classification,
+            'classification_error': waste_report.classification_error,
+            'classified_at': waste_report.classified_at,
+            'estimated_weight_kg': waste_report.estimated_weight_kg,
+            'recyclability_score': waste_report.recyclability_score,
+            'materials': WasteReportMaterialSerializer(waste_report.materials.all(), many=True).data,
+        })
     
     @action(detail=False, methods=['get'])
     def statistics(self, request):
         """Get user's waste report statistics"""
-        reports = self.get_queryset()
-        stats = {
-            'total_reports': reports.count(),
-            'pending': reports.filter(status='pending').count(),
-            'scheduled': reports.filter(status='scheduled').count(),
-            'completed': reports.filter(status='completed').count(),
-            'by_type': {}
-        }
+        reports = self.get_queryset().order_by()
+        stats = reports.aggregate(
+            total_reports=Count('pk'),
+            pending=Count('pk', filter=Q(status='pending')),
+            scheduled=Count('pk', filter=Q(status='scheduled')),
+            completed=Count('pk', filter=Q(status='completed')),
+        )
+        stats['by_type'] = {}
         
         # Group by waste type
+        type_counts = dict(reports.values_list('waste_type').annotate(count=Count('pk')))
         for choice in WasteReport.WASTE_TYPE_CHOICES:
-            count = reports.filter(waste_type=choice[0]).count()
+            count = type_counts.get(choice[0], 0)
             if count > 0:
                 stats['by_type'][choice[0]] = {
                     'label': choice[1],
@@ -326,6 +423,23 @@ class WasteReportViewSet(viewsets.ModelViewSet):
         
         return Response(stats)
     
+    @action(detail=False, methods=['get'])
+    def facets(self, request):
+        """Counts per ?facets= (waste_type, city, waste_condition, quantity_type) over the listing filters"""
+        requested = [f.strip() for f in request.query_params.get('facets', '').split(',') if f.strip()] or FACET_FIELDS
+        unknown = [facet for facet in requested if facet not in FACET_FIELDS]
+        if unknown:
+            raise serializers.ValidationError({'facets': f"Must be among: {', '.join(FACET_FIELDS)}"})
+        
+        reports = self._filter_by_classification(self.get_queryset())
+        # Buyers all see the same pending reports, so they share cache entries
+        scope = 'pending' if hasattr(request.user, 'buyer_profile') else f'user:{request.user.pk}'
+        signature = dict(
+            field_filters(request.query_params),
+            **{param: request.query_params.get(param, '') for param in ('material', 'min_weight', 'max_weight')}
+        )
+        return Response(cached_facet_counts(scope, signature, reports, list(dict.fromkeys(requested))))
+    
     @action(detail=False, methods=['get'])
     def available(self, request):
         """Get all available (pending) waste reports for buyers - persists across app restarts"""
@@ -339,15 +453,112 @@ class WasteReportViewSet(viewsets.ModelViewSet):
         # Get all pending waste reports from database (persisted data)
         available_waste = WasteReport.objects.filter(
             status='pending'
-        ).select_related('user').order_by('-created_at')
+        ).select_related('user').prefetch_related('materials').order_by('-created_at')
+        available_waste = self._filter_by_classification(available_waste)
         
-        serializer = self.get_serializer(available_waste, many=True)
+        page = self.paginate_queryset(available_waste)
+        serializer = self.get_serializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
+    
+    def _float_param(self, name, default=None, minimum=None, maximum=None):
+        value = self.request.query_params.get(name)
+        if value in (None, ''):
+            if default is None:
+                raise serializers.ValidationError({name: 'This parameter is required'})
+            return default
+        try:
+            value = float(value)
+        except ValueError:
+            raise serializers.ValidationError({name: 'Must be a number'})
+        if not math.isfinite(value) or (minimum is not None and value < minimum) or (maximum is not None and value > maximum):
+            raise serializers.ValidationError({name: f'Must be between {minimum} and {maximum}'})
+        return value
+    
+    @action(detail=False, methods=['get'])
+    def nearby(self, request):
+        """Pending waste reports within ?radius_km= of ?lat=&lng=, nearest first (buyers only)"""
+        if not hasattr(request.user, 'buyer_profile'):
+            return Response(
+                {'error': 'Only buyers can access available waste'},
+                status=status.HTTP_403_FORBIDDEN
+            )
+        
+        max_radius = getattr(settings, 'GEO_MAX_RADIUS_KM', 100)
+        latitude = self._float_param('lat', minimum=-90, maximum=90)
+        longitude = self._float_param('lng', minimum=-180, maximum=180)
+        radius_km = self._float_param('radius_km', getattr(settings, 'GEO_DEFAULT_RADIUS_KM', 10), 0.01, max_radius)
+        limit = int(self._float_param('limit', 50, 1, 200))
+        
+        candidates = geo.filter_within(WasteReport.objects.filter(status='pending'), latitude, longitude, radius_km)
+        candidates = self._filter_by_classification(candidates)
+        # Rank on the coordinates only, then load the rows that made the cut
+        ranked = geo.rank_by_distance(
+            candidates.order_by().values_list('pk', 'latitude', 'longitude'),
+            latitude, longitude, radius_km, limit
+        )
+        reports = WasteReport.objects.select_related('user').prefetch_related('materials').in_bulk(
+            [pk for _, pk in ranked]
+        )
+        
+        results = []
+        for distance, pk in ranked:
+            if pk not in reports:
+                continue
+            data = self.get_serializer(reports[pk]).data
+            data['distance_km'] = round(distance, 3)
+            results.append(data)
         return Response({
-            'count': available_waste.count(),
-            'results': serializer.data,
-            'message': 'These reports are stored in database and persist across app restarts'
+            'count': len(results),
+            'radius_km': radius_km,
+            'results': results,
         })
     
+    @action(detail=True, methods=['get'])
+    def recommended_buyers(self, request, pk=None):
+        """Best buyers for this report by category, distance, rating and completion rate (?limit=, max 50)"""
+        waste_report = self.get_object()
+        limit = int(self._float_param('limit', 10, 1, 50))
+
+        ranked = candidate_index.recommend(waste_report, limit)
+        buyers = Buyer.objects.select_related('user').prefetch_related('categories').in_bulk([buyer_id for _, buyer_id, _ in ranked])
+
+        results = []
+        for score, buyer_id, distance in ranked:
+            if buyer_id not in buyers:
+                continue
+            data = BuyerSerializer(buyers[buyer_id], context=self.get_serializer_context()).data
+            data['score'] = round(score, 4)
+            data['distance_km'] = round(distance, 3) if distance is not None else None
+            results.append(data)
+        return Response({
+            'count': len(results),
+            'results': results,
+        })
+
+    @action(detail=False, methods=['get'])
+    def search(self, request):
+        """Ranked full-text search: ?q= words, optional ?status= and ?waste_type= (comma-separated)"""
+        query = request.query_params.get('q', '')
+        if not search_terms(query):
+            raise serializers.ValidationError({'q': 'Enter at least one word to search for'})
+        
+        reports = self.get_queryset()
+        status_filter = request.query_params.get('status')
+        if status_filter:
+            reports = reports.filter(status=status_filter)
+        waste_types = [t.strip() for t in request.query_params.get('waste_type', '').split(',') if t.strip()]
+        if waste_types:
+            reports = reports.filter(waste_type__in=waste_types)
+        limit = int(self._float_param('limit', 20, 1, 100))
+        
+        reports = search_reports(reports.select_related('user'), query).order_by('-rank', '-created_at', '-id')[:limit]
+        results = []
+        for report in reports:
+            data = self.get_serializer(report).data
+            data['rank'] = report.rank
+            results.append(data)
+        return Response({'count': len(results), 'results': results})
+    
     @action(detail=False, methods=['post'])
     def classify(self, request):
         """Classify waste image using AI"""
@@ -357,8 +568,16 @@ class WasteReportViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
         
+        image_file = request.FILES['image']
+        try:
+            validate_image(image_file)
+        except InvalidImageError as e:
+            return Response(
+                {'error': str(e)},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
         try:
-            image_file = request.FILES['image']
             classification_result = classify_waste_image(image_file)
             
             if classification_result:
@@ -373,6 +592,73 @@ class WasteReportViewSet(viewsets.ModelViewSet):
                 {'error': str(e)},
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
+    
+    @action(detail=False, methods=['post'], url_path='classify-batch')
+    def classify_batch(self, request):
+        """Classify several waste images (multipart field 'images') in one request"""
+        images = request.FILES.getlist('images')
+        if not images:
+            return Response(
+                {'error': 'No images provided'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        max_images = getattr(settings, 'CLASSIFIER_BATCH_MAX_IMAGES', 20)
+        if len(images) > max_images:
+            return Response(
+                {'error': f'Too many images, at most {max_images} per batch'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        # Reject invalid files up front; only valid ones reach the classifier
+        results = [None] * len(images)
+        valid = []
+        for index, image_file in enumerate(images):
+            try:
+                validate_image(image_file)
+                valid.append(index)
+            except InvalidImageError as e:
+                results[index] = {'error': str(e)}
+        
+        classified = classify_waste_images([images[index] for index in valid])
+        for index, classification_result in zip(valid, classified):
+            results[index] = classification_result
+        
+        items = []
+        for index, (image_file, classification_result) in enumerate(zip(images, results)):
+            if classification_result.get('error'):
+                items.append({
+                    'index': index,
+                    'filename': image_file.name,
+                    'success': False,
+                    'error': classification_result['error']
+                })
+            else:
+                items.append({
+                    'index': index,
+                    'filename': image_file.name,
+                    'success': True,
+                    'data': classification_result
+                })
+        
+        succeeded = sum(1 for item in items if item['success'])
+        return Response({
+            'count': len(items),
+            'succeeded': succeeded,
+            'failed': len(items) - succeeded,
+            'results': items
+        })
+    
+    @action(detail=False, methods=['get'], url_path='classifier-stats')
+    def classifier_stats(self, request):
+        """Get AI classifier cache, queue and remote circuit breaker metrics for this worker"""
+        return Response({
+            'cache': classification_cache.stats(),
+            'near_duplicate': near_duplicate_index.stats(),
+            'queue': classification_queue.stats(),
+            'single_flight': classification_flights.stats(),
+            'remote': classifier_client.stats()
+        })
 
 
 
@@ -382,22 +668,19 @@ class BuyerViewSet(viewsets.ModelViewSet):
     permission_classes = [IsAuthenticated]
     
     def get_queryset(self):
-        queryset = Buyer.objects.annotate(
-            average_rating=Avg('ratings__rating'),
-            total_ratings=Count('ratings')
-        )
+        queryset = Buyer.objects.filter(is_verified=True)
         
-        # Filter by waste type if provided
+        # Filter by waste type if provided (index lookup on BuyerCategory)
         waste_type = self.request.query_params.get('waste_type')
         if waste_type:
-            queryset = queryset.filter(waste_types_accepted__contains=waste_type)
+            queryset = queryset.filter(category_links__category_id=normalize_waste_category(waste_type))
         
-        # Filter by city
+        # Filter by city (part of the shop address)
         city = self.request.query_params.get('city')
         if city:
-            queryset = queryset.filter(city__icontains=city)
+            queryset = queryset.filter(shop_address__icontains=city)
         
-        return queryset.filter(is_verified=True)
+        return queryset.select_related('user').prefetch_related('categories')
     
     @action(detail=False, methods=['get'])
     def stats(self, request):
@@ -409,37 +692,15 @@ class BuyerViewSet(viewsets.ModelViewSet):
         
         buyer = user.buyer_profile
         
-        # Calculate stats
-        completed_orders = PickupRequest.objects.filter(
-            buyer=buyer,
-            status='completed'
-        ).count()
-        
-        active_orders = PickupRequest.objects.filter(
-            buyer=buyer,
-            status__in=['pending', 'accepted', 'scheduled']
-        ).count()
-        
-        # Calculate total waste purchased from completed pickups
-        total_waste = PickupHistory.objects.filter(
-            buyer_shop_name=buyer.shop_name
-        ).aggregate(
-            total=Sum('quantity')
-        )['total'] or 0
-        
-        # Get average rating
-        avg_rating = BuyerRating.objects.filter(
-            buyer=buyer
-        ).aggregate(
-            avg=Avg('rating')
-        )['avg'] or 0.0
+        # One cached query: request counts and the kg collected (PickupHistory.weight_kg)
+        stats = buyer_stats(buyer.pk)
         
         return Response({
-            'completed_orders': completed_orders,
-            'active_orders': active_orders,
-            'total_waste_kg': round(total_waste, 2),
-            'average_rating': round(avg_rating, 1),
-            'total_ratings': BuyerRating.objects.filter(buyer=buyer).count()
+            'completed_orders': stats['completed_requests'],
+            'active_orders': stats['active_requests'],
+            'total_waste_kg': round(stats['total_waste_kg'], 2),
+            'average_rating': buyer.average_rating,
+            'total_ratings': buyer.total_ratings
         })
     
     @action(detail=True, methods=['get'])
@@ -454,6 +715,7 @@ class BuyerViewSet(viewsets.ModelViewSet):
 # Pickup Request ViewSet
 class PickupRequestViewSet(viewsets.ModelViewSet):
     permission_classes = [IsAuthenticated]
+    pagination_class = KeysetPagination
     
     def get_serializer_class(self):
         if self.action == 'create':
@@ -632,11 +894,13 @@ class PickupRequestViewSet(viewsets.ModelViewSet):
         PickupHistory.objects.create(
             user=pickup_request.waste_report.user,
             user_username=pickup_request.waste_report.user.username,
+            buyer=pickup_request.buyer,
             buyer_shop_name=pickup_request.buyer.shop_name,
             waste_type=pickup_request.waste_report.get_waste_type_display(),
             quantity=pickup_request.waste_report.quantity_display,
+            weight_kg=pickup_request.waste_report.weight_kg,
             location=pickup_request.confirmed_pickup_address or pickup_request.waste_report.full_address,
-            offered_price=pickup_request.price_offer,
+            offered_price=pickup_request.offered_price,
             reported_at=pickup_request.waste_report.created_at,
             scheduled_at=pickup_request.confirmed_pickup_time or pickup_request.created_at,
             completed_at=timezone.now(),
@@ -673,14 +937,15 @@ class BuyerRatingViewSet(viewsets.ModelViewSet):
 class PickupHistoryViewSet(viewsets.ReadOnlyModelViewSet):
     serializer_class = PickupHistorySerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = KeysetPagination
+    keyset_ordering = ('-completed_at', '-id')
     
     def get_queryset(self):
         user = self.request.user
         
-        # If user is a buyer, show pickups where their shop was involved
+        # If user is a buyer, show the pickups they collected
         if hasattr(user, 'buyer_profile'):
-            buyer_shop = user.buyer_profile.shop_name
-            return PickupHistory.objects.filter(buyer_shop_name=buyer_shop)
+            return PickupHistory.objects.filter(buyer=user.buyer_profile)
         
         # Otherwise show user's own history
         return PickupHistory.objects.filter(user=user)
@@ -690,6 +955,7 @@ class PickupHistoryViewSet(viewsets.ReadOnlyModelViewSet):
 class NotificationViewSet(viewsets.ModelViewSet):
     serializer_class = NotificationSerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = KeysetPagination
     
     def get_queryset(self):
         return Notification.objects.filter(user=self.request.user).order_by('-created_at')
@@ -714,3 +980,154 @@ class NotificationViewSet(viewsets.ModelViewSet):
         """Get count of unread notifications"""
         count = Notification.objects.filter(user=request.user, is_read=False).count()
         return Response({'unread_count': count})
+
+
+# Saved Search ViewSet
+class SavedSearchViewSet(viewsets.ModelViewSet):
+    """Buyer's standing filters; new matching reports arrive as notifications"""
+    serializer_class = SavedSearchSerializer
+    permission_classes = [IsAuthenticated]
+    
+    def get_queryset(self):
+        return SavedSearch.objects.filter(buyer__user=self.request.user).prefetch_related('categories')
+    
+    def perform_create(self, serializer):
+        if not hasattr(self.request.user, 'buyer_profile'):
+            raise PermissionDenied('Only buyers can save searches')
+        buyer = self.request.user.buyer_profile
+        limit = getattr(settings, 'SAVED_SEARCH_MAX_PER_BUYER', 20)
+        if buyer.saved_searches.count() >= limit:
+            raise serializers.ValidationError({'error': f'You can save at most {limit} searches'})
+        serializer.save(buyer=buyer)
+
+
+# Resumable Upload ViewSet
+class UploadSessionViewSet(mixins.CreateModelMixin, mixins.RetrieveModelMixin,
+                           mixins.DestroyModelMixin, viewsets.GenericViewSet):
+    """
+    Chunked, resumable photo uploads for waste reports:
+    POST /uploads/ -> PUT /uploads/{id}/chunk/ (repeat) -> POST /uploads/{id}/finalize/
+    """
+    serializer_class = UploadSessionSerializer
+    permission_classes = [IsAuthenticated]
+    
+    def get_queryset(self):
+        return UploadSession.objects.filter(user=self.request.user)
+    
+    def perform_create(self, serializer):
+        serializer.save(user=self.request.user)
+    
+    def perform_destroy(self, instance):
+        resumable_uploads.discard(instance)
+        instance.delete()
+    
+    def retrieve(self, request, *args, **kwargs):
+        session = self.get_object()
+        response = Response(self.get_serializer(session).data)
+        response['Upload-Offset'] = str(session.received_bytes)
+        return response
+    
+    def _locked_session(self):
+        """Re-read the session with a row lock so chunks for one upload are serialised"""
+        session = UploadSession.objects.select_for_update().get(pk=self.get_object().pk)
+        if session.status != 'uploading':
+            raise resumable_uploads.UploadError(f'Upload is {session.status}', status_code=409)
+        if resumable_uploads.is_expired(session):
+            raise resumable_uploads.UploadError('Upload session has expired, please start again',
+                                                status_code=410)
+        return session
+    
+    @action(detail=True, methods=['put'])
+    def chunk(self, request, pk=None):
+        """Append raw bytes at Upload-Offset (header or ?offset=); optional Upload-Checksum: sha256 <hex>"""
+        try:
+            try:
+                offset = int(request.headers.get('Upload-Offset', request.query_params.get('offset', '')))
+                length = int(request.headers.get('Content-Length') or 0)
+            except ValueError:
+                raise resumable_uploads.UploadError('Upload-Offset and Content-Length must be integers')
+            checksum = resumable_uploads.parse_checksum(request.headers.get('Upload-Checksum'))
+            
+            with transaction.atomic():
+                session = self._locked_session()
+                resumable_uploads.check_chunk(session, offset, length)
+            
+            # Stream the raw body (request.data would buffer and parse it) with no lock held
+            chunk_path = resumable_uploads.receive_chunk(session, request.stream, length, checksum)
+            try:
+                with transaction.atomic():
+                    # Another request may have committed this offset meanwhile
+                    session = self._locked_session()
+                    resumable_uploads.check_chunk(session, offset, length)
+                    session.received_bytes = resumable_uploads.commit_chunk(session, chunk_path, offset)
+                    session.save(update_fields=['received_bytes', 'updated_at'])
+            finally:
+                resumable_uploads.discard_chunk(chunk_path)
+        except resumable_uploads.UploadError as e:
+            current = UploadSession.objects.filter(pk=pk).values_list('received_bytes', flat=True).first()
+            response = Response({'error': str(e), 'received_bytes': current}, status=e.status_code)
+            if current is not None:
+                response['Upload-Offset'] = str(current)
+            return response
+        
+        response = Response({
+            'id': session.id,
+            'received_bytes': session.received_bytes,
+            'total_size': session.total_size,
+            'complete': session.received_bytes == session.total_size
+        })
+        response['Upload-Offset'] = str(session.received_bytes)
+        return response
+    
+    @action(detail=True, methods=['post'])
+    def finalize(self, request, pk=None):
+        """Verify the upload and attach it to a new report, or to ?waste_report= (an existing own report)"""
+        session = self.get_object()
+        if session.status == 'completed' and session.waste_report_id:
+            # Repeated finalize (e.g. the response was lost): return the same report
+            report = WasteReport.objects.get(pk=session.waste_report_id)
+            return Response(WasteReportSerializer(report, context={'request': request}).data)
+        
+        data = {key: value for key, value in request.data.items()}
+        report_id = data.pop('waste_report', None)
+        upload = None
+        try:
+            with transaction.atomic():
+                session = self._locked_session()
+                upload = resumable_uploads.verify_complete(session)
+                try:
+                    validate_image(upload)
+                except InvalidImageError as e:
+                    raise resumable_uploads.UploadError(str(e))
+                
+                if report_id:
+                    report = WasteReport.objects.filter(pk=report_id, user=request.user).first()
+                    if report is None:
+                        raise resumable_uploads.UploadError('Waste report not found', status_code=404)
+                    report.image = upload
+                    report.save()
+                    created = False
+                else:
+                    data['image'] = upload
+                    serializer = WasteReportCreateSerializer(data=data, context={'request': request})
+                    serializer.is_valid(raise_exception=True)
+                    report = serializer.save(user=request.user)
+                    created = True
+                
+                schedule_classification(report)
+                session.status = 'completed'
+                session.waste_report = report
+                session.completed_at = timezone.now()
+                session.save(update_fields=['status', 'waste_report', 'completed_at', 'updated_at'])
+        except resumable_uploads.UploadError as e:
+            return Response({'error': str(e)}, status=e.status_code)
+        finally:
+            if upload is not None:
+                upload.close()
+        
+        # The storage normally moved the part file; remove it if it was copied
+        resumable_uploads.discard(session)
+        return Response(
+            WasteReportSerializer(report, context={'request': request}).data,
+            status=status.HTTP_201_CREATED if created else status.HTTP_200_OK
+        )
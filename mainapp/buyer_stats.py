@@ -0,0 +1,56 @@
+"""
+Per-buyer pickup statistics for the buyer dashboard and /api/buyers/stats/.
+
+All counts come from one query: conditional COUNTs over the buyer's pickup
+requests plus a subquery summing PickupHistory.weight_kg. The result is
+cached per buyer for BUYER_STATS_CACHE_SECONDS and dropped (after commit)
+whenever one of the buyer's pickup requests or history rows changes, see
+signals.py. Ratings are not included: they are stored on Buyer itself.
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, OuterRef, Q, Subquery, Sum
+
+from .models import Buyer, PickupHistory
+
+
+ACTIVE_STATUSES = ['pending', 'accepted', 'scheduled']
+
+
+def _cache_key(buyer_id):
+    return f'buyer_stats:{buyer_id}'
+
+
+def compute_buyer_stats(buyer_id):
+    collected = PickupHistory.objects.filter(buyer=OuterRef('pk')).order_by() \
+        .values('buyer').annotate(total=Sum('weight_kg')).values('total')
+    row = Buyer.objects.filter(pk=buyer_id).annotate(
+        total_requests=Count('pickup_requests'),
+        pending_requests=Count('pickup_requests', filter=Q(pickup_requests__status='pending')),
+        accepted_requests=Count('pickup_requests', filter=Q(pickup_requests__status='accepted')),
+        completed_requests=Count('pickup_requests', filter=Q(pickup_requests__status='completed')),
+        active_requests=Count('pickup_requests', filter=Q(pickup_requests__status__in=ACTIVE_STATUSES)),
+        total_waste_kg=Subquery(collected),
+    ).values(
+        'total_requests', 'pending_requests', 'accepted_requests', 'completed_requests',
+        'active_requests', 'total_waste_kg',
+    ).first() or {}
+    row['total_waste_kg'] = float(row.get('total_waste_kg') or 0)
+    return row
+
+
+def buyer_stats(buyer_id):
+    """Cached pickup statistics of a buyer"""
+    key = _cache_key(buyer_id)
+    stats = cache.get(key)
+    if stats is None:
+        stats = compute_buyer_stats(buyer_id)
+        cache.set(key, stats, getattr(settings, 'BUYER_STATS_CACHE_SECONDS', 300))
+    return stats
+
+
+def invalidate_buyer_stats(buyer_id):
+    """Drop a buyer's cached stats once the current transaction commits"""
+    if buyer_id is not None:
+        transaction.on_commit(lambda: cache.delete(_cache_key(buyer_id)))
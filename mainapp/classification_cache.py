@@ -0,0 +1,198 @@
+"""
+Two-tier cache for AI waste classification results.
+
+Results are keyed by the SHA-256 digest of the image bytes. A small in-process
+LRU answers repeat uploads without touching the database, and the
+ClassificationCacheEntry table shares results across workers and restarts.
+"""
+import copy
+import hashlib
+import threading
+from collections import OrderedDict
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import DatabaseError
+from django.db.models import F
+from django.utils import timezone
+
+
+# Run expired/oversize eviction on the DB tier once every N stores
+EVICTION_INTERVAL = 100
+
+
+def image_digest(image_bytes):
+    """Return the SHA-256 hex digest used as the cache key"""
+    return hashlib.sha256(image_bytes).hexdigest()
+
+
+def is_cacheable(result):
+    """Only cache genuine model answers, never transient failures"""
+    if not result:
+        return False
+    return not result.get('error') or result.get('waste_category') == 'fake'
+
+
+class LRUCache:
+    """Thread-safe, size-bounded least-recently-used mapping"""
+
+    def __init__(self, max_size):
+        self.max_size = max_size
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            if key not in self._data:
+                return None
+            self._data.move_to_end(key)
+            return self._data[key]
+
+    def set(self, key, value):
+        if self.max_size <= 0:
+            return
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+class ClassificationCache:
+    """In-process LRU in front of the persistent ClassificationCacheEntry table"""
+
+    def __init__(self):
+        self._lru = LRUCache(getattr(settings, 'CLASSIFIER_CACHE_LRU_SIZE', 256))
+        self._lock = threading.Lock()
+        self._stores_since_eviction = 0
+        self._counters = {
+            'memory_hits': 0,
+            'db_hits': 0,
+            'misses': 0,
+            'stores': 0,
+            'evicted': 0,
+        }
+
+    @property
+    def ttl(self):
+        return timedelta(seconds=getattr(settings, 'CLASSIFIER_CACHE_TTL_SECONDS', 60 * 60 * 24 * 30))
+
+    @property
+    def max_entries(self):
+        return getattr(settings, 'CLASSIFIER_CACHE_MAX_ENTRIES', 50000)
+
+    def _count(self, name, amount=1):
+        with self._lock:
+            self._counters[name] += amount
+
+    def get(self, digest):
+        """Return a copy of the cached result for ``digest`` or None"""
+        from .models import ClassificationCacheEntry
+
+        result = self._lru.get(digest)
+        if result is not None:
+            self._count('memory_hits')
+            return copy.deepcopy(result)
+
+        try:
+            now = timezone.now()
+            entry = ClassificationCacheEntry.objects.filter(
+                image_digest=digest,
+                last_used_at__gte=now - self.ttl
+            ).only('result').first()
+            if entry is None:
+                self._count('misses')
+                return None
+
+            ClassificationCacheEntry.objects.filter(pk=entry.pk).update(
+                hit_count=F('hit_count') + 1,
+                last_used_at=now
+            )
+        except DatabaseError as e:
+            print(f"Classification cache lookup failed: {e}")
+            self._count('misses')
+            return None
+
+        self._lru.set(digest, entry.result)
+        self._count('db_hits')
+        return copy.deepcopy(entry.result)
+
+    def set(self, digest, result, perceptual_hash=''):
+        """Store ``result`` in both tiers"""
+        from .models import ClassificationCacheEntry
+
+        result = copy.deepcopy(result)
+        self._lru.set(digest, result)
+        try:
+            ClassificationCacheEntry.objects.update_or_create(
+                image_digest=digest,
+                defaults={
+                    'result': result,
+                    'perceptual_hash': perceptual_hash or '',
+                    'last_used_at': timezone.now(),
+                }
+            )
+        except DatabaseError as e:
+            print(f"Classification cache store failed: {e}")
+            return
+        self._count('stores')
+
+        with self._lock:
+            self._stores_since_eviction += 1
+            run_eviction = self._stores_since_eviction >= EVICTION_INTERVAL
+            if run_eviction:
+                self._stores_since_eviction = 0
+        if run_eviction:
+            self.evict()
+
+    def evict(self):
+        """Delete expired rows and trim the table to CLASSIFIER_CACHE_MAX_ENTRIES"""
+        from .models import ClassificationCacheEntry
+
+        try:
+            deleted, _ = ClassificationCacheEntry.objects.filter(
+                last_used_at__lt=timezone.now() - self.ttl
+            ).delete()
+
+            overflow = list(ClassificationCacheEntry.objects.order_by('-last_used_at').values_list(
+                'last_used_at', flat=True
+            )[self.max_entries:self.max_entries + 1])
+            if overflow:
+                trimmed, _ = ClassificationCacheEntry.objects.filter(last_used_at__lte=overflow[0]).delete()
+                deleted += trimmed
+        except DatabaseError as e:
+            print(f"Classification cache eviction failed: {e}")
+            return 0
+
+        if deleted:
+            # Evicted digests would otherwise linger in the near-duplicate tree
+            from .image_hashing import near_duplicate_index
+            near_duplicate_index.reset()
+        self._count('evicted', deleted)
+        return deleted
+
+    def clear(self):
+        """Drop the in-process tier (the DB tier is left untouched)"""
+        self._lru.clear()
+
+    def stats(self):
+        with self._lock:
+            counters = dict(self._counters)
+        hits = counters['memory_hits'] + counters['db_hits']
+        lookups = hits + counters['misses']
+        counters.update({
+            'hits': hits,
+            'hit_rate': round(hits / lookups, 3) if lookups else 0.0,
+            'memory_entries': len(self._lru),
+        })
+        return counters
+
+
+classification_cache = ClassificationCache()
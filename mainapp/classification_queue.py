@@ -0,0 +1,252 @@
+"""
+Background classification of new waste reports.
+
+Report creation no longer waits for the AI model: the report is saved with
+classification_status='pending' and its id is handed to a bounded thread
+pool, which runs classify_waste_image and writes the result back to the row.
+Clients poll /api/waste-reports/{id}/classification/ for the outcome.
+
+Jobs live only in this process, so a worker restart or crash loses them.
+classification_queued_at records when a job was queued and when a worker
+picked it up; once it is older than CLASSIFIER_JOB_TIMEOUT_SECONDS the job
+is considered lost and stale_classifications() / the retry endpoint /
+`manage.py requeue_stale_classifications` queue it again.
+"""
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import close_old_connections, connection, transaction
+from django.utils import timezone
+
+
+# Number of recent wait/processing samples kept for percentiles
+SAMPLE_SIZE = 500
+
+# Largest weight the DecimalField(max_digits=8, decimal_places=3) columns hold
+MAX_WEIGHT_KG = 99999.999
+
+
+def _percentile(samples, fraction):
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))
+    return round(ordered[index] * 1000, 1)
+
+
+class ClassificationQueue:
+    """Bounded worker pool that classifies waste reports off the request path"""
+
+    def __init__(self):
+        self._executor = None
+        self._lock = threading.Lock()
+        self._queued = 0
+        self._active = 0
+        self._wait_times = deque(maxlen=SAMPLE_SIZE)
+        self._processing_times = deque(maxlen=SAMPLE_SIZE)
+        self._counters = {
+            'submitted': 0,
+            'rejected': 0,
+            'completed': 0,
+            'failed': 0,
+        }
+
+    @property
+    def max_workers(self):
+        return getattr(settings, 'CLASSIFIER_WORKERS', 4)
+
+    @property
+    def max_queue(self):
+        return getattr(settings, 'CLASSIFIER_QUEUE_MAX', 100)
+
+    def _get_executor(self):
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.max_workers,
+                thread_name_prefix='classifier'
+            )
+        return self._executor
+
+    def enqueue(self, report_id):
+        """Queue a report for classification. Returns False if the queue is full."""
+        with self._lock:
+            if self._queued >= self.max_queue:
+                self._counters['rejected'] += 1
+                return False
+            self._queued += 1
+            self._counters['submitted'] += 1
+            executor = self._get_executor()
+        executor.submit(self._run, report_id, time.monotonic())
+        return True
+
+    def _run(self, report_id, enqueued_at):
+        started_at = time.monotonic()
+        with self._lock:
+            self._queued -= 1
+            self._active += 1
+            self._wait_times.append(started_at - enqueued_at)
+
+        close_old_connections()
+        try:
+            succeeded = classify_report(report_id)
+        except Exception as e:
+            print(f"[Classification Queue] Report #{report_id} failed: {e}")
+            succeeded = False
+        finally:
+            connection.close()
+
+        with self._lock:
+            self._active -= 1
+            self._processing_times.append(time.monotonic() - started_at)
+            self._counters['completed' if succeeded else 'failed'] += 1
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._counters)
+            stats.update({
+                'queue_depth': self._queued,
+                'active': self._active,
+                'max_workers': self.max_workers,
+                'max_queue': self.max_queue,
+                'wait_ms_p50': _percentile(self._wait_times, 0.5),
+                'wait_ms_p95': _percentile(self._wait_times, 0.95),
+                'processing_ms_p50': _percentile(self._processing_times, 0.5),
+                'processing_ms_p95': _percentile(self._processing_times, 0.95),
+            })
+        return stats
+
+
+def summarize_materials(result):
+    """
+    Collapse a classifier result into per-material rows.
+
+    Returns ({material: (weight_kg, recyclable)}, total_weight_kg,
+    recyclability_score); the score is the recyclable share of the weight.
+    """
+    materials = {}
+    for detected in (result or {}).get('materials_detected') or []:
+        if not isinstance(detected, dict) or not detected.get('material'):
+            continue
+        try:
+            weight = min(MAX_WEIGHT_KG, max(0.0, float(detected.get('estimated_weight_kg') or 0)))
+        except (TypeError, ValueError):
+            weight = 0.0
+        name = str(detected['material'])[:30]
+        previous_weight, previous_recyclable = materials.get(name, (0.0, False))
+        materials[name] = (
+            min(MAX_WEIGHT_KG, previous_weight + weight),
+            previous_recyclable or bool(detected.get('recyclable'))
+        )
+
+    if not materials:
+        return materials, None, None
+
+    total = min(MAX_WEIGHT_KG, sum(weight for weight, _ in materials.values()))
+    if total > 0:
+        score = 100 * sum(weight for weight, recyclable in materials.values() if recyclable) / total
+    else:
+        score = 100 * sum(1 for _, recyclable in materials.values() if recyclable) / len(materials)
+    return materials, total, int(round(score))
+
+
+def store_classification(report_id, result, succeeded):
+    """Write the classifier outcome and its per-material rows in one transaction"""
+    from .models import WasteReport, WasteReportMaterial
+
+    materials, total, score = summarize_materials(result) if succeeded else ({}, None, None)
+    with transaction.atomic():
+        WasteReport.objects.filter(pk=report_id).update(
+            classification_status='completed' if succeeded else 'failed',
+            ai_classification=result,
+            classification_error=(result.get('error') or '')[:255],
+            classified_at=timezone.now(),
+            estimated_weight_kg=Decimal(str(round(total, 3))) if total is not None else None,
+            recyclability_score=score
+        )
+        WasteReportMaterial.objects.filter(report_id=report_id).delete()
+        WasteReportMaterial.objects.bulk_create([
+            WasteReportMaterial(
+                report_id=report_id,
+                material=material,
+                estimated_weight_kg=Decimal(str(round(weight, 3))),
+                recyclable=recyclable
+            )
+            for material, (weight, recyclable) in materials.items()
+        ])
+
+
+def classify_report(report_id):
+    """Classify one report's image and store the outcome on the row"""
+    from .classification_cache import is_cacheable
+    from .models import WasteReport
+    from .waste_classifier import classify_waste_image
+
+    report = WasteReport.objects.filter(pk=report_id).first()
+    if report is None or not report.image:
+        return False
+
+    WasteReport.objects.filter(pk=report_id).update(
+        classification_status='processing',
+        classification_queued_at=timezone.now()
+    )
+
+    with report.image.open('rb') as image_file:
+        result = classify_waste_image(image_file)
+
+    # A genuine model answer (including "fake" verdicts) completes the job;
+    # API/parse failures leave the report failed so it can be retried.
+    succeeded = is_cacheable(result)
+    store_classification(report_id, result, succeeded)
+    return succeeded
+
+
+def schedule_classification(waste_report):
+    """Mark a report pending and queue it for classification once the transaction commits"""
+    from .models import WasteReport
+
+    waste_report.classification_status = 'pending'
+    waste_report.classification_error = ''
+    waste_report.classification_queued_at = timezone.now()
+    waste_report.save(update_fields=['classification_status', 'classification_error', 'classification_queued_at'])
+
+    def enqueue():
+        if not classification_queue.enqueue(waste_report.id):
+            print(f"AI Classification queue full, report #{waste_report.id} not queued")
+            WasteReport.objects.filter(pk=waste_report.id).update(
+                classification_status='failed',
+                classification_error='Classification queue is full, please retry later'
+            )
+    transaction.on_commit(enqueue)
+
+
+def _stale_before():
+    timeout = getattr(settings, 'CLASSIFIER_JOB_TIMEOUT_SECONDS', 900)
+    return timezone.now() - timedelta(seconds=timeout)
+
+
+def stale_classifications(queryset=None):
+    """Pending/processing reports whose job has outlived CLASSIFIER_JOB_TIMEOUT_SECONDS"""
+    from django.db.models import Q
+    from .models import WasteReport
+
+    if queryset is None:
+        queryset = WasteReport.objects.all()
+    return queryset.filter(classification_status__in=['pending', 'processing']).filter(
+        Q(classification_queued_at__isnull=True) | Q(classification_queued_at__lt=_stale_before())
+    )
+
+
+def is_stale_classification(waste_report):
+    """True if the report's pending/processing job was most likely lost with its worker"""
+    if waste_report.classification_status not in ['pending', 'processing']:
+        return False
+    queued_at = waste_report.classification_queued_at
+    return queued_at is None or queued_at < _stale_before()
+
+
+classification_queue = ClassificationQueue()
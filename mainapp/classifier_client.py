@@ -0,0 +1,324 @@
+"""
+Process-wide client for the remote Gemini classifier.
+
+The SDK is configured and the GenerativeModel built once per process instead
+of on every request. Each call carries a deadline, and a circuit breaker
+fails fast after repeated failures or timeouts so workers are not tied up
+while the remote service is degraded. After a cool-down a single probe
+request is let through (half-open); success closes the breaker again.
+
+The network call itself goes through a transport chosen by
+WASTE_CLASSIFIER_TRANSPORT: 'gemini' (live), 'record' (live, and every
+response is saved as a fixture) or 'replay' (fixtures served with
+configurable artificial latency and error rate, no network or API key).
+The Gemini SDK is heavy to import, so it is only loaded by the first live call.
+"""
+import hashlib
+import json
+import os
+import random
+import threading
+import time
+
+from django.conf import settings
+
+
+MODEL_NAME = "gemini-2.5-flash"
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling the remote model while the breaker is open"""
+
+
+class ReplayError(Exception):
+    """Simulated remote failure injected by ReplayTransport"""
+
+
+# Served by ReplayTransport when no fixtures have been recorded yet
+DEFAULT_FIXTURE_TEXT = json.dumps({
+    "waste_category": "single",
+    "materials_detected": [
+        {"material": "plastic_pet", "recyclable": True, "estimated_weight_kg": 0.03}
+    ],
+    "confidence": 85
+})
+
+
+class CircuitBreaker:
+    """Consecutive-failure circuit breaker with half-open probing"""
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, failure_threshold=5, reset_timeout=30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._lock = threading.Lock()
+        self._state = self.CLOSED
+        self._consecutive_failures = 0
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self._counters = {
+            'times_opened': 0,
+            'short_circuited': 0,
+        }
+
+    @property
+    def state(self):
+        with self._lock:
+            return self._current_state()
+
+    def _current_state(self):
+        if self._state == self.OPEN and time.monotonic() - self._opened_at >= self.reset_timeout:
+            self._state = self.HALF_OPEN
+            self._probe_in_flight = False
+        return self._state
+
+    def allow_request(self):
+        """Return True if a call may go ahead; only one probe is allowed when half-open"""
+        with self._lock:
+            state = self._current_state()
+            if state == self.CLOSED:
+                return True
+            if state == self.HALF_OPEN and not self._probe_in_flight:
+                self._probe_in_flight = True
+                return True
+            self._counters['short_circuited'] += 1
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self._state = self.CLOSED
+            self._consecutive_failures = 0
+            self._probe_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self._consecutive_failures += 1
+            if self._state == self.HALF_OPEN or self._consecutive_failures >= self.failure_threshold:
+                if self._state != self.OPEN:
+                    self._counters['times_opened'] += 1
+                self._state = self.OPEN
+                self._opened_at = time.monotonic()
+                self._probe_in_flight = False
+
+    def stats(self):
+        with self._lock:
+            state = self._current_state()
+            stats = dict(self._counters)
+            stats.update({
+                'state': state,
+                'consecutive_failures': self._consecutive_failures,
+                'failure_threshold': self.failure_threshold,
+                'reset_timeout_seconds': self.reset_timeout,
+            })
+            if state == self.OPEN:
+                stats['retry_in_seconds'] = round(self.reset_timeout - (time.monotonic() - self._opened_at), 1)
+        return stats
+
+
+def _is_timeout(error):
+    return isinstance(error, TimeoutError) or 'deadline' in type(error).__name__.lower() \
+        or 'timeout' in type(error).__name__.lower()
+
+
+class GeminiTransport:
+    """Live Gemini API calls through one long-lived GenerativeModel"""
+
+    requires_api_key = True
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._model = None
+        self._api_key = None
+
+    def _get_model(self, api_key):
+        with self._lock:
+            if self._model is None or api_key != self._api_key:
+                import google.generativeai as genai
+                genai.configure(api_key=api_key)
+                self._model = genai.GenerativeModel(MODEL_NAME)
+                self._api_key = api_key
+            return self._model
+
+    def generate(self, api_key, prompt, image_bytes, mime_type, timeout):
+        response = self._get_model(api_key).generate_content(
+            [
+                prompt,
+                {
+                    "mime_type": mime_type,
+                    "data": image_bytes
+                }
+            ],
+            request_options={"timeout": timeout}
+        )
+        return response.text
+
+
+def _fixture_name(image_bytes):
+    return hashlib.sha256(image_bytes).hexdigest() + '.json'
+
+
+class RecordingTransport:
+    """Wraps another transport and saves every response as a replay fixture"""
+
+    def __init__(self, inner, fixture_dir):
+        self.inner = inner
+        self.fixture_dir = str(fixture_dir)
+        self.requires_api_key = inner.requires_api_key
+
+    def generate(self, api_key, prompt, image_bytes, mime_type, timeout):
+        started = time.monotonic()
+        text = self.inner.generate(api_key, prompt, image_bytes, mime_type, timeout)
+        fixture = {
+            'text': text,
+            'mime_type': mime_type,
+            'image_bytes': len(image_bytes),
+            'latency_ms': round((time.monotonic() - started) * 1000, 1),
+        }
+        os.makedirs(self.fixture_dir, exist_ok=True)
+        with open(os.path.join(self.fixture_dir, _fixture_name(image_bytes)), 'w') as fixture_file:
+            json.dump(fixture, fixture_file, indent=2)
+        return text
+
+
+class ReplayTransport:
+    """
+    Serves recorded fixtures instead of calling Gemini.
+
+    The fixture recorded for the exact image is used when present; otherwise
+    one is picked deterministically from the directory, so any image can be
+    replayed. Latency is latency_ms +/- jitter_ms, and error_rate of the calls
+    raise ReplayError to exercise failure handling and the circuit breaker.
+    """
+
+    requires_api_key = False
+
+    def __init__(self, fixture_dir, latency_ms=0, jitter_ms=0, error_rate=0.0, seed=None):
+        self.fixture_dir = str(fixture_dir)
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._fixtures = None
+
+    def _fixture_names(self):
+        if self._fixtures is None:
+            if os.path.isdir(self.fixture_dir):
+                self._fixtures = sorted(n for n in os.listdir(self.fixture_dir) if n.endswith('.json'))
+            else:
+                self._fixtures = []
+        return self._fixtures
+
+    def _load_text(self, image_bytes):
+        name = _fixture_name(image_bytes)
+        names = self._fixture_names()
+        if name not in names:
+            if not names:
+                return DEFAULT_FIXTURE_TEXT
+            name = names[int(name[:8], 16) % len(names)]
+        with open(os.path.join(self.fixture_dir, name)) as fixture_file:
+            return json.load(fixture_file)['text']
+
+    def generate(self, api_key, prompt, image_bytes, mime_type, timeout):
+        with self._lock:
+            delay = max(0.0, self.latency_ms + self._random.uniform(-self.jitter_ms, self.jitter_ms)) / 1000
+            fail = self._random.random() < self.error_rate
+        if delay > timeout:
+            time.sleep(timeout)
+            raise TimeoutError(f"Replay latency {delay:.1f}s exceeded the {timeout}s deadline")
+        time.sleep(delay)
+        if fail:
+            raise ReplayError("Simulated classifier failure")
+        return self._load_text(image_bytes)
+
+
+def build_transport():
+    """Create the transport selected by WASTE_CLASSIFIER_TRANSPORT"""
+    name = getattr(settings, 'WASTE_CLASSIFIER_TRANSPORT', 'gemini')
+    fixture_dir = getattr(settings, 'CLASSIFIER_FIXTURE_DIR', settings.BASE_DIR / 'classifier_fixtures')
+    if name == 'record':
+        return RecordingTransport(GeminiTransport(), fixture_dir)
+    if name == 'replay':
+        return ReplayTransport(
+            fixture_dir,
+            latency_ms=getattr(settings, 'CLASSIFIER_REPLAY_LATENCY_MS', 0),
+            jitter_ms=getattr(settings, 'CLASSIFIER_REPLAY_JITTER_MS', 0),
+            error_rate=getattr(settings, 'CLASSIFIER_REPLAY_ERROR_RATE', 0.0),
+        )
+    return GeminiTransport()
+
+
+class GeminiClassifierClient:
+    """Long-lived Gemini model wrapper with per-call deadline and circuit breaker"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._transport = None
+        self.breaker = CircuitBreaker(
+            failure_threshold=getattr(settings, 'CLASSIFIER_BREAKER_FAILURE_THRESHOLD', 5),
+            reset_timeout=getattr(settings, 'CLASSIFIER_BREAKER_RESET_SECONDS', 30),
+        )
+        self._counters = {
+            'calls': 0,
+            'failures': 0,
+            'timeouts': 0,
+        }
+        self._last_latency = None
+
+    @property
+    def timeout(self):
+        return getattr(settings, 'CLASSIFIER_REMOTE_TIMEOUT_SECONDS', 20)
+
+    @property
+    def transport(self):
+        with self._lock:
+            if self._transport is None:
+                self._transport = build_transport()
+            return self._transport
+
+    def set_transport(self, transport):
+        """Swap the transport (e.g. a ReplayTransport for benchmarks)"""
+        with self._lock:
+            self._transport = transport
+
+    @property
+    def requires_api_key(self):
+        return self.transport.requires_api_key
+
+    def generate(self, api_key, prompt, image_bytes, mime_type):
+        """Send the prompt and image to Gemini and return the response text"""
+        if not self.breaker.allow_request():
+            raise CircuitOpenError("AI classifier is temporarily unavailable, please try again shortly")
+
+        started = time.monotonic()
+        with self._lock:
+            self._counters['calls'] += 1
+        try:
+            text = self.transport.generate(api_key, prompt, image_bytes, mime_type, self.timeout)
+        except Exception as e:
+            with self._lock:
+                self._counters['failures'] += 1
+                if _is_timeout(e):
+                    self._counters['timeouts'] += 1
+            self.breaker.record_failure()
+            raise
+
+        self._last_latency = time.monotonic() - started
+        self.breaker.record_success()
+        return text
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._counters)
+        stats['timeout_seconds'] = self.timeout
+        stats['transport'] = type(self.transport).__name__
+        if self._last_latency is not None:
+            stats['last_latency_ms'] = round(self._last_latency * 1000, 1)
+        stats['breaker'] = self.breaker.stats()
+        return stats
+
+
+classifier_client = GeminiClassifierClient()
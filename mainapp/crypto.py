@@ -0,0 +1,35 @@
+"""
+Fernet ciphers for Aadhaar numbers, built on first use.
+
+cryptography is imported only when a buyer is actually registered instead of
+whenever the views are loaded.
+"""
+import threading
+
+from .env import get_env
+
+
+_lock = threading.Lock()
+_process_cipher = None
+
+
+def process_cipher():
+    """Cipher with a key generated once per process (used by the REST API)"""
+    global _process_cipher
+    with _lock:
+        if _process_cipher is None:
+            from cryptography.fernet import Fernet
+            _process_cipher = Fernet(Fernet.generate_key())
+        return _process_cipher
+
+
+def env_cipher():
+    """Cipher using ENCRYPTION_KEY from the environment, or a fresh key if unset"""
+    from cryptography.fernet import Fernet
+
+    encryption_key = get_env('ENCRYPTION_KEY')
+    if not encryption_key:
+        encryption_key = Fernet.generate_key().decode()
+    if isinstance(encryption_key, str):
+        encryption_key = encryption_key.encode()
+    return Fernet(encryption_key)
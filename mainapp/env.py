@@ -0,0 +1,30 @@
+"""
+Environment variables from the project's .env file.
+
+python-dotenv is imported and the file read on the first lookup rather than
+at module import, so processes that never need a secret (most management
+commands) skip it.
+"""
+import os
+import threading
+
+
+_lock = threading.Lock()
+_loaded = False
+
+
+def load_env():
+    """Load .env into os.environ once per process"""
+    global _loaded
+    if _loaded:
+        return
+    with _lock:
+        if not _loaded:
+            from dotenv import load_dotenv
+            load_dotenv()
+            _loaded = True
+
+
+def get_env(name, default=None):
+    load_env()
+    return os.environ.get(name, default)
@@ -0,0 +1,82 @@
+"""
+Faceted counts for the waste marketplace.
+
+Each requested facet is one GROUP BY over the filtered reports, so a page of
+filters costs one query per facet instead of one count() per value. Results
+are cached for FACETS_CACHE_SECONDS under a key built from the scope (all
+pending reports for buyers, one user's reports otherwise) and the normalized
+filters, so a busy marketplace page mostly reads the cache.
+"""
+import hashlib
+import json
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, Q
+
+from .models import WasteReport
+
+
+# WasteReport fields that can be counted; they also act as ?field=a,b filters
+FACET_FIELDS = ['waste_type', 'city', 'waste_condition', 'quantity_type']
+
+# Free-text facets list only their most common values
+MAX_VALUES = {'city': 20}
+
+
+def field_filters(params):
+    """{field: [values]} of the facet filters in a query string"""
+    filters = {}
+    for field in FACET_FIELDS:
+        values = sorted({value.strip() for value in params.get(field, '').split(',') if value.strip()})
+        if values:
+            filters[field] = values
+    return filters
+
+
+def apply_field_filters(queryset, filters):
+    for field, values in filters.items():
+        if field == 'city':
+            # Cities are typed by hand: match them case-insensitively
+            condition = Q()
+            for value in values:
+                condition |= Q(city__iexact=value)
+            queryset = queryset.filter(condition)
+        else:
+            queryset = queryset.filter(**{f'{field}__in': values})
+    return queryset
+
+
+def facet_counts(queryset, facets):
+    """{'total': n, 'facets': {facet: [{value, label, count}]}} with one grouped query per facet"""
+    queryset = queryset.order_by()
+    result = {'total': None, 'facets': {}}
+    for facet in facets:
+        choices = dict(WasteReport._meta.get_field(facet).choices or [])
+        rows = queryset.values(facet).annotate(count=Count('pk', distinct=True))
+        values = sorted(((row[facet], row['count']) for row in rows), key=lambda item: (-item[1], item[0]))
+        if result['total'] is None:
+            # Every report falls in exactly one group of each facet
+            result['total'] = sum(count for _, count in values)
+        limit = MAX_VALUES.get(facet)
+        entries = []
+        for value, count in values[:limit]:
+            entry = {'value': value, 'count': count}
+            if choices:
+                entry['label'] = choices.get(value, value)
+            entries.append(entry)
+        result['facets'][facet] = entries
+    if result['total'] is None:
+        result['total'] = queryset.count()
+    return result
+
+
+def cached_facet_counts(scope, signature, queryset, facets):
+    """facet_counts() cached per scope and filter signature"""
+    digest = hashlib.sha1(json.dumps([scope, signature, facets], sort_keys=True).encode()).hexdigest()
+    key = f'facets:{digest}'
+    result = cache.get(key)
+    if result is None:
+        result = facet_counts(queryset, facets)
+        cache.set(key, result, getattr(settings, 'FACETS_CACHE_SECONDS', 30))
+    return result
@@ -2,8 +2,7 @@ from django import forms
 from django.contrib.auth.forms import UserCreationForm
 from django.contrib.auth.models import User
 from .models import Task, Note, WasteReport, Buyer
-from cryptography.fernet import Fernet
-import os
+from .crypto import env_cipher
 
 class TaskForm(forms.ModelForm):
     class Meta:
@@ -302,16 +301,7 @@ class BuyerRegistrationForm(UserCreationForm):
             
             # Encrypt Aadhaar number
             aadhaar = self.cleaned_data['aadhaar_number']
-            encryption_key = os.environ.get('ENCRYPTION_KEY')
-            
-            # Generate key if not exists
-            if not encryption_key:
-                encryption_key = Fernet.generate_key().decode()
-            
-            if isinstance(encryption_key, str):
-                encryption_key = encryption_key.encode()
-                
-            cipher = Fernet(encryption_key)
+            cipher = env_cipher()
             encrypted_aadhaar = cipher.encrypt(aadhaar.encode()).decode()
             
             # Create Buyer profile
@@ -321,7 +311,6 @@ class BuyerRegistrationForm(UserCreationForm):
                 mobile_number=self.cleaned_data['mobile_number'],
                 shop_name=self.cleaned_data['shop_name'],
                 shop_type=self.cleaned_data['shop_type'],
-                waste_categories_handled=list(self.cleaned_data['waste_categories_handled']),
                 shop_address=self.cleaned_data['shop_address'],
                 shop_photo=self.cleaned_data.get('shop_photo'),
                 aadhaar_number=encrypted_aadhaar,
@@ -329,5 +318,6 @@ class BuyerRegistrationForm(UserCreationForm):
                 trade_license=self.cleaned_data['trade_license'],
                 is_verified=False
             )
+            buyer.set_categories(self.cleaned_data['waste_categories_handled'])
             
         return user
@@ -0,0 +1,182 @@
+"""
+Geohash helpers for radius searches without PostGIS.
+
+Every WasteReport with coordinates stores its geohash, indexed together with
+status. A "near me" query picks the geohash precision whose cells are at
+least as large as the radius, so the search circle always lies within the
+3x3 block of cells around the centre. Each of those nine prefixes becomes a
+range scan on the (status, geohash) index, a latitude/longitude bounding box
+trims the candidates, and they are ranked by exact haversine distance. The number of rows read
+depends on how many reports are near the point, not on the table size.
+"""
+import math
+
+from django.db.models import Q
+
+
+BASE32 = '0123456789bcdefghjkmnpqrstuvwxyz'
+EARTH_RADIUS_KM = 6371.0088
+
+# Stored precision: 9 characters is a cell of about 5 x 5 m
+GEOHASH_PRECISION = 9
+
+
+def encode(latitude, longitude, precision=GEOHASH_PRECISION):
+    """Geohash of a point"""
+    lat_range = [-90.0, 90.0]
+    lng_range = [-180.0, 180.0]
+    latitude, longitude = float(latitude), float(longitude)
+    chars = []
+    bits = 0
+    value = 0
+    even = True
+    while len(chars) < precision:
+        interval, coordinate = (lng_range, longitude) if even else (lat_range, latitude)
+        middle = (interval[0] + interval[1]) / 2
+        value <<= 1
+        if coordinate >= middle:
+            value |= 1
+            interval[0] = middle
+        else:
+            interval[1] = middle
+        even = not even
+        bits += 1
+        if bits == 5:
+            chars.append(BASE32[value])
+            bits = value = 0
+    return ''.join(chars)
+
+
+def cell_size(precision):
+    """(height, width) in degrees of a geohash cell"""
+    lng_bits = (5 * precision + 1) // 2
+    lat_bits = 5 * precision // 2
+    return 180.0 / 2 ** lat_bits, 360.0 / 2 ** lng_bits
+
+
+def radius_degrees(latitude, radius_km):
+    """(dlat, dlng) in degrees spanned by a circle around a point, dlng None if it reaches a pole"""
+    angular = radius_km / EARTH_RADIUS_KM
+    dlat = math.degrees(angular)
+    if abs(float(latitude)) + dlat >= 90:
+        return dlat, None
+    return dlat, math.degrees(math.asin(min(1.0, math.sin(angular) / math.cos(math.radians(float(latitude))))))
+
+
+def precision_for_radius(latitude, radius_km):
+    """Longest precision whose cells are at least as high and wide as the search circle's radius"""
+    dlat, dlng = radius_degrees(latitude, radius_km)
+    if dlng is None:
+        return 1
+    for precision in range(GEOHASH_PRECISION, 0, -1):
+        height, width = cell_size(precision)
+        if height >= dlat and width >= dlng:
+            return precision
+    return 1
+
+
+def covering_cells(latitude, longitude, radius_km):
+    """Geohash prefixes of the 3x3 cells around the point, which cover the search circle"""
+    precision = precision_for_radius(latitude, radius_km)
+    height, width = cell_size(precision)
+    cells = set()
+    for dlat in (-height, 0, height):
+        lat = float(latitude) + dlat
+        if not -90 <= lat <= 90:
+            continue
+        for dlng in (-width, 0, width):
+            lng = (float(longitude) + dlng + 180) % 360 - 180
+            cells.add(encode(lat, lng, precision))
+    return sorted(cells)
+
+
+def box_cells(latitude, longitude, radius_km, max_cells=32):
+    """
+    Geohash prefixes tiling the circle's bounding box, at the longest precision
+    that needs at most max_cells. A tighter cover than covering_cells() for
+    in-memory lookups, where each extra prefix is cheap.
+    """
+    min_lat, max_lat, min_lng, max_lng = bounding_box(latitude, longitude, radius_km)
+    if min_lng is None:
+        return covering_cells(latitude, longitude, radius_km)
+    for precision in range(GEOHASH_PRECISION, 0, -1):
+        height, width = cell_size(precision)
+        first_row, last_row = int((min_lat + 90) // height), int((max_lat + 90) // height)
+        first_col, last_col = int((min_lng + 180) // width), int((max_lng + 180) // width)
+        if (last_row - first_row + 1) * (last_col - first_col + 1) > max_cells:
+            continue
+        return sorted({
+            encode(min(-90 + (row + 0.5) * height, 90.0), -180 + (col + 0.5) * width, precision)
+            for row in range(first_row, last_row + 1)
+            for col in range(first_col, last_col + 1)
+        })
+    return covering_cells(latitude, longitude, radius_km)
+
+
+def bounding_box(latitude, longitude, radius_km):
+    """(min_lat, max_lat, min_lng, max_lng), longitude bounds None near the poles or the antimeridian"""
+    latitude, longitude = float(latitude), float(longitude)
+    dlat, dlng = radius_degrees(latitude, radius_km)
+    min_lat, max_lat = max(latitude - dlat, -90.0), min(latitude + dlat, 90.0)
+    if dlng is None or longitude - dlng < -180 or longitude + dlng > 180:
+        return min_lat, max_lat, None, None
+    return min_lat, max_lat, longitude - dlng, longitude + dlng
+
+
+def haversine_km(lat1, lng1, lat2, lng2):
+    lat1, lng1, lat2, lng2 = (math.radians(float(v)) for v in (lat1, lng1, lat2, lng2))
+    a = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lng2 - lng1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+def prefix_range(prefix):
+    """
+    (low, high) such that low <= geohash < high exactly for geohashes starting
+    with prefix; high is None when nothing sorts after the prefix ('zz...').
+    High is the next prefix in the base32 alphabet, not prefix + a sentinel
+    character, so the range holds under case-insensitive collations too
+    (digits sort before lowercase letters in all of them).
+    """
+    stem = prefix.rstrip(BASE32[-1])
+    if not stem:
+        return prefix, None
+    return prefix, stem[:-1] + BASE32[BASE32.index(stem[-1]) + 1]
+
+
+def filter_within(queryset, latitude, longitude, radius_km, field_prefix=''):
+    """Prefilter a queryset to rows that may lie within radius_km (geohash cells + bounding box)"""
+    cells = Q()
+    prefixes = covering_cells(latitude, longitude, radius_km)
+    # Single-character cells do not cover circles around the poles; the bounding box alone does
+    if len(prefixes[0]) > 1:
+        for cell in prefixes:
+            # A range, not startswith: LIKE 'prefix%' (UPPER() LIKE for istartswith)
+            # is not an index range scan on every backend, geohash >= 'tdr1' AND
+            # geohash < 'tdr2' is, on the (status, geohash) index
+            low, high = prefix_range(cell)
+            bounds = {f'{field_prefix}geohash__gte': low}
+            if high is not None:
+                bounds[f'{field_prefix}geohash__lt'] = high
+            cells |= Q(**bounds)
+    min_lat, max_lat, min_lng, max_lng = bounding_box(latitude, longitude, radius_km)
+    queryset = queryset.filter(cells, **{
+        f'{field_prefix}latitude__gte': min_lat,
+        f'{field_prefix}latitude__lte': max_lat,
+    })
+    if min_lng is not None:
+        queryset = queryset.filter(**{
+            f'{field_prefix}longitude__gte': min_lng,
+            f'{field_prefix}longitude__lte': max_lng,
+        })
+    return queryset
+
+
+def rank_by_distance(points, latitude, longitude, radius_km, limit=None):
+    """[(distance_km, key)] for (key, lat, lng) points within the radius, nearest first"""
+    ranked = []
+    for key, point_lat, point_lng in points:
+        distance = haversine_km(latitude, longitude, point_lat, point_lng)
+        if distance <= radius_km:
+            ranked.append((distance, key))
+    ranked.sort(key=lambda item: item[0])
+    return ranked[:limit] if limit else ranked
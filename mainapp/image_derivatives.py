@@ -0,0 +1,261 @@
+"""
+Resized WebP/JPEG derivatives of uploaded photos.
+
+List pages and API list endpoints should not ship the original upload (often
+several MB) for a 200px card. After a WasteReport image or Buyer shop photo is
+saved, the photo is rendered at IMAGE_DERIVATIVE_WIDTHS in each of
+IMAGE_DERIVATIVE_FORMATS with EXIF (GPS, camera data) stripped, and the
+variants are recorded in the model's ``*_derivatives`` JSON field.
+
+Decoding and encoding are CPU bound, so rendering runs in a process pool;
+a small thread pool reads the source, waits for the render and writes the
+files and the JSON back without holding up the request.
+
+Derivatives are written to the default storage under names derived from the
+source name. Originals are content addressed (media_storage.py), so rows
+sharing a photo share its derivatives: they are rendered once and only
+deleted when no row uses that source any more. Rows sharing a source are
+found through the (indexed) image column, which always equals the source of
+current derivatives, so the check on every delete is an index lookup.
+"""
+import io
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from PIL import Image, ImageOps
+
+
+FORMAT_EXTENSIONS = {
+    'WEBP': 'webp',
+    'JPEG': 'jpg',
+}
+
+# (model label, image field, JSON field) of every derivative-enabled image
+DERIVATIVE_FIELDS = [
+    ('mainapp.WasteReport', 'image', 'image_derivatives'),
+    ('mainapp.Buyer', 'shop_photo', 'shop_photo_derivatives'),
+]
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+def render_derivatives(image_bytes, widths, formats, quality):
+    """
+    Render one variant per (width, format). Runs in a worker process.
+
+    Widths wider than the photo are skipped; if all are, a single variant at
+    the original width is produced. Returns [(width, height, format, bytes)].
+    """
+    image = Image.open(io.BytesIO(image_bytes))
+    # JPEG: decode at the smallest 1/2^n scale still covering the widest variant
+    image.draft('RGB', (max(widths), max(widths)))
+    image = ImageOps.exif_transpose(image)
+    if image.mode in ('RGBA', 'LA', 'P'):
+        image = image.convert('RGBA')
+        background = Image.new('RGB', image.size, (255, 255, 255))
+        background.paste(image, mask=image.getchannel('A'))
+        image = background
+    elif image.mode != 'RGB':
+        image = image.convert('RGB')
+
+    targets = [width for width in sorted(set(widths)) if width < image.width] or [image.width]
+    variants = []
+    for width in targets:
+        height = max(1, round(image.height * width / image.width))
+        resized = image if width == image.width else image.resize((width, height), Image.LANCZOS)
+        for image_format in formats:
+            buffer = io.BytesIO()
+            # No exif= argument, so nothing from the original metadata is written
+            resized.save(buffer, format=image_format, quality=quality, optimize=image_format == 'JPEG')
+            variants.append((width, height, image_format, buffer.getvalue()))
+    return variants
+
+
+def derivative_name(source_name, width, image_format):
+    stem, _ = os.path.splitext(source_name)
+    return f"derivatives/{stem}_{width}w.{FORMAT_EXTENSIONS[image_format]}"
+
+
+def pick_variant(derivatives, width, image_format):
+    """Smallest variant at least ``width`` wide in the format, else the widest one"""
+    variants = [
+        v for v in (derivatives or {}).get('variants', [])
+        if v['format'] == FORMAT_EXTENSIONS.get(image_format.upper(), image_format.lower())
+    ]
+    if not variants:
+        return None
+    wide_enough = [v for v in variants if v['width'] >= width]
+    if wide_enough:
+        return min(wide_enough, key=lambda v: v['width'])
+    return max(variants, key=lambda v: v['width'])
+
+
+def derivative_url(field_file, derivatives, width, image_format='JPEG'):
+    """URL of the best derivative for a display width, falling back to the original"""
+    if not field_file:
+        return ''
+    variant = pick_variant(derivatives, width, image_format) \
+        if (derivatives or {}).get('source') == field_file.name else None
+    if variant is None:
+        return field_file.url if image_format.upper() == 'JPEG' else ''
+    return default_storage.url(variant['name'])
+
+
+def delete_derivatives(derivatives):
+    for variant in (derivatives or {}).get('variants', []):
+        try:
+            default_storage.delete(variant['name'])
+        except Exception as e:
+            print(f"Could not delete derivative {variant['name']}: {e}")
+
+
+def _image_field(model, json_field):
+    for label, image_field, field in DERIVATIVE_FIELDS:
+        if field == json_field and model._meta.label == label:
+            return image_field
+    raise ValueError(f'{model._meta.label}.{json_field} is not a derivatives field')
+
+
+def shared_derivatives(model, json_field, source, exclude_pk=None):
+    """Derivatives another row already recorded for the same source, or None"""
+    if not source:
+        return None
+    # The image column is indexed; the JSON condition only checks the few rows it finds
+    rows = model.objects.filter(**{_image_field(model, json_field): source, f'{json_field}__source': source})
+    if exclude_pk is not None:
+        rows = rows.exclude(pk=exclude_pk)
+    return rows.order_by('pk').values_list(json_field, flat=True).first()
+
+
+def release_derivatives(model, json_field, derivatives, exclude_pk=None):
+    """Delete derivatives unless another row still uses the same source photo"""
+    if shared_derivatives(model, json_field, (derivatives or {}).get('source'), exclude_pk) is None:
+        delete_derivatives(derivatives)
+
+
+class DerivativeGenerator:
+    """Renders derivatives in a process pool, driven by a small thread pool"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._processes = None
+        self._threads = None
+        self._counters = {
+            'generated': 0,
+            'failed': 0,
+            'shared': 0,
+            'original_bytes': 0,
+            'derivative_bytes': 0,
+        }
+
+    def _pools(self):
+        with self._lock:
+            if self._processes is None:
+                workers = _setting('IMAGE_DERIVATIVE_WORKERS', 2)
+                # spawn: forking a threaded server process is unsafe
+                self._processes = ProcessPoolExecutor(
+                    max_workers=workers, mp_context=multiprocessing.get_context('spawn')
+                )
+                self._threads = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='image-derivatives')
+            return self._processes, self._threads
+
+    def enqueue(self, model, pk, image_field, json_field):
+        """Generate derivatives for one row in the background"""
+        _, threads = self._pools()
+        return threads.submit(self._generate_in_thread, model, pk, image_field, json_field)
+
+    def _generate_in_thread(self, model, pk, image_field, json_field):
+        from django.db import close_old_connections, connection
+        close_old_connections()
+        try:
+            return self.generate(model, pk, image_field, json_field)
+        except Exception as e:
+            with self._lock:
+                self._counters['failed'] += 1
+            print(f"Image derivatives failed for {model.__name__} #{pk}: {e}")
+            return None
+        finally:
+            connection.close()
+
+    def generate(self, model, pk, image_field, json_field):
+        """Render, store and record derivatives for one row; returns the JSON written"""
+        instance = model.objects.filter(pk=pk).only('pk', image_field, json_field).first()
+        if instance is None:
+            return None
+        field_file = getattr(instance, image_field)
+        if not field_file:
+            return None
+
+        previous = getattr(instance, json_field) or {}
+        shared = shared_derivatives(model, json_field, field_file.name, exclude_pk=pk)
+        if shared and all(default_storage.exists(v['name']) for v in shared.get('variants', [])):
+            # Same content already rendered for another row
+            if model.objects.filter(pk=pk, **{image_field: field_file.name}).update(**{json_field: shared}):
+                if previous.get('source') != field_file.name:
+                    release_derivatives(model, json_field, previous, exclude_pk=pk)
+                with self._lock:
+                    self._counters['shared'] += 1
+                return shared
+            return None
+
+        with field_file.open('rb') as source:
+            image_bytes = source.read()
+
+        processes, _ = self._pools()
+        variants = processes.submit(
+            render_derivatives,
+            image_bytes,
+            list(_setting('IMAGE_DERIVATIVE_WIDTHS', [160, 480, 960])),
+            [f.upper() for f in _setting('IMAGE_DERIVATIVE_FORMATS', ['WEBP', 'JPEG'])],
+            _setting('IMAGE_DERIVATIVE_QUALITY', 80),
+        ).result()
+
+        storage = default_storage
+        derivatives = {
+            'source': field_file.name,
+            'original_bytes': len(image_bytes),
+            'variants': [],
+        }
+        for width, height, image_format, data in variants:
+            name = derivative_name(field_file.name, width, image_format)
+            if storage.exists(name):
+                storage.delete(name)
+            saved_name = storage.save(name, ContentFile(data))
+            derivatives['variants'].append({
+                'width': width,
+                'height': height,
+                'format': FORMAT_EXTENSIONS[image_format],
+                'name': saved_name,
+                'bytes': len(data),
+            })
+
+        # Only record the result if the photo was not replaced meanwhile
+        updated = model.objects.filter(pk=pk, **{image_field: field_file.name}).update(**{json_field: derivatives})
+        if previous.get('source') != field_file.name:
+            release_derivatives(model, json_field, previous, exclude_pk=pk)
+        else:
+            stale = [v for v in previous.get('variants', []) if v['name'] not in {d['name'] for d in derivatives['variants']}]
+            delete_derivatives({'variants': stale})
+        if not updated:
+            release_derivatives(model, json_field, derivatives, exclude_pk=pk)
+            return None
+
+        with self._lock:
+            self._counters['generated'] += 1
+            self._counters['original_bytes'] += len(image_bytes)
+            self._counters['derivative_bytes'] += sum(v['bytes'] for v in derivatives['variants'])
+        return derivatives
+
+    def stats(self):
+        with self._lock:
+            return dict(self._counters)
+
+
+derivative_generator = DerivativeGenerator()
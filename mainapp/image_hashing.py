@@ -0,0 +1,210 @@
+"""
+Perceptual hashing and near-duplicate lookup for classified images.
+
+A 64-bit difference hash (dHash) survives recompression, resizing and small
+edits, so two shots of the same waste pile land within a few bits of each
+other. Hashes are kept in a BK-tree for Hamming-distance range queries.
+
+Only images that were actually classified are indexed: a result borrowed from
+a near duplicate is cached under its own digest but never becomes a match
+target itself, so labels cannot drift along chains of similar images. Digests
+that turn out to be gone from the cache are removed from the tree, and the
+tree is rebuilt from the database once it holds TREE_HEADROOM times
+CLASSIFIER_CACHE_MAX_ENTRIES. The database keeps up to the limit itself, so a
+rebuilt tree starts at most half full and reloads stay rare even when the
+cache table is full.
+"""
+import io
+import threading
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import DatabaseError
+from django.utils import timezone
+from PIL import Image
+
+
+HASH_SIZE = 8
+
+# The tree may grow to this multiple of the cache limit before it is rebuilt
+TREE_HEADROOM = 2
+
+
+def dhash(image, hash_size=HASH_SIZE):
+    """Return the difference hash of a PIL image as an int"""
+    image = image.convert('L').resize((hash_size + 1, hash_size), Image.LANCZOS)
+    pixels = list(image.getdata())
+    value = 0
+    for row in range(hash_size):
+        offset = row * (hash_size + 1)
+        for col in range(hash_size):
+            value = (value << 1) | (pixels[offset + col] > pixels[offset + col + 1])
+    return value
+
+
+def perceptual_hash(image_bytes):
+    """Return the dHash of encoded image bytes as a 16-char hex string, or None"""
+    try:
+        image = Image.open(io.BytesIO(image_bytes))
+        # JPEG can decode straight to a reduced size, which is all dHash needs
+        image.draft('L', (64, 64))
+        return format(dhash(image), '016x')
+    except Exception as e:
+        print(f"Perceptual hash failed: {e}")
+        return None
+
+
+def hamming_distance(a, b):
+    return bin(a ^ b).count('1')
+
+
+class BKTree:
+    """Burkhard-Keller tree over integer hashes using Hamming distance"""
+
+    def __init__(self):
+        # Nodes are [hash, value, {distance: child}]; removed nodes keep routing with value None
+        self._root = None
+        self._size = 0
+        self.removed = 0
+
+    def add(self, key, value):
+        if self._root is None:
+            self._root = [key, value, {}]
+            self._size = 1
+            return
+        node = self._root
+        while True:
+            distance = hamming_distance(key, node[0])
+            if distance == 0:
+                # Same hash seen again: keep the newest value
+                if node[1] is None:
+                    self._size += 1
+                    self.removed -= 1
+                node[1] = value
+                return
+            child = node[2].get(distance)
+            if child is None:
+                node[2][distance] = [key, value, {}]
+                self._size += 1
+                return
+            node = child
+
+    def remove(self, key, value):
+        """Forget ``key`` if it still maps to ``value``; returns True if it did"""
+        node = self._root
+        while node is not None:
+            distance = hamming_distance(key, node[0])
+            if distance == 0:
+                if node[1] is None or node[1] != value:
+                    return False
+                node[1] = None
+                self._size -= 1
+                self.removed += 1
+                return True
+            node = node[2].get(distance)
+        return False
+
+    def search(self, key, max_distance):
+        """Return [(distance, hash, value)] within ``max_distance``, nearest first"""
+        if self._root is None:
+            return []
+        matches = []
+        stack = [self._root]
+        while stack:
+            node_key, value, children = stack.pop()
+            distance = hamming_distance(key, node_key)
+            if distance <= max_distance and value is not None:
+                matches.append((distance, node_key, value))
+            low, high = distance - max_distance, distance + max_distance
+            for child_distance, child in children.items():
+                if low <= child_distance <= high:
+                    stack.append(child)
+        matches.sort(key=lambda match: match[0])
+        return matches
+
+    def __len__(self):
+        return self._size
+
+
+class NearDuplicateIndex:
+    """Process-wide BK-tree of perceptual hashes -> cached image digests"""
+
+    def __init__(self):
+        self._tree = None
+        self._lock = threading.Lock()
+        self._counters = {'lookups': 0, 'matches': 0}
+
+    @property
+    def max_distance(self):
+        return getattr(settings, 'CLASSIFIER_NEAR_DUPLICATE_MAX_DISTANCE', 6)
+
+    @property
+    def max_size(self):
+        return getattr(settings, 'CLASSIFIER_CACHE_MAX_ENTRIES', 50000)
+
+    def _load(self):
+        """Build the tree from the persistent classification cache"""
+        from .models import ClassificationCacheEntry
+
+        tree = BKTree()
+        ttl = timedelta(seconds=getattr(settings, 'CLASSIFIER_CACHE_TTL_SECONDS', 60 * 60 * 24 * 30))
+        try:
+            rows = ClassificationCacheEntry.objects.filter(
+                last_used_at__gte=timezone.now() - ttl
+            ).exclude(perceptual_hash='').values_list('perceptual_hash', 'image_digest')
+            for phash, digest in rows.iterator():
+                tree.add(int(phash, 16), digest)
+        except DatabaseError as e:
+            print(f"Near-duplicate index load failed: {e}")
+        return tree
+
+    def _get_tree(self):
+        if self._tree is None:
+            self._tree = self._load()
+        return self._tree
+
+    def add(self, phash, digest):
+        """Index a classified image; the tree is rebuilt from the database when it grows too big"""
+        with self._lock:
+            tree = self._get_tree()
+            if len(tree) + tree.removed >= TREE_HEADROOM * self.max_size:
+                self._tree = None
+                tree = self._get_tree()
+            tree.add(int(phash, 16), digest)
+
+    def discard(self, phash, digest):
+        """Remove a digest that is no longer cached"""
+        with self._lock:
+            tree = self._tree
+            if tree is None or not tree.remove(int(phash, 16), digest):
+                return
+            # Removed nodes still cost search time: rebuild once they dominate
+            if tree.removed > max(len(tree), 64):
+                self._tree = None
+
+    def lookup(self, phash):
+        """Return [(digest, distance, indexed phash)] of indexed images within max_distance, nearest first"""
+        max_distance = self.max_distance
+        if max_distance is None:
+            return []
+        with self._lock:
+            self._counters['lookups'] += 1
+            matches = self._get_tree().search(int(phash, 16), max_distance)
+            if matches:
+                self._counters['matches'] += 1
+        return [(digest, distance, format(key, '016x')) for distance, key, digest in matches]
+
+    def reset(self):
+        """Drop the tree so it is rebuilt from the database on next use"""
+        with self._lock:
+            self._tree = None
+
+    def stats(self):
+        with self._lock:
+            counters = dict(self._counters)
+            counters['indexed'] = len(self._tree) if self._tree is not None else 0
+        counters['max_distance'] = self.max_distance
+        return counters
+
+
+near_duplicate_index = NearDuplicateIndex()
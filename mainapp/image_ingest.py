@@ -0,0 +1,149 @@
+"""
+Image ingest checks and normalization for the waste classifier.
+
+Uploads are sniffed by magic bytes and opened lazily with Pillow (which only
+parses the header) so broken or oversized files are rejected before any
+decoding. Accepted images are EXIF-rotated, downscaled to a maximum edge and
+re-encoded compactly before being sent to the remote model.
+"""
+import io
+
+from django.conf import settings
+from PIL import Image, ImageOps
+
+
+class InvalidImageError(ValueError):
+    """Raised when an upload is not an image the classifier can accept"""
+
+
+MAGIC_NUMBERS = [
+    (b'\xff\xd8\xff', 'JPEG'),
+    (b'\x89PNG\r\n\x1a\n', 'PNG'),
+    (b'GIF87a', 'GIF'),
+    (b'GIF89a', 'GIF'),
+    (b'BM', 'BMP'),
+]
+
+UNSUPPORTED_TYPE_MESSAGE = "Unsupported file type, please upload a JPG, PNG, WebP, GIF or BMP photo"
+
+OUTPUT_MIME_TYPES = {
+    'JPEG': 'image/jpeg',
+    'WEBP': 'image/webp',
+}
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+def sniff_format(header):
+    """Return the image format implied by the leading bytes, or None"""
+    if header[:4] == b'RIFF' and header[8:12] == b'WEBP':
+        return 'WEBP'
+    for magic, image_format in MAGIC_NUMBERS:
+        if header.startswith(magic):
+            return image_format
+    return None
+
+
+def _check_dimensions(width, height):
+    min_edge = _setting('CLASSIFIER_IMAGE_MIN_EDGE', 32)
+    max_pixels = _setting('CLASSIFIER_IMAGE_MAX_PIXELS', 50_000_000)
+    if min(width, height) < min_edge:
+        raise InvalidImageError(f"Image is too small ({width}x{height}), minimum edge is {min_edge}px")
+    if width * height > max_pixels:
+        raise InvalidImageError(f"Image is too large ({width}x{height})")
+
+
+def validate_image(image_file):
+    """
+    Cheaply validate an uploaded file without decoding it.
+
+    Returns (format, width, height) and leaves the file position at 0.
+    Raises InvalidImageError for unsupported or broken files.
+    """
+    max_bytes = _setting('CLASSIFIER_IMAGE_MAX_BYTES', 20 * 1024 * 1024)
+    size = getattr(image_file, 'size', None)
+    if size is not None and size > max_bytes:
+        raise InvalidImageError(f"Image file is too large ({size} bytes), maximum is {max_bytes} bytes")
+
+    image_file.seek(0)
+    header = image_file.read(16)
+    image_format = sniff_format(header)
+    if image_format is None:
+        raise InvalidImageError(UNSUPPORTED_TYPE_MESSAGE)
+
+    image_file.seek(0)
+    try:
+        with Image.open(image_file) as image:
+            width, height = image.size
+    except Exception as e:
+        raise InvalidImageError(f"Could not read image: {e}")
+    finally:
+        image_file.seek(0)
+
+    _check_dimensions(width, height)
+    return image_format, width, height
+
+
+def normalize_image(image_bytes):
+    """
+    Rotate, downscale and re-encode image bytes for the classifier.
+
+    Returns (bytes, mime_type, info) where info describes what was done.
+    """
+    image_format = sniff_format(image_bytes[:16])
+    if image_format is None:
+        raise InvalidImageError(UNSUPPORTED_TYPE_MESSAGE)
+
+    max_edge = _setting('CLASSIFIER_IMAGE_MAX_EDGE', 1024)
+    output_format = _setting('CLASSIFIER_IMAGE_FORMAT', 'JPEG').upper()
+    quality = _setting('CLASSIFIER_IMAGE_QUALITY', 85)
+
+    try:
+        image = Image.open(io.BytesIO(image_bytes))
+        original_size = image.size
+        _check_dimensions(*original_size)
+
+        # JPEG can decode at 1/2, 1/4 or 1/8 scale directly, saving memory and time
+        image.draft('RGB', (max_edge, max_edge))
+        orientation = image.getexif().get(0x0112, 1)
+        image = ImageOps.exif_transpose(image)
+
+        if image.mode in ('RGBA', 'LA', 'P'):
+            image = image.convert('RGBA')
+            background = Image.new('RGB', image.size, (255, 255, 255))
+            background.paste(image, mask=image.getchannel('A'))
+            image = background
+        elif image.mode != 'RGB':
+            image = image.convert('RGB')
+
+        if max(image.size) > max_edge:
+            image.thumbnail((max_edge, max_edge), Image.LANCZOS)
+    except InvalidImageError:
+        raise
+    except Exception as e:
+        raise InvalidImageError(f"Could not decode image: {e}")
+
+    info = {
+        'original_format': image_format,
+        'original_size': list(original_size),
+        'original_bytes': len(image_bytes),
+        'size': list(image.size),
+    }
+
+    # A small, upright JPEG is already as compact as we would make it
+    untouched = image.size == original_size and orientation == 1
+    if untouched and image_format == 'JPEG' and output_format == 'JPEG':
+        info['bytes'] = len(image_bytes)
+        return image_bytes, 'image/jpeg', info
+
+    buffer = io.BytesIO()
+    image.save(buffer, format=output_format, quality=quality, optimize=output_format == 'JPEG')
+    normalized = buffer.getvalue()
+
+    if untouched and image_format == output_format and len(normalized) >= len(image_bytes):
+        normalized = image_bytes
+
+    info['bytes'] = len(normalized)
+    return normalized, OUTPUT_MIME_TYPES.get(output_format, 'image/jpeg'), info
@@ -0,0 +1,263 @@
+"""
+Offline waste classifier built on NumPy image features.
+
+Each image is reduced to a small feature vector (HSV colour histogram plus
+brightness and texture statistics) and labelled by a weighted k-nearest-
+neighbour vote over a reference set of labelled images. The reference set is
+an .npz file produced by ``python manage.py build_local_classifier``.
+
+It runs on CPU in a few milliseconds, answers confident cases without a
+remote call, and keeps classification working when the remote model is down.
+
+Vote shares alone say nothing about how far an image is from everything in
+the reference set, so a selfie could win a unanimous vote. The reference set
+is therefore calibrated with the leave-one-out nearest-neighbour distances
+of its own images: images farther than that from every reference get no
+answer (the remote model decides), and confidence falls off with distance.
+"""
+import io
+import os
+import tempfile
+import threading
+
+import numpy as np
+from django.conf import settings
+from PIL import Image
+
+
+# Same material taxonomy as the Gemini prompt: (recyclable, typical weight in kg)
+MATERIAL_CATEGORIES = {
+    'iron': (True, 2.0),
+    'steel': (True, 1.0),
+    'aluminum': (True, 0.1),
+    'copper': (True, 0.5),
+    'plastic_pet': (True, 0.03),
+    'plastic_other': (True, 0.5),
+    'paper': (True, 0.5),
+    'cardboard': (True, 1.0),
+    'glass': (True, 0.5),
+    'organic': (False, 1.5),
+    'electronic': (True, 1.0),
+    'unknown': (False, 0.3),
+}
+
+FEATURE_SIZE = 64
+HUE_BINS, SATURATION_BINS, VALUE_BINS = 8, 3, 3
+NEIGHBOURS = 5
+
+# Out-of-distribution cut-off: this percentile of the reference set's own
+# nearest-neighbour distances, times the margin
+DISTANCE_PERCENTILE = 95
+DISTANCE_MARGIN = 1.25
+CALIBRATION_CHUNK = 512
+
+
+def extract_features(image):
+    """Return a float32 feature vector for a PIL image"""
+    image.draft('RGB', (FEATURE_SIZE * 2, FEATURE_SIZE * 2))
+    image = image.convert('RGB').resize((FEATURE_SIZE, FEATURE_SIZE), Image.BILINEAR)
+
+    hsv = np.asarray(image.convert('HSV'), dtype=np.float32) / 256.0
+    hue, saturation, value = hsv[..., 0], hsv[..., 1], hsv[..., 2]
+
+    # Joint HSV histogram, normalised to sum to 1
+    bins = (
+        (hue * HUE_BINS).astype(np.int32) * SATURATION_BINS * VALUE_BINS
+        + (saturation * SATURATION_BINS).astype(np.int32) * VALUE_BINS
+        + (value * VALUE_BINS).astype(np.int32)
+    )
+    histogram = np.bincount(bins.ravel(), minlength=HUE_BINS * SATURATION_BINS * VALUE_BINS).astype(np.float32)
+    histogram /= histogram.sum()
+
+    # Texture: gradient magnitude and Laplacian response of the grey image
+    grey = np.asarray(image.convert('L'), dtype=np.float32) / 255.0
+    grad_y, grad_x = np.gradient(grey)
+    magnitude = np.hypot(grad_x, grad_y)
+    laplacian = (
+        -4 * grey[1:-1, 1:-1]
+        + grey[:-2, 1:-1] + grey[2:, 1:-1]
+        + grey[1:-1, :-2] + grey[1:-1, 2:]
+    )
+
+    texture = np.array([
+        grey.mean(),
+        grey.std(),
+        saturation.mean(),
+        saturation.std(),
+        magnitude.mean(),
+        magnitude.std(),
+        (magnitude > 0.1).mean(),
+        laplacian.var(),
+    ], dtype=np.float32)
+
+    return np.concatenate([histogram, texture])
+
+
+def features_from_bytes(image_bytes):
+    return extract_features(Image.open(io.BytesIO(image_bytes)))
+
+
+def calibrate_distances(standardised):
+    """
+    (typical, maximum) nearest-neighbour distance for a standardised reference set.
+
+    typical is the median leave-one-out nearest-neighbour distance; maximum is
+    the out-of-distribution cut-off.
+    """
+    count = len(standardised)
+    if count < 2:
+        return 0.0, 0.0
+    squared = (standardised ** 2).sum(axis=1)
+    nearest = np.empty(count, dtype=np.float32)
+    for start in range(0, count, CALIBRATION_CHUNK):
+        stop = min(start + CALIBRATION_CHUNK, count)
+        block = squared[start:stop, None] + squared[None, :] - 2 * standardised[start:stop] @ standardised.T
+        np.maximum(block, 0, out=block)
+        # Leave each image out of its own neighbours
+        block[np.arange(stop - start), np.arange(start, stop)] = np.inf
+        nearest[start:stop] = np.sqrt(block.min(axis=1))
+    typical = float(np.median(nearest))
+    maximum = float(np.percentile(nearest, DISTANCE_PERCENTILE)) * DISTANCE_MARGIN
+    return typical, max(maximum, typical)
+
+
+def save_reference_set(path, features, labels):
+    """Write a reference set with per-feature standardisation and distance calibration"""
+    features = np.asarray(features, dtype=np.float32)
+    mean = features.mean(axis=0)
+    scale = features.std(axis=0)
+    scale[scale < 1e-6] = 1.0
+    typical, maximum = calibrate_distances((features - mean) / scale)
+
+    # Write next to the target and rename, so a running classifier never reads a partial file
+    directory = os.path.dirname(os.path.abspath(path))
+    handle, temporary = tempfile.mkstemp(suffix='.npz', dir=directory)
+    try:
+        with os.fdopen(handle, 'wb') as output:
+            np.savez_compressed(
+                output,
+                features=features,
+                labels=np.asarray(labels, dtype='U32'),
+                mean=mean,
+                scale=scale,
+                typical_distance=typical,
+                max_distance=maximum
+            )
+        os.replace(temporary, path)
+    except BaseException:
+        os.remove(temporary)
+        raise
+    return typical, maximum
+
+
+class LocalClassifier:
+    """k-NN over a labelled reference set of feature vectors"""
+
+    def __init__(self, reference_path=None):
+        self._reference_path = reference_path
+        self._lock = threading.Lock()
+        # (path, mtime, size) of the loaded file, or (path, None) if it was missing
+        self._loaded_version = None
+        # (standardised features, labels, mean, scale, typical distance, max distance),
+        # swapped in as one tuple
+        self._reference = None
+
+    @property
+    def reference_path(self):
+        if self._reference_path:
+            return str(self._reference_path)
+        return str(getattr(settings, 'LOCAL_CLASSIFIER_REFERENCE_PATH', settings.BASE_DIR / 'classifier_reference.npz'))
+
+    def _load(self):
+        """Current reference set; a file written (or rewritten) by another process is picked up"""
+        path = self.reference_path
+        try:
+            stat = os.stat(path)
+            version = (path, stat.st_mtime_ns, stat.st_size)
+        except OSError:
+            version = (path, None)
+        with self._lock:
+            if version == self._loaded_version:
+                return self._reference
+            self._reference = None
+            if version[1] is None:
+                print(f"Local classifier reference set not found: {path}")
+                self._loaded_version = version
+                return None
+            try:
+                with np.load(path, allow_pickle=False) as data:
+                    mean, scale = data['mean'], data['scale']
+                    standardised = (data['features'] - mean) / scale
+                    labels = data['labels']
+                    if 'max_distance' in data.files:
+                        typical, maximum = float(data['typical_distance']), float(data['max_distance'])
+                    else:
+                        # Built before calibration was stored
+                        typical, maximum = calibrate_distances(standardised)
+            except Exception as e:
+                # Not remembered as loaded, so the next call tries again
+                print(f"Local classifier reference set could not be read: {e}")
+                self._loaded_version = None
+                return None
+            self._reference = (standardised, labels, mean, scale, typical, maximum)
+            self._loaded_version = version
+            print(f"Local classifier loaded {len(labels)} reference images")
+            return self._reference
+
+    def reload(self):
+        with self._lock:
+            self._loaded_version = None
+
+    @property
+    def is_available(self):
+        return self._load() is not None
+
+    def classify(self, image_bytes):
+        """Return a classification dict in the remote model's format, or None"""
+        reference = self._load()
+        if reference is None:
+            return None
+        reference_features, labels, mean, scale, typical, maximum = reference
+        try:
+            features = features_from_bytes(image_bytes)
+        except Exception as e:
+            print(f"Local classifier could not read image: {e}")
+            return None
+
+        features = (features - mean) / scale
+        distances = np.linalg.norm(reference_features - features, axis=1)
+        k = min(NEIGHBOURS, len(distances))
+        nearest = np.argpartition(distances, k - 1)[:k]
+        nearest_distance = float(distances[nearest].min())
+        if nearest_distance > maximum:
+            # Unlike anything in the reference set (selfie, food, screenshot...)
+            return None
+
+        votes = {}
+        for index in nearest:
+            label = str(labels[index])
+            votes[label] = votes.get(label, 0.0) + 1.0 / (distances[index] + 1e-6)
+        material = max(votes, key=votes.get)
+        # Vote share, scaled down from 1 at a typical distance to 0 at the cut-off
+        closeness = 1.0 if maximum <= typical else (maximum - nearest_distance) / (maximum - typical)
+        closeness = min(1.0, max(0.0, closeness))
+        confidence = int(round(100 * closeness * votes[material] / sum(votes.values())))
+
+        recyclable, weight = MATERIAL_CATEGORIES.get(material, MATERIAL_CATEGORIES['unknown'])
+        return {
+            "waste_category": "single",
+            "materials_detected": [
+                {
+                    "material": material,
+                    "recyclable": recyclable,
+                    "estimated_weight_kg": weight
+                }
+            ],
+            "confidence": confidence,
+            "total_estimated_weight_kg": weight,
+            "nearest_distance": round(nearest_distance, 3),
+            "source": "local"
+        }
+
+
+local_classifier = LocalClassifier()
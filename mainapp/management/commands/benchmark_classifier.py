@@ -0,0 +1,226 @@
+"""
+Management command to load-test the classify endpoints offline
+Both classify_waste_api and the DRF classify action are driven through the
+replay transport, so no Gemini key or network access is needed
+
+Requests go through the real classify path, so replayed results land in the
+shared classification cache. Every cache row for the synthetic images is
+deleted afterwards and the near-duplicate index is rebuilt, so no fake label
+can be served to a real photo later.
+"""
+import random
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections
+from django.test import Client
+from django.test.utils import override_settings
+from rest_framework.test import APIClient
+
+from mainapp.classification_cache import classification_cache, image_digest
+from mainapp.classifier_client import ReplayTransport, classifier_client
+from mainapp.image_hashing import near_duplicate_index
+from mainapp.management.commands.benchmark_image_ingest import synthetic_photo
+from mainapp.models import ClassificationCacheEntry
+
+
+ENDPOINTS = {
+    'web': '/api/classify-waste/',
+    'api': '/api/waste-reports/classify/',
+}
+
+BENCHMARK_USERNAME = 'classifier_benchmark'
+
+# Digests per DELETE when dropping the benchmark's cache rows
+DELETE_BATCH_SIZE = 500
+
+
+class TimedTransport:
+    """Wraps a transport and measures how long calls are in flight"""
+
+    def __init__(self, inner):
+        self.inner = inner
+        self.requires_api_key = inner.requires_api_key
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.busy_seconds = 0.0
+
+    def generate(self, *args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return self.inner.generate(*args, **kwargs)
+        finally:
+            with self._lock:
+                self.calls += 1
+                self.busy_seconds += time.perf_counter() - started
+
+
+class Command(BaseCommand):
+    help = 'Benchmark the classify endpoints against replayed classifier responses'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--endpoint',
+            choices=['web', 'api', 'both'],
+            default='both',
+            help='classify_waste_api (web), the DRF classify action (api) or both (default: both)'
+        )
+        parser.add_argument('--requests', type=int, default=100, help='Requests per endpoint (default: 100)')
+        parser.add_argument('--concurrency', type=int, default=8, help='Concurrent clients (default: 8)')
+        parser.add_argument(
+            '--distinct-images',
+            type=int,
+            help='Number of distinct images to cycle through (default: one per request, i.e. no cache hits)'
+        )
+        parser.add_argument(
+            '--latency-ms',
+            type=float,
+            default=getattr(settings, 'CLASSIFIER_REPLAY_LATENCY_MS', 1500),
+            help='Replayed remote latency in ms'
+        )
+        parser.add_argument(
+            '--jitter-ms',
+            type=float,
+            default=getattr(settings, 'CLASSIFIER_REPLAY_JITTER_MS', 500),
+            help='Uniform jitter applied to the replayed latency in ms'
+        )
+        parser.add_argument(
+            '--error-rate',
+            type=float,
+            default=getattr(settings, 'CLASSIFIER_REPLAY_ERROR_RATE', 0.0),
+            help='Fraction of replayed calls that fail (0-1)'
+        )
+        parser.add_argument(
+            '--fixtures',
+            default=str(getattr(settings, 'CLASSIFIER_FIXTURE_DIR', settings.BASE_DIR / 'classifier_fixtures')),
+            help='Directory of recorded fixtures (WASTE_CLASSIFIER_TRANSPORT=record)'
+        )
+        parser.add_argument(
+            '--seed',
+            type=int,
+            help='Seed for latency, errors and images (default: random, so the persistent cache starts cold)'
+        )
+
+    def handle(self, *args, **options):
+        total = options['requests']
+        concurrency = options['concurrency']
+        if total < 1 or concurrency < 1:
+            raise CommandError('--requests and --concurrency must be at least 1')
+        if not 0 <= options['error_rate'] <= 1:
+            raise CommandError('--error-rate must be between 0 and 1')
+
+        endpoints = ['web', 'api'] if options['endpoint'] == 'both' else [options['endpoint']]
+        distinct = options['distinct_images'] or total * len(endpoints)
+        seed = options['seed'] if options['seed'] is not None else random.randrange(1 << 30)
+        self.stdout.write(f'Generating {distinct} synthetic image(s) (seed {seed})...')
+        images = [synthetic_photo((640, 480), seed=seed * 100003 + i) for i in range(distinct)]
+
+        user, _ = User.objects.get_or_create(username=BENCHMARK_USERNAME)
+        previous_transport = classifier_client.transport
+        transport = TimedTransport(ReplayTransport(
+            options['fixtures'],
+            latency_ms=options['latency_ms'],
+            jitter_ms=options['jitter_ms'],
+            error_rate=options['error_rate'],
+            seed=seed,
+        ))
+        classifier_client.set_transport(transport)
+        classification_cache.clear()
+
+        self.stdout.write(
+            f"\nReplay latency {options['latency_ms']:.0f}±{options['jitter_ms']:.0f} ms, "
+            f"error rate {options['error_rate']:.0%}, {concurrency} concurrent client(s)"
+        )
+        self.stdout.write(
+            f"\n{'Endpoint':<10}{'Reqs':>6}{'OK':>6}{'Err':>6}{'req/s':>8}"
+            f"{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'Remote':>8}{'Occupancy':>11}"
+        )
+        offset = 0
+        try:
+            with override_settings(ALLOWED_HOSTS=['*']):
+                for name in endpoints:
+                    self._run(name, user, images, offset, total, concurrency, transport)
+                    offset += total
+        finally:
+            classifier_client.set_transport(previous_transport)
+            user.delete()
+            cache_stats = classification_cache.stats()
+            removed = self._discard_cached_results(images)
+
+        self.stdout.write(f'\nRemoved {removed} benchmark result(s) from the classification cache')
+        breaker = classifier_client.breaker.stats()
+        self.stdout.write(self.style.SUCCESS(
+            f"\n📊 Cache hit rate {cache_stats['hit_rate']:.1%}, "
+            f"breaker {breaker['state']} (opened {breaker['times_opened']}x, "
+            f"{breaker['short_circuited']} short-circuited)"
+        ))
+        self.stdout.write(
+            '   Occupancy = share of client time spent waiting on the (replayed) remote call'
+        )
+
+    @staticmethod
+    def _discard_cached_results(images):
+        """Delete the cache rows stored for the synthetic images and forget them in this process"""
+        digests = sorted({image_digest(image_bytes) for image_bytes in images})
+        removed = 0
+        for start in range(0, len(digests), DELETE_BATCH_SIZE):
+            deleted, _ = ClassificationCacheEntry.objects.filter(
+                image_digest__in=digests[start:start + DELETE_BATCH_SIZE]
+            ).delete()
+            removed += deleted
+        classification_cache.clear()
+        near_duplicate_index.reset()
+        return removed
+
+    def _run(self, name, user, images, offset, total, concurrency, transport):
+        local = threading.local()
+        calls_before, busy_before = transport.calls, transport.busy_seconds
+
+        def get_client():
+            if not hasattr(local, 'client'):
+                if name == 'api':
+                    local.client = APIClient()
+                    local.client.force_authenticate(user=user)
+                else:
+                    local.client = Client()
+                    local.client.force_login(user)
+            return local.client
+
+        def send(index):
+            image_bytes = images[(offset + index) % len(images)]
+            upload = SimpleUploadedFile(f'bench_{index}.jpg', image_bytes, content_type='image/jpeg')
+            started = time.perf_counter()
+            try:
+                response = get_client().post(ENDPOINTS[name], {'image': upload})
+                # The DRF action reports classifier errors in a 200 body
+                ok = response.status_code == 200 and not response.json().get('error')
+            finally:
+                close_old_connections()
+            return time.perf_counter() - started, ok
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            results = list(executor.map(send, range(total)))
+        wall = time.perf_counter() - started
+
+        latencies = sorted(elapsed * 1000 for elapsed, _ in results)
+        ok = sum(1 for _, success in results if success)
+        remote_calls = transport.calls - calls_before
+        occupancy = (transport.busy_seconds - busy_before) / (wall * concurrency)
+        self.stdout.write(
+            f'{name:<10}{total:>6}{ok:>6}{total - ok:>6}{total / wall:>8.1f}'
+            f'{self._percentile(latencies, 50):>9.0f}{self._percentile(latencies, 95):>9.0f}'
+            f'{self._percentile(latencies, 99):>9.0f}{remote_calls:>8}{occupancy:>10.0%}'
+        )
+
+    @staticmethod
+    def _percentile(values, percent):
+        if len(values) == 1:
+            return values[0]
+        return statistics.quantiles(values, n=100, method='inclusive')[percent - 1]
@@ -0,0 +1,145 @@
+"""
+Management command to benchmark image normalization before classification
+Reports bytes saved and normalization latency per image size class
+"""
+import io
+import os
+import random
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from PIL import Image, ImageDraw, ImageFilter
+
+from mainapp.image_ingest import InvalidImageError, normalize_image
+
+
+# Typical phone camera outputs
+SIZE_CLASSES = [
+    ('VGA 0.3MP', (640, 480)),
+    ('HD 2MP', (1600, 1200)),
+    ('12MP', (4032, 3024)),
+    ('24MP', (6000, 4000)),
+]
+
+
+def synthetic_photo(size, seed):
+    """Build a photo-like JPEG (shapes + sensor noise) that compresses realistically"""
+    rng = random.Random(seed)
+    width, height = size
+    image = Image.new('RGB', (width // 4, height // 4), (rng.randint(60, 200),) * 3)
+    draw = ImageDraw.Draw(image)
+    for _ in range(60):
+        x, y = rng.randrange(width // 4), rng.randrange(height // 4)
+        radius = rng.randint(5, width // 16)
+        color = tuple(rng.randint(0, 255) for _ in range(3))
+        draw.ellipse((x - radius, y - radius, x + radius, y + radius), fill=color)
+    image = image.filter(ImageFilter.GaussianBlur(2)).resize(size, Image.BICUBIC)
+    noise = Image.effect_noise(size, 24).convert('RGB')
+    image = Image.blend(image, noise, 0.15)
+
+    buffer = io.BytesIO()
+    image.save(buffer, format='JPEG', quality=92)
+    return buffer.getvalue()
+
+
+class Command(BaseCommand):
+    help = 'Benchmark classifier image normalization: bytes saved and latency per size class'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--images',
+            help='Directory of real photos to benchmark instead of synthetic ones'
+        )
+        parser.add_argument(
+            '--repeat',
+            type=int,
+            default=5,
+            help='Normalization runs per image (default: 5)'
+        )
+
+    def handle(self, *args, **options):
+        repeat = max(1, options['repeat'])
+
+        if options['images']:
+            samples = self._load_directory(options['images'])
+        else:
+            self.stdout.write('Generating synthetic photos...')
+            samples = [
+                (label, synthetic_photo(size, seed=index))
+                for index, (label, size) in enumerate(SIZE_CLASSES)
+            ]
+
+        if not samples:
+            self.stdout.write(self.style.WARNING('No images to benchmark'))
+            return
+
+        self.stdout.write(
+            f"\n{'Size class':<14}{'Images':>7}{'Original':>12}{'Normalized':>12}{'Saved':>8}{'p50 ms':>9}{'max ms':>9}"
+        )
+        totals = [0, 0]
+        for label in dict.fromkeys(label for label, _ in samples):
+            original_bytes = normalized_bytes = 0
+            timings = []
+            count = 0
+            for sample_label, image_bytes in samples:
+                if sample_label != label:
+                    continue
+                try:
+                    for _ in range(repeat):
+                        started = time.perf_counter()
+                        normalized, _, info = normalize_image(image_bytes)
+                        timings.append((time.perf_counter() - started) * 1000)
+                except InvalidImageError as e:
+                    self.stdout.write(self.style.WARNING(f'Skipping image in {label}: {e}'))
+                    continue
+                original_bytes += len(image_bytes)
+                normalized_bytes += len(normalized)
+                count += 1
+
+            if not count:
+                continue
+            totals[0] += original_bytes
+            totals[1] += normalized_bytes
+            saved = 100 * (1 - normalized_bytes / original_bytes)
+            self.stdout.write(
+                f'{label:<14}{count:>7}{self._kb(original_bytes):>12}{self._kb(normalized_bytes):>12}'
+                f'{saved:>7.1f}%{statistics.median(timings):>9.1f}{max(timings):>9.1f}'
+            )
+
+        if totals[0]:
+            self.stdout.write(
+                self.style.SUCCESS(
+                    f'\n📊 Total: {self._kb(totals[0])} -> {self._kb(totals[1])} '
+                    f'({100 * (1 - totals[1] / totals[0]):.1f}% less upload to the classifier)'
+                )
+            )
+
+    def _load_directory(self, directory):
+        """Bucket real photos by megapixels"""
+        samples = []
+        for filename in sorted(os.listdir(directory)):
+            path = os.path.join(directory, filename)
+            if not os.path.isfile(path):
+                continue
+            with open(path, 'rb') as image_file:
+                image_bytes = image_file.read()
+            try:
+                with Image.open(io.BytesIO(image_bytes)) as image:
+                    megapixels = image.width * image.height / 1_000_000
+            except Exception:
+                continue
+            if megapixels < 1:
+                label = '< 1MP'
+            elif megapixels < 4:
+                label = '1-4MP'
+            elif megapixels < 13:
+                label = '4-13MP'
+            else:
+                label = '13MP+'
+            samples.append((label, image_bytes))
+        return samples
+
+    @staticmethod
+    def _kb(value):
+        return f'{value / 1024:.0f} KB'
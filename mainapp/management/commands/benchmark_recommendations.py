@@ -0,0 +1,161 @@
+"""
+Management command to benchmark buyer recommendations on synthetic buyers
+Reports index build time and per-query latency against a full scan
+
+Buyers are generated in memory around a set of city centres (nothing is
+written to the database), so 100k buyers can be measured on any machine.
+Every query's top-k is checked against the full scan.
+"""
+import random
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+
+from mainapp import geo
+from mainapp.models import WasteReport
+from mainapp.recommendations import (
+    MIXED, MIXED_MATCH, W_CATEGORY, W_DISTANCE, CandidateLists, buyer_quality,
+)
+
+
+# (latitude, longitude) of city centres buyers cluster around
+CITIES = [
+    (28.61, 77.21), (19.08, 72.88), (12.97, 77.59), (22.57, 88.36), (13.08, 80.27),
+    (17.39, 78.49), (18.52, 73.86), (23.02, 72.57), (26.91, 75.79), (26.85, 80.95),
+]
+CATEGORIES = [code for code, _ in WasteReport.WASTE_TYPE_CHOICES] + [MIXED]
+
+
+def synthetic_buyers(count, seed):
+    """Buyer rows as returned by recommendations.load_buyer_rows()"""
+    rng = random.Random(seed)
+    for buyer_id in range(1, count + 1):
+        if rng.random() < 0.1:
+            latitude = longitude = None
+        else:
+            city_lat, city_lng = rng.choice(CITIES)
+            latitude = city_lat + rng.gauss(0, 0.3)
+            longitude = city_lng + rng.gauss(0, 0.3)
+        rating_count = rng.randint(0, 40)
+        ended = rng.randint(0, 30)
+        quality = buyer_quality(
+            sum(rng.randint(1, 5) for _ in range(rating_count)), rating_count,
+            rng.randint(0, ended), ended,
+        )
+        codes = rng.sample(CATEGORIES, rng.randint(1, 4))
+        yield buyer_id, buyer_id + 1000000, latitude, longitude, quality, codes
+
+
+def full_scan(rows, waste_type, latitude, longitude, k, radius_km):
+    """Score every buyer handling the category: the reference result"""
+    scores = []
+    for buyer_id, _, buyer_lat, buyer_lng, quality, codes in rows:
+        if waste_type in codes:
+            score = W_CATEGORY
+        elif MIXED in codes:
+            score = W_CATEGORY * MIXED_MATCH
+        else:
+            continue
+        score += quality
+        if buyer_lat is not None:
+            distance = geo.haversine_km(latitude, longitude, buyer_lat, buyer_lng)
+            score += W_DISTANCE * max(0.0, 1 - distance / radius_km)
+        scores.append(score)
+    return sorted(scores, reverse=True)[:k]
+
+
+class Command(BaseCommand):
+    help = 'Benchmark buyer recommendations (candidate lists + top-k heap) against a full scan'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--buyers',
+            type=int,
+            default=100000,
+            help='Synthetic buyers to generate (default: 100000)'
+        )
+        parser.add_argument(
+            '--queries',
+            type=int,
+            default=200,
+            help='Waste reports to rank buyers for (default: 200)'
+        )
+        parser.add_argument(
+            '--top',
+            type=int,
+            default=10,
+            help='Buyers returned per query (default: 10)'
+        )
+        parser.add_argument(
+            '--radius-km',
+            type=float,
+            default=50,
+            help='Distance at which closeness stops counting (default: 50)'
+        )
+        parser.add_argument(
+            '--seed',
+            type=int,
+            default=1,
+            help='Random seed (default: 1)'
+        )
+
+    def handle(self, *args, **options):
+        k = max(1, options['top'])
+        radius_km = options['radius_km']
+        rng = random.Random(options['seed'])
+
+        self.stdout.write(f"Generating {options['buyers']} synthetic buyers...")
+        rows = list(synthetic_buyers(options['buyers'], options['seed']))
+
+        started = time.perf_counter()
+        lists = CandidateLists(rows)
+        build_ms = (time.perf_counter() - started) * 1000
+
+        index_ms, scan_ms, checked = [], [], []
+        mismatches = 0
+        for _ in range(max(1, options['queries'])):
+            city_lat, city_lng = rng.choice(CITIES)
+            latitude = city_lat + rng.gauss(0, 0.5)
+            longitude = city_lng + rng.gauss(0, 0.5)
+            waste_type = rng.choice(CATEGORIES)
+
+            started = time.perf_counter()
+            ranked, count = lists.top(waste_type, latitude, longitude, k, radius_km)
+            index_ms.append((time.perf_counter() - started) * 1000)
+            checked.append(count)
+
+            started = time.perf_counter()
+            expected = full_scan(rows, waste_type, latitude, longitude, k, radius_km)
+            scan_ms.append((time.perf_counter() - started) * 1000)
+
+            if [round(score, 9) for score, _, _ in ranked] != [round(score, 9) for score in expected]:
+                mismatches += 1
+
+        self.stdout.write(f'Index built in {build_ms:.0f} ms')
+        self.stdout.write(
+            f"\n{'Method':<16}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'Checked/query':>14}"
+        )
+        self.stdout.write(
+            f"{'Candidate lists':<16}{self._percentile(index_ms, 50):>9.2f}{self._percentile(index_ms, 95):>9.2f}"
+            f'{self._percentile(index_ms, 99):>9.2f}{statistics.mean(checked):>14.0f}'
+        )
+        self.stdout.write(
+            f"{'Full scan':<16}{self._percentile(scan_ms, 50):>9.2f}{self._percentile(scan_ms, 95):>9.2f}"
+            f"{self._percentile(scan_ms, 99):>9.2f}{len(rows):>14}"
+        )
+
+        summary = (
+            f'\n📊 {len(index_ms)} queries over {len(rows)} buyers: '
+            f'{statistics.median(scan_ms) / statistics.median(index_ms):.0f}x faster than a full scan at p50'
+        )
+        if mismatches:
+            self.stdout.write(self.style.ERROR(f'{summary}, {mismatches} top-{k} result(s) differ'))
+        else:
+            self.stdout.write(self.style.SUCCESS(f'{summary}, all top-{k} results identical'))
+
+    @staticmethod
+    def _percentile(values, percent):
+        if len(values) == 1:
+            return values[0]
+        return statistics.quantiles(values, n=100, method='inclusive')[percent - 1]
@@ -0,0 +1,125 @@
+"""
+Management command to build the reference set for the offline waste classifier
+Labelled examples come from a directory of images and/or from waste reports
+the remote model has already classified with high confidence
+"""
+import os
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from mainapp.local_classifier import (
+    MATERIAL_CATEGORIES, LocalClassifier, features_from_bytes, local_classifier, save_reference_set
+)
+from mainapp.models import WasteReport
+
+
+class Command(BaseCommand):
+    help = 'Build the NumPy reference set used by the local (offline) waste classifier'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--from-dir',
+            help='Directory with one sub-directory of images per material (e.g. plastic_pet/, cardboard/)'
+        )
+        parser.add_argument(
+            '--from-reports',
+            action='store_true',
+            help='Use waste reports already classified by the remote model'
+        )
+        parser.add_argument(
+            '--min-confidence',
+            type=int,
+            default=80,
+            help='Minimum remote confidence for a report to be used as a label (default: 80)'
+        )
+        parser.add_argument(
+            '--output',
+            help='Where to write the .npz reference set (default: LOCAL_CLASSIFIER_REFERENCE_PATH)'
+        )
+
+    def handle(self, *args, **options):
+        if not options['from_dir'] and not options['from_reports']:
+            raise CommandError('Provide --from-dir and/or --from-reports')
+
+        self._sample_path = None
+        features, labels = [], []
+        if options['from_dir']:
+            self._add_directory(options['from_dir'], features, labels)
+        if options['from_reports']:
+            self._add_reports(options['min_confidence'], features, labels)
+
+        if not features:
+            raise CommandError('No labelled images found')
+
+        output = options['output'] or local_classifier.reference_path
+        typical, maximum = save_reference_set(output, features, labels)
+        local_classifier.reload()
+
+        counts = {}
+        for label in labels:
+            counts[label] = counts.get(label, 0) + 1
+        self.stdout.write(self.style.SUCCESS(f'\n📊 Wrote {len(labels)} reference image(s) to {output}'))
+        for label, count in sorted(counts.items()):
+            self.stdout.write(f'   - {label}: {count}')
+        self.stdout.write(
+            f'   Nearest-neighbour distance: typical {typical:.2f}, images beyond {maximum:.2f} are left to the remote model'
+        )
+
+        # Rough latency check against the freshly written set
+        if self._sample_path:
+            with open(self._sample_path, 'rb') as sample:
+                sample_bytes = sample.read()
+            classifier = LocalClassifier(output)
+            classifier.classify(sample_bytes)
+            runs = 20
+            started = time.perf_counter()
+            for _ in range(runs):
+                classifier.classify(sample_bytes)
+            elapsed_ms = (time.perf_counter() - started) * 1000 / runs
+            self.stdout.write(f'   Average local classification time: {elapsed_ms:.1f} ms')
+
+    def _add_directory(self, directory, features, labels):
+        for material in sorted(os.listdir(directory)):
+            material_dir = os.path.join(directory, material)
+            if not os.path.isdir(material_dir):
+                continue
+            if material not in MATERIAL_CATEGORIES:
+                self.stdout.write(self.style.WARNING(f'Skipping unknown material folder: {material}'))
+                continue
+            for filename in sorted(os.listdir(material_dir)):
+                path = os.path.join(material_dir, filename)
+                if self._add_image(path, material, features, labels):
+                    self._sample_path = self._sample_path or path
+
+    def _add_reports(self, min_confidence, features, labels):
+        reports = WasteReport.objects.filter(
+            classification_status='completed'
+        ).exclude(image='').only('id', 'image', 'ai_classification')
+
+        for report in reports.iterator():
+            result = report.ai_classification or {}
+            materials = [
+                m for m in result.get('materials_detected', [])
+                if m.get('material') in MATERIAL_CATEGORIES and m.get('material') != 'unknown'
+            ]
+            if result.get('source') == 'local' or result.get('confidence', 0) < min_confidence or not materials:
+                continue
+            # Label the image with its heaviest detected material
+            material = max(materials, key=lambda m: m.get('estimated_weight_kg', 0))['material']
+            try:
+                path = report.image.path
+            except NotImplementedError:
+                continue
+            if self._add_image(path, material, features, labels):
+                self._sample_path = self._sample_path or path
+
+    def _add_image(self, path, material, features, labels):
+        try:
+            with open(path, 'rb') as image_file:
+                features.append(features_from_bytes(image_file.read()))
+        except Exception as e:
+            self.stdout.write(self.style.WARNING(f'Skipping {path}: {e}'))
+            return False
+        labels.append(material)
+        return True
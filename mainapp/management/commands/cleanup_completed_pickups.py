@@ -40,9 +40,11 @@ class Command(BaseCommand):
             history = PickupHistory.objects.create(
                 user=request.user,
                 user_username=request.user.username,
+                buyer=request.buyer,
                 buyer_shop_name=request.buyer.shop_name,
                 waste_type=waste_report.get_waste_type_display(),
                 quantity=waste_report.quantity_display,
+                weight_kg=waste_report.weight_kg,
                 location=waste_report.location or "Location not specified",
                 offered_price=request.offered_price,
                 reported_at=waste_report.created_at,
@@ -0,0 +1,62 @@
+"""
+Management command to abort expired resumable uploads and delete their part files
+Run this periodically (e.g., via cron job or task scheduler)
+"""
+import os
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from datetime import timedelta
+from mainapp.models import UploadSession
+from mainapp.resumable_uploads import CHUNK_SUFFIX, discard, part_path, upload_dir
+
+
+class Command(BaseCommand):
+    help = 'Abort upload sessions idle longer than UPLOAD_SESSION_TTL_HOURS and delete leftover part and chunk files'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--hours',
+            type=int,
+            help='Idle hours before an upload is aborted (default: UPLOAD_SESSION_TTL_HOURS)'
+        )
+
+    def handle(self, *args, **options):
+        hours = options['hours'] or getattr(settings, 'UPLOAD_SESSION_TTL_HOURS', 24)
+        cutoff_time = timezone.now() - timedelta(hours=hours)
+
+        expired = UploadSession.objects.filter(status='uploading', updated_at__lt=cutoff_time)
+        aborted_count = 0
+        freed_bytes = 0
+        for session in expired:
+            path = part_path(session)
+            if os.path.exists(path):
+                freed_bytes += os.path.getsize(path)
+            discard(session)
+            aborted_count += 1
+        expired.update(status='aborted')
+
+        # Part files whose session no longer exists or is finished, and chunk
+        # files left behind by a worker that died while receiving them
+        orphan_count = 0
+        if os.path.isdir(upload_dir()):
+            active = {str(pk) for pk in UploadSession.objects.filter(status='uploading').values_list('pk', flat=True)}
+            for entry in os.scandir(upload_dir()):
+                if entry.name.endswith('.part'):
+                    if entry.name[:-len('.part')] in active:
+                        continue
+                elif not entry.name.endswith(CHUNK_SUFFIX):
+                    continue
+                # Skip files written since the query above (a just-created session)
+                if entry.stat().st_mtime < cutoff_time.timestamp():
+                    freed_bytes += entry.stat().st_size
+                    os.remove(entry.path)
+                    orphan_count += 1
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'\n📊 Aborted {aborted_count} expired upload(s), removed {orphan_count} orphaned part/chunk file(s), '
+                f'freed {freed_bytes / 1024:.0f} KB'
+            )
+        )
@@ -0,0 +1,140 @@
+"""
+Management command to move existing media into content-addressed storage
+Rehashes every file referenced by WasteReport.image, Buyer.shop_photo and
+Buyer.trade_license, repoints the rows at ``<dir>/<sha[:2]>/<sha256><ext>``,
+deletes duplicate copies and recomputes the MediaBlob reference counts
+Best run at a quiet time; it is safe to run again
+"""
+import os
+import shutil
+
+from django.apps import apps
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Count
+
+from mainapp.image_derivatives import DERIVATIVE_FIELDS
+from mainapp.media_storage import MEDIA_FIELDS, ContentAddressedStorage, blob_name, content_sha256, media_storage
+from mainapp.models import MediaBlob
+
+
+class Command(BaseCommand):
+    help = 'Rehash existing media into content-addressed storage, removing duplicate files'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Only report what would be moved and how much space would be freed'
+        )
+
+    def handle(self, *args, **options):
+        dry_run = options['dry_run']
+        self._planned = set()
+        totals = {'files': 0, 'moved': 0, 'duplicates': 0, 'missing': 0, 'freed_bytes': 0}
+
+        self.stdout.write(f"\n{'Field':<28}{'Files':>8}{'Moved':>8}{'Dupes':>8}{'Missing':>9}{'Freed':>12}")
+        for label, field in MEDIA_FIELDS:
+            model = apps.get_model(label)
+            storage = model._meta.get_field(field).storage
+            if not isinstance(storage, ContentAddressedStorage):
+                raise CommandError(f'{label}.{field} is not content addressed (MEDIA_CONTENT_ADDRESSED is off)')
+
+            counts = {'files': 0, 'moved': 0, 'duplicates': 0, 'missing': 0, 'freed_bytes': 0}
+            names = model.objects.exclude(**{field: ''}).exclude(**{f'{field}__isnull': True}) \
+                .order_by().values_list(field, flat=True).distinct()
+            for name in names.iterator():
+                counts['files'] += 1
+                self._dedupe(model, field, storage, name, counts, dry_run)
+
+            self.stdout.write(
+                f"{f'{label}.{field}':<28}{counts['files']:>8}{counts['moved']:>8}{counts['duplicates']:>8}"
+                f"{counts['missing']:>9}{self._kb(counts['freed_bytes']):>12}"
+            )
+            for key in totals:
+                totals[key] += counts[key]
+
+        if not dry_run:
+            totals['freed_bytes'] += self._recount(media_storage())
+
+        prefix = 'Would free' if dry_run else 'Freed'
+        self.stdout.write(self.style.SUCCESS(
+            f"\n📊 {totals['files']} file(s) checked, {totals['moved']} moved, "
+            f"{totals['duplicates']} duplicate(s), {totals['missing']} missing. "
+            f"{prefix} {self._kb(totals['freed_bytes'])}"
+        ))
+
+    def _dedupe(self, model, field, storage, name, counts, dry_run):
+        if not storage.exists(name):
+            counts['missing'] += 1
+            self.stdout.write(self.style.WARNING(f'  Missing file: {name}'))
+            return
+
+        with storage.open(name, 'rb') as source:
+            digest = content_sha256(source)
+        target = blob_name(name, digest)
+        size = storage.size(name)
+        if target == name:
+            if not dry_run:
+                MediaBlob.objects.get_or_create(name=name, defaults={'sha256': digest, 'size': size})
+            return
+
+        duplicate = target in self._planned or storage.exists(target)
+        self._planned.add(target)
+        if duplicate:
+            counts['duplicates'] += 1
+            counts['freed_bytes'] += size
+        else:
+            counts['moved'] += 1
+        if dry_run:
+            return
+
+        if not duplicate:
+            # Link (or copy) first, so the rows never point at a missing file
+            os.makedirs(os.path.dirname(storage.path(target)), exist_ok=True)
+            try:
+                os.link(storage.path(name), storage.path(target))
+            except OSError:
+                shutil.copy2(storage.path(name), storage.path(target))
+
+        with transaction.atomic():
+            MediaBlob.objects.get_or_create(name=target, defaults={'sha256': digest, 'size': size})
+            model.objects.filter(**{field: name}).update(**{field: target})
+            self._repoint_derivatives(model, field, name, target)
+        os.remove(storage.path(name))
+
+    def _repoint_derivatives(self, model, field, name, target):
+        """Existing derivatives stay valid; only their recorded source name changes"""
+        for label, image_field, json_field in DERIVATIVE_FIELDS:
+            if apps.get_model(label) is not model or image_field != field:
+                continue
+            rows = model.objects.filter(**{field: target, f'{json_field}__source': name})
+            for pk, derivatives in rows.values_list('pk', json_field):
+                derivatives['source'] = target
+                model.objects.filter(pk=pk).update(**{json_field: derivatives})
+
+    def _recount(self, storage):
+        """Set every blob's ref_count from the rows; delete blobs nothing references"""
+        references = {}
+        for label, field in MEDIA_FIELDS:
+            model = apps.get_model(label)
+            for name, count in model.objects.exclude(**{field: ''}).order_by().values_list(field).annotate(n=Count('pk')):
+                if name:
+                    references[name] = references.get(name, 0) + count
+
+        freed_bytes = 0
+        for blob in MediaBlob.objects.iterator():
+            count = references.get(blob.name, 0)
+            if count:
+                if blob.ref_count != count:
+                    MediaBlob.objects.filter(pk=blob.pk).update(ref_count=count)
+            else:
+                blob.delete()
+                if storage.exists(blob.name):
+                    freed_bytes += storage.size(blob.name)
+                    storage.delete(blob.name)
+        return freed_bytes
+
+    @staticmethod
+    def _kb(value):
+        return f'{value / 1024:.0f} KB'
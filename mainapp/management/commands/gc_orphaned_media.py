@@ -0,0 +1,199 @@
+"""
+Management command to delete media files no database row references
+Run this periodically (e.g., via cron job or task scheduler)
+
+Referenced names (every FileField/ImageField, the derivatives recorded in the
+*_derivatives JSON fields and all MediaBlob rows) are written to a temporary
+on-disk SQLite index, then MEDIA_ROOT is walked with os.scandir and checked
+against it in batches, so memory use stays flat for millions of files.
+Files younger than the grace period are never touched: they may belong to an
+upload or derivative render whose row is not committed yet.
+"""
+import os
+import sqlite3
+import tempfile
+import time
+
+from django.apps import apps
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import models
+
+from mainapp.image_derivatives import DERIVATIVE_FIELDS
+from mainapp.models import MediaBlob
+
+
+def walk_files(root):
+    """Yield os.DirEntry for every file under root, depth first, without listing it all at once"""
+    stack = [root]
+    while stack:
+        try:
+            with os.scandir(stack.pop()) as entries:
+                for entry in entries:
+                    if entry.is_dir(follow_symlinks=False):
+                        stack.append(entry.path)
+                    elif entry.is_file(follow_symlinks=False):
+                        yield entry
+        except FileNotFoundError:
+            continue
+
+
+class ReferenceIndex:
+    """Set of referenced storage names kept in a temporary SQLite file"""
+
+    def __init__(self, directory):
+        self.connection = sqlite3.connect(os.path.join(directory, 'media_refs.sqlite3'))
+        self.connection.execute('PRAGMA journal_mode = OFF')
+        self.connection.execute('PRAGMA synchronous = OFF')
+        self.connection.execute('CREATE TABLE refs (name TEXT PRIMARY KEY) WITHOUT ROWID')
+        self.count = 0
+
+    def add_many(self, names):
+        batch = []
+        for name in names:
+            if name:
+                batch.append((name,))
+            if len(batch) >= 5000:
+                self._insert(batch)
+                batch = []
+        if batch:
+            self._insert(batch)
+
+    def _insert(self, batch):
+        cursor = self.connection.executemany('INSERT OR IGNORE INTO refs (name) VALUES (?)', batch)
+        self.count += cursor.rowcount
+        self.connection.commit()
+
+    def referenced(self, names):
+        """Subset of names present in the index"""
+        found = set()
+        names = list(names)
+        # Stay under SQLite's bound-parameter limit
+        for start in range(0, len(names), 500):
+            chunk = names[start:start + 500]
+            placeholders = ','.join('?' * len(chunk))
+            found.update(row[0] for row in self.connection.execute(
+                f'SELECT name FROM refs WHERE name IN ({placeholders})', chunk
+            ))
+        return found
+
+    def close(self):
+        self.connection.close()
+
+
+class Command(BaseCommand):
+    help = 'Delete media files older than the grace period that no database row references'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--grace-hours',
+            type=float,
+            help='Only delete files older than this many hours (default: MEDIA_GC_GRACE_HOURS)'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            help='Files checked and deleted per batch (default: 500)'
+        )
+        parser.add_argument(
+            '--max-per-second',
+            type=float,
+            default=0,
+            help='Limit deletions per second to spare the disk (default: unlimited)'
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Only report the orphaned files and their size'
+        )
+
+    def handle(self, *args, **options):
+        grace_hours = options['grace_hours']
+        if grace_hours is None:
+            grace_hours = getattr(settings, 'MEDIA_GC_GRACE_HOURS', 24)
+        cutoff = time.time() - grace_hours * 3600
+        batch_size = max(1, options['batch_size'])
+        self.dry_run = options['dry_run']
+        self.max_per_second = options['max_per_second']
+        self.counts = {'scanned': 0, 'recent': 0, 'orphans': 0, 'deleted': 0, 'bytes': 0}
+
+        root = str(settings.MEDIA_ROOT)
+        if not os.path.isdir(root):
+            self.stdout.write(self.style.WARNING(f'MEDIA_ROOT {root} does not exist'))
+            return
+
+        with tempfile.TemporaryDirectory(prefix='media-gc-') as directory:
+            index = ReferenceIndex(directory)
+            try:
+                self._build_index(index)
+                self.stdout.write(f'Indexed {index.count} referenced file name(s)')
+
+                batch = []
+                for entry in walk_files(root):
+                    self.counts['scanned'] += 1
+                    stat = entry.stat(follow_symlinks=False)
+                    if stat.st_mtime >= cutoff:
+                        self.counts['recent'] += 1
+                        continue
+                    name = os.path.relpath(entry.path, root).replace(os.sep, '/')
+                    batch.append((name, entry.path, stat.st_size))
+                    if len(batch) >= batch_size:
+                        self._collect(index, batch)
+                        batch = []
+                if batch:
+                    self._collect(index, batch)
+            finally:
+                index.close()
+
+        counts = self.counts
+        action = 'would be deleted' if self.dry_run else 'deleted'
+        deleted = counts['orphans'] if self.dry_run else counts['deleted']
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"\n📊 Scanned {counts['scanned']} file(s): {counts['orphans']} orphaned, "
+                f"{counts['recent']} within the {grace_hours:g}h grace period. "
+                f"{deleted} {action}, {counts['bytes'] / 1024:.0f} KB"
+            )
+        )
+
+    def _build_index(self, index):
+        for model in apps.get_models():
+            for field in model._meta.get_fields():
+                if isinstance(field, models.FileField):
+                    rows = model._default_manager.exclude(**{field.name: ''}).exclude(**{f'{field.name}__isnull': True})
+                    index.add_many(rows.values_list(field.name, flat=True).iterator(chunk_size=2000))
+
+        for label, _, json_field in DERIVATIVE_FIELDS:
+            rows = apps.get_model(label).objects.all()
+            index.add_many(
+                variant['name']
+                for derivatives in rows.values_list(json_field, flat=True).iterator(chunk_size=2000)
+                for variant in (derivatives or {}).get('variants', [])
+            )
+
+        index.add_many(MediaBlob.objects.values_list('name', flat=True).iterator(chunk_size=2000))
+
+    def _collect(self, index, batch):
+        referenced = index.referenced(name for name, _, _ in batch)
+        orphans = [item for item in batch if item[0] not in referenced]
+        if not orphans:
+            return
+        # A content-addressed upload may have started using an old file since the index was built
+        adopted = set(MediaBlob.objects.filter(name__in=[name for name, _, _ in orphans]).values_list('name', flat=True))
+        orphans = [item for item in orphans if item[0] not in adopted]
+
+        for name, path, size in orphans:
+            self.counts['orphans'] += 1
+            if self.dry_run:
+                self.counts['bytes'] += size
+                self.stdout.write(f'  {name}')
+                continue
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                continue
+            self.counts['deleted'] += 1
+            self.counts['bytes'] += size
+            if self.max_per_second:
+                time.sleep(1 / self.max_per_second)
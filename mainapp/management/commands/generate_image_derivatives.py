@@ -0,0 +1,101 @@
+"""
+Management command to generate resized WebP/JPEG derivatives for existing photos
+and report the storage and bandwidth savings
+"""
+from django.apps import apps
+from django.core.management.base import BaseCommand
+
+from mainapp.image_derivatives import DERIVATIVE_FIELDS, derivative_generator, pick_variant
+
+
+class Command(BaseCommand):
+    help = 'Generate missing image derivatives and report storage/bandwidth savings'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--force',
+            action='store_true',
+            help='Regenerate derivatives even where they are already up to date'
+        )
+        parser.add_argument(
+            '--report-only',
+            action='store_true',
+            help='Only print the savings report'
+        )
+
+    def handle(self, *args, **options):
+        if not options['report_only']:
+            self._generate(options['force'])
+        self._report()
+
+    def _generate(self, force):
+        futures = []
+        for label, image_field, json_field in DERIVATIVE_FIELDS:
+            model = apps.get_model(label)
+            rows = model.objects.exclude(**{image_field: ''}).exclude(**{f'{image_field}__isnull': True})
+            for pk, name, derivatives in rows.values_list('pk', image_field, json_field).iterator():
+                if force or (derivatives or {}).get('source') != name:
+                    futures.append((label, pk, derivative_generator.enqueue(model, pk, image_field, json_field)))
+
+        if not futures:
+            self.stdout.write('All derivatives are up to date')
+            return
+
+        self.stdout.write(f'Generating derivatives for {len(futures)} photo(s)...')
+        done = failed = 0
+        for label, pk, future in futures:
+            if future.result() is None:
+                failed += 1
+                self.stdout.write(self.style.WARNING(f'  {label} #{pk}: no derivatives written'))
+            else:
+                done += 1
+        self.stdout.write(self.style.SUCCESS(f'Generated derivatives for {done} photo(s), {failed} skipped/failed'))
+
+    def _report(self):
+        originals = 0
+        original_bytes = 0
+        by_variant = {}
+        card_bytes = {'jpg': 0, 'webp': 0}
+
+        for label, image_field, json_field in DERIVATIVE_FIELDS:
+            model = apps.get_model(label)
+            for name, derivatives in model.objects.values_list(image_field, json_field).iterator():
+                if not name or (derivatives or {}).get('source') != name:
+                    continue
+                originals += 1
+                original_bytes += derivatives['original_bytes']
+                for variant in derivatives['variants']:
+                    key = (variant['width'], variant['format'])
+                    count, total = by_variant.get(key, (0, 0))
+                    by_variant[key] = (count + 1, total + variant['bytes'])
+                for image_format in card_bytes:
+                    card = pick_variant(derivatives, 480, image_format)
+                    card_bytes[image_format] += card['bytes'] if card else derivatives['original_bytes']
+
+        if not originals:
+            self.stdout.write(self.style.WARNING('No photos with derivatives yet'))
+            return
+
+        self.stdout.write(f"\n{'Variant':<14}{'Photos':>8}{'Total':>12}{'Avg':>10}{'vs original':>13}")
+        self.stdout.write(f"{'original':<14}{originals:>8}{self._kb(original_bytes):>12}{self._kb(original_bytes / originals):>10}")
+        derivative_total = 0
+        for (width, image_format), (count, total) in sorted(by_variant.items()):
+            derivative_total += total
+            self.stdout.write(
+                f"{f'{width}w {image_format}':<14}{count:>8}{self._kb(total):>12}{self._kb(total / count):>10}"
+                f"{100 * total / original_bytes:>12.1f}%"
+            )
+
+        self.stdout.write(self.style.SUCCESS(
+            f'\n📊 Storage: derivatives add {self._kb(derivative_total)} '
+            f'({100 * derivative_total / original_bytes:.1f}% of the {self._kb(original_bytes)} of originals)'
+        ))
+        for image_format, total in card_bytes.items():
+            self.stdout.write(
+                f'   Bandwidth per list card ({image_format.upper()}): {self._kb(total / originals)} instead of '
+                f'{self._kb(original_bytes / originals)} ({100 * (1 - total / original_bytes):.1f}% saved)'
+            )
+
+    @staticmethod
+    def _kb(value):
+        return f'{value / 1024:.0f} KB'
@@ -0,0 +1,79 @@
+"""
+Management command to report process startup (import) time
+Runs a fresh interpreter with ``python -X importtime`` that sets up Django and
+imports the given modules, then prints the slowest modules and packages
+"""
+import os
+import subprocess
+import sys
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+
+DEFAULT_MODULES = ['mainapp.urls', 'mainapp.api_urls']
+
+
+def parse_importtime(output):
+    """Return [(module, self_us, cumulative_us)] from -X importtime stderr"""
+    rows = []
+    for line in output.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        try:
+            self_us, cumulative_us, name = line[len('import time:'):].split('|')
+            rows.append((name.strip(), int(self_us), int(cumulative_us)))
+        except ValueError:
+            continue
+    return rows
+
+
+class Command(BaseCommand):
+    help = 'Print an import-time breakdown of Django startup plus the given modules'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'modules',
+            nargs='*',
+            help=f"Modules to import after django.setup() (default: {' '.join(DEFAULT_MODULES)})"
+        )
+        parser.add_argument('--top', type=int, default=15, help='Rows to show per table (default: 15)')
+        parser.add_argument('--runs', type=int, default=3, help='Fresh interpreters to run, best is kept (default: 3)')
+
+    def handle(self, *args, **options):
+        modules = options['modules'] or DEFAULT_MODULES
+        code = 'import django; django.setup()\n' + ''.join(f'import {module}\n' for module in modules)
+        env = dict(os.environ, DJANGO_SETTINGS_MODULE=os.environ.get('DJANGO_SETTINGS_MODULE', 'myproject.settings'))
+
+        best = None
+        for _ in range(max(1, options['runs'])):
+            completed = subprocess.run(
+                [sys.executable, '-X', 'importtime', '-c', code],
+                cwd=str(settings.BASE_DIR), env=env, capture_output=True, text=True
+            )
+            if completed.returncode != 0:
+                raise CommandError(completed.stderr.strip().splitlines()[-1] if completed.stderr.strip() else 'Import failed')
+            rows = parse_importtime(completed.stderr)
+            total = sum(self_us for _, self_us, _ in rows)
+            if best is None or total < best[0]:
+                best = (total, rows)
+
+        total, rows = best
+        top = options['top']
+
+        self.stdout.write(f"\n{'Slowest modules (cumulative)':<60}{'ms':>9}")
+        for name, _, cumulative_us in sorted(rows, key=lambda row: -row[2])[:top]:
+            self.stdout.write(f'{name:<60}{cumulative_us / 1000:>9.1f}')
+
+        packages = {}
+        for name, self_us, _ in rows:
+            package = name.split('.')[0]
+            packages[package] = packages.get(package, 0) + self_us
+        self.stdout.write(f"\n{'Top-level packages (self time)':<60}{'ms':>9}{'share':>8}")
+        for package, self_us in sorted(packages.items(), key=lambda item: -item[1])[:top]:
+            self.stdout.write(f'{package:<60}{self_us / 1000:>9.1f}{100 * self_us / total:>7.1f}%')
+
+        self.stdout.write(self.style.SUCCESS(
+            f"\n📊 {len(rows)} modules imported in {total / 1000:.0f} ms "
+            f"(django.setup() + {', '.join(modules)})"
+        ))
@@ -0,0 +1,59 @@
+"""
+Management command to recompute the rating aggregates stored on Buyer
+Run this after bulk changes to BuyerRating that bypass model signals
+(queryset.update(), raw SQL, fixtures) or to check for drift
+"""
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from mainapp.models import Buyer
+
+
+AGGREGATE_FIELDS = ['rating_count', 'rating_sum'] + [f'rating_count_{stars}' for stars in range(1, 6)]
+
+
+class Command(BaseCommand):
+    help = 'Recompute Buyer rating_count, rating_sum and the 1-5 star histogram from BuyerRating'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            help='Buyers recomputed per batch (default: 500)'
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Only report the buyers whose stored aggregates are wrong'
+        )
+
+    def handle(self, *args, **options):
+        batch_size = max(1, options['batch_size'])
+        dry_run = options['dry_run']
+        checked = repaired = 0
+
+        buyer_ids = list(Buyer.objects.order_by('pk').values_list('pk', flat=True))
+        for start in range(0, len(buyer_ids), batch_size):
+            batch = buyer_ids[start:start + batch_size]
+            with transaction.atomic():
+                # Lock the rows so concurrent rating signals wait for the recount
+                stored = {
+                    row['pk']: row
+                    for row in Buyer.objects.select_for_update().filter(pk__in=batch).values('pk', *AGGREGATE_FIELDS)
+                }
+                for buyer_id, values in Buyer.rating_aggregates(batch).items():
+                    checked += 1
+                    current = stored.get(buyer_id)
+                    if current is None or all(current[field] == values[field] for field in AGGREGATE_FIELDS):
+                        continue
+                    repaired += 1
+                    self.stdout.write(
+                        f"  Buyer {buyer_id}: {current['rating_count']} rating(s) / sum {current['rating_sum']} "
+                        f"-> {values['rating_count']} / {values['rating_sum']}"
+                    )
+                    if not dry_run:
+                        Buyer.objects.filter(pk=buyer_id).update(**values)
+
+        action = 'would be repaired' if dry_run else 'repaired'
+        self.stdout.write(self.style.SUCCESS(f'\n📊 Checked {checked} buyer(s): {repaired} {action}'))
@@ -0,0 +1,36 @@
+"""
+Management command to requeue classification jobs lost with their worker
+Classification jobs live only in the web process's thread pool, so a restart
+or crash leaves their reports pending/processing forever. Run this at startup
+or periodically (e.g., via cron job or task scheduler); the requeued jobs are
+classified by this command's own worker pool before it exits.
+"""
+from django.core.management.base import BaseCommand
+from mainapp.classification_queue import schedule_classification, stale_classifications
+
+
+class Command(BaseCommand):
+    help = 'Requeue pending/processing classifications older than CLASSIFIER_JOB_TIMEOUT_SECONDS'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Show what would be requeued without queueing anything'
+        )
+
+    def handle(self, *args, **options):
+        dry_run = options['dry_run']
+
+        requeued_count = 0
+        for report in stale_classifications().exclude(image='').iterator():
+            if dry_run:
+                self.stdout.write(f'Would requeue report #{report.id} ({report.classification_status})')
+            else:
+                schedule_classification(report)
+            requeued_count += 1
+
+        prefix = 'Would requeue' if dry_run else 'Requeued'
+        self.stdout.write(
+            self.style.SUCCESS(f'\n📊 {prefix} {requeued_count} stale classification(s)')
+        )
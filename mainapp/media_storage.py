@@ -0,0 +1,170 @@
+"""
+Content-addressed, reference-counted storage for uploaded media.
+
+Report photos, shop photos and trade licenses are stored once per distinct
+content: a file is saved as ``<upload_to>/<sha[:2]>/<sha256><ext>`` and a
+MediaBlob row counts the model fields pointing at it. Uploading a file that
+is already stored only adds a reference; the file is removed when the last
+reference is released (row deleted or photo replaced, see signals.py).
+
+Files saved before this storage was enabled keep their original names and
+are not reference counted until ``manage.py dedupe_media`` rehashes them.
+"""
+import hashlib
+import os
+
+from django.apps import apps
+from django.conf import settings
+from django.core.files.move import file_move_safe
+from django.core.files.storage import FileSystemStorage, default_storage
+from django.db import transaction
+from django.db.models import F
+from django.utils.deconstruct import deconstructible
+
+
+BLOCK_SIZE = 64 * 1024
+
+# (model label, file field) of every field stored through this storage
+MEDIA_FIELDS = [
+    ('mainapp.WasteReport', 'image'),
+    ('mainapp.Buyer', 'shop_photo'),
+    ('mainapp.Buyer', 'trade_license'),
+]
+
+
+def content_sha256(content):
+    """Streaming SHA-256 of a Django File (or of its temporary file on disk)"""
+    digest = hashlib.sha256()
+    if hasattr(content, 'temporary_file_path'):
+        with open(content.temporary_file_path(), 'rb') as source:
+            for block in iter(lambda: source.read(BLOCK_SIZE), b''):
+                digest.update(block)
+    else:
+        for chunk in content.chunks(BLOCK_SIZE):
+            digest.update(chunk if isinstance(chunk, bytes) else chunk.encode())
+    return digest.hexdigest()
+
+
+def blob_name(name, digest):
+    """Content-addressed name in the same upload directory, keeping the extension"""
+    directory = os.path.dirname(name)
+    stem, ext = os.path.splitext(os.path.basename(name))
+    if stem == digest and os.path.basename(directory) == digest[:2]:
+        # Already content addressed, e.g. re-saved under its stored name
+        directory = os.path.dirname(directory)
+    ext = ext.lower()[:10]
+    return '/'.join(part for part in (directory, digest[:2], f'{digest}{ext}') if part)
+
+
+def count_references(name):
+    """Number of model fields currently pointing at a stored name"""
+    total = 0
+    for label, field in MEDIA_FIELDS:
+        total += apps.get_model(label).objects.filter(**{field: name}).count()
+    return total
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+    """FileSystemStorage that stores each distinct file once and counts references"""
+
+    def get_available_name(self, name, max_length=None):
+        # The final name depends on the content, it is chosen in _save()
+        return name
+
+    def _save(self, name, content):
+        MediaBlob = apps.get_model('mainapp', 'MediaBlob')
+        digest = content_sha256(content)
+        name = blob_name(name, digest)
+
+        with transaction.atomic():
+            # Row lock: a concurrent release cannot remove the file under us
+            blob, _ = MediaBlob.objects.select_for_update().get_or_create(
+                name=name, defaults={'sha256': digest, 'size': content.size, 'ref_count': 0}
+            )
+            if self.exists(name) or not self._write_new(name, content):
+                # Already stored: the name is derived from the content
+                if hasattr(content, 'temporary_file_path'):
+                    # Behave like a move: the temporary copy is not needed
+                    os.remove(content.temporary_file_path())
+            MediaBlob.objects.filter(pk=blob.pk).update(ref_count=F('ref_count') + 1)
+        return name
+
+    def _write_new(self, name, content):
+        """
+        Create the file for a new blob; returns False if it already exists.
+
+        FileSystemStorage._save() answers FileExistsError by asking
+        get_available_name() for another name, which here is the same name
+        again, so it would retry forever. An existing file under a
+        content-addressed name already holds this content, so it is used as is.
+        """
+        full_path = self.path(name)
+        os.makedirs(os.path.dirname(full_path), exist_ok=True)
+        try:
+            if hasattr(content, 'temporary_file_path'):
+                file_move_safe(content.temporary_file_path(), full_path)
+            else:
+                fd = os.open(full_path, self.OS_OPEN_FLAGS, 0o666)
+                try:
+                    with os.fdopen(fd, 'wb') as blob:
+                        for chunk in content.chunks(BLOCK_SIZE):
+                            blob.write(chunk if isinstance(chunk, bytes) else chunk.encode())
+                except Exception:
+                    # Never leave a partial file under a content-addressed name
+                    os.remove(full_path)
+                    raise
+        except FileExistsError:
+            return False
+        if self.file_permissions_mode is not None:
+            os.chmod(full_path, self.file_permissions_mode)
+        return True
+
+    def is_managed(self, name):
+        return apps.get_model('mainapp', 'MediaBlob').objects.filter(name=name).exists()
+
+    def release(self, name):
+        """
+        Drop one reference to a stored blob; the file is deleted after commit
+        once nothing points at it. Names without a MediaBlob are left alone.
+        Returns the remaining reference count (None if the name is unmanaged).
+        """
+        if not name:
+            return None
+        MediaBlob = apps.get_model('mainapp', 'MediaBlob')
+        with transaction.atomic():
+            blob = MediaBlob.objects.select_for_update().filter(name=name).first()
+            if blob is None:
+                return None
+            if blob.ref_count > 1:
+                MediaBlob.objects.filter(pk=blob.pk).update(ref_count=F('ref_count') - 1)
+                return blob.ref_count - 1
+            # Counts can drift if a name was assigned without an upload; trust the rows
+            remaining = count_references(name)
+            if remaining:
+                MediaBlob.objects.filter(pk=blob.pk).update(ref_count=remaining)
+                return remaining
+            blob.delete()
+        transaction.on_commit(lambda: self._delete_unreferenced(name))
+        return 0
+
+    def _delete_unreferenced(self, name):
+        # A new upload of the same content may have recreated the blob since
+        if not self.is_managed(name):
+            super().delete(name)
+
+    def delete(self, name):
+        if self.is_managed(name):
+            self.release(name)
+        else:
+            super().delete(name)
+
+
+content_addressed_storage = ContentAddressedStorage()
+
+
+def media_storage():
+    """Storage for uploaded media fields (callable, so migrations do not depend on the setting)"""
+    if getattr(settings, 'MEDIA_CONTENT_ADDRESSED', True):
+        return content_addressed_storage
+    return default_storage
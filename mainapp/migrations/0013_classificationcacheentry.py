@@ -0,0 +1,30 @@
+# Generated by Django 4.2.30 on 2026-10-17 02:39
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mainapp', '0012_notification'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ClassificationCacheEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('image_digest', models.CharField(help_text='SHA-256 hex digest of the image bytes', max_length=64, unique=True)),
+                ('result', models.JSONField(help_text='Classification result returned by the classifier')),
+                ('hit_count', models.PositiveIntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('last_used_at', models.DateTimeField(db_index=True, default=django.utils.timezone.now)),
+            ],
+            options={
+                'verbose_name': 'Classification Cache Entry',
+                'verbose_name_plural': 'Classification Cache Entries',
+                'ordering': ['-last_used_at'],
+            },
+        ),
+    ]
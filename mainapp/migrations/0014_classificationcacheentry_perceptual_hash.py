@@ -0,0 +1,18 @@
+# Generated by Django 4.2.30 on 2026-10-17 02:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mainapp', '0013_classificationcacheentry'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='classificationcacheentry',
+            name='perceptual_hash',
+            field=models.CharField(blank=True, help_text='64-bit dHash as hex, for near-duplicate lookup', max_length=16),
+        ),
+    ]
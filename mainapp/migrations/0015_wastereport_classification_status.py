@@ -0,0 +1,33 @@
+# Generated by Django 4.2.30 on 2026-10-17 02:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mainapp', '0014_classificationcacheentry_perceptual_hash'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='wastereport',
+            name='ai_classification',
+            field=models.JSONField(blank=True, help_text='Raw result from the waste classifier', null=True),
+        ),
+        migrations.AddField(
+            model_name='wastereport',
+            name='classification_error',
+            field=models.CharField(blank=True, max_length=255),
+        ),
+        migrations.AddField(
+            model_name='wastereport',
+            name='classification_status',
+            field=models.CharField(choices=[('not_requested', 'Not Requested'), ('pending', 'Pending'), ('processing', 'Processing'), ('completed', 'Completed'), ('failed', 'Failed')], default='not_requested', max_length=20),
+        ),
+        migrations.AddField(
+            model_name='wastereport',
+            name='classified_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
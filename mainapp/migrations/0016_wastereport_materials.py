@@ -0,0 +1,71 @@
+# Generated by Django 4.2.30 on 2026-10-17 02:50
+
+from decimal import Decimal
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def backfill_materials(apps, schema_editor):
+    """Populate material rows and summary columns from stored ai_classification results"""
+    from mainapp.classification_queue import summarize_materials
+
+    WasteReport = apps.get_model('mainapp', 'WasteReport')
+    WasteReportMaterial = apps.get_model('mainapp', 'WasteReportMaterial')
+
+    reports = WasteReport.objects.filter(classification_status='completed').exclude(ai_classification=None)
+    for report in reports.only('id', 'ai_classification').iterator():
+        materials, total, score = summarize_materials(report.ai_classification)
+        if not materials:
+            continue
+        WasteReport.objects.filter(pk=report.pk).update(
+            estimated_weight_kg=Decimal(str(round(total, 3))),
+            recyclability_score=score
+        )
+        WasteReportMaterial.objects.bulk_create([
+            WasteReportMaterial(
+                report_id=report.pk,
+                material=material,
+                estimated_weight_kg=Decimal(str(round(weight, 3))),
+                recyclable=recyclable
+            )
+            for material, (weight, recyclable) in materials.items()
+        ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mainapp', '0015_wastereport_classification_status'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='wastereport',
+            name='estimated_weight_kg',
+            field=models.DecimalField(blank=True, db_index=True, decimal_places=3, help_text='Total weight estimated by the classifier', max_digits=8, null=True),
+        ),
+        migrations.AddField(
+            model_name='wastereport',
+            name='recyclability_score',
+            field=models.PositiveSmallIntegerField(blank=True, help_text='Share of the estimated weight that is recyclable (0-100)', null=True),
+        ),
+        migrations.CreateModel(
+            name='WasteReportMaterial',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('material', models.CharField(db_index=True, max_length=30)),
+                ('estimated_weight_kg', models.DecimalField(decimal_places=3, max_digits=8)),
+                ('recyclable', models.BooleanField(default=False)),
+                ('report', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='materials', to='mainapp.wastereport')),
+            ],
+            options={
+                'verbose_name': 'Waste Report Material',
+                'verbose_name_plural': 'Waste Report Materials',
+                'ordering': ['-estimated_weight_kg'],
+                'indexes': [models.Index(fields=['material', 'estimated_weight_kg'], name='wastematerial_material_weight')],
+                'unique_together': {('report', 'material')},
+            },
+        ),
+        migrations.RunPython(backfill_materials, migrations.RunPython.noop),
+    ]
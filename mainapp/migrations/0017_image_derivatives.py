@@ -0,0 +1,23 @@
+# Generated by Django 4.2.30 on 2026-10-17 02:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mainapp', '0016_wastereport_materials'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='buyer',
+            name='shop_photo_derivatives',
+            field=models.JSONField(blank=True, default=dict, help_text='Resized WebP/JPEG variants of the shop photo'),
+        ),
+        migrations.AddField(
+            model_name='wastereport',
+            name='image_derivatives',
+            field=models.JSONField(blank=True, default=dict, help_text='Resized WebP/JPEG variants of the photo'),
+        ),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 4.2.30 on 2026-10-17 03:00
+
+from django.db import migrations, models
+import mainapp.media_storage
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mainapp', '0018_uploadsession'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MediaBlob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(help_text='Storage name, <upload dir>/<sha[:2]>/<sha256><ext>', max_length=255, unique=True)),
+                ('sha256', models.CharField(db_index=True, max_length=64)),
+                ('size', models.PositiveBigIntegerField(help_text='File size in bytes')),
+                ('ref_count', models.PositiveIntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': 'Media Blob',
+                'verbose_name_plural': 'Media Blobs',
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.AlterField(
+            model_name='buyer',
+            name='shop_photo',
+            field=models.ImageField(blank=True, null=True, storage=mainapp.media_storage.media_storage, upload_to='buyer_shops/'),
+        ),
+        migrations.AlterField(
+            model_name='buyer',
+            name='trade_license',
+            field=models.FileField(blank=True, help_text='Upload trade license/business registration (optional)', null=True, storage=mainapp.media_storage.media_storage, upload_to='buyer_licenses/'),
+        ),
+        migrations.AlterField(
+            model_name='wastereport',
+            name='image',
+            field=models.ImageField(help_text='Upload waste photo', storage=mainapp.media_storage.media_storage, upload_to='waste_reports/'),
+        ),
+    ]
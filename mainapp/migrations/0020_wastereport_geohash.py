@@ -0,0 +1,33 @@
+# Generated by Django 4.2.30 on 2026-10-17 03:04
+
+from django.db import migrations, models
+
+
+def backfill_geohash(apps, schema_editor):
+    """Compute the geohash of every report that has coordinates"""
+    from mainapp.geo import encode
+
+    WasteReport = apps.get_model('mainapp', 'WasteReport')
+    reports = WasteReport.objects.exclude(latitude=None).exclude(longitude=None)
+    for pk, latitude, longitude in reports.values_list('pk', 'latitude', 'longitude').iterator():
+        WasteReport.objects.filter(pk=pk).update(geohash=encode(latitude, longitude))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mainapp', '0019_media_blobs'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='wastereport',
+            name='geohash',
+            field=models.CharField(blank=True, editable=False, help_text='Geohash of latitude/longitude, for radius search', max_length=12),
+        ),
+        migrations.AddIndex(
+            model_name='wastereport',
+            index=models.Index(fields=['status', 'geohash'], name='wastereport_status_geohash'),
+        ),
+        migrations.RunPython(backfill_geohash, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 4.2.30 on 2026-10-17 03:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mainapp', '0020_wastereport_geohash'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(fields=['user', 'created_at'], name='notification_user_created'),
+        ),
+        migrations.AddIndex(
+            model_name='pickuphistory',
+            index=models.Index(fields=['user', 'completed_at'], name='pickuphistory_user_completed'),
+        ),
+        migrations.AddIndex(
+            model_name='pickuphistory',
+            index=models.Index(fields=['buyer_shop_name', 'completed_at'], name='pickuphistory_shop_completed'),
+        ),
+        migrations.AddIndex(
+            model_name='pickuprequest',
+            index=models.Index(fields=['buyer', 'created_at'], name='pickuprequest_buyer_created'),
+        ),
+        migrations.AddIndex(
+            model_name='wastereport',
+            index=models.Index(fields=['status', 'created_at'], name='wastereport_status_created'),
+        ),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 4.2.30 on 2026-10-17 03:07
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def backfill_acted_listings(apps, schema_editor):
+    """Record existing pickup requests on pending reports"""
+    PickupRequest = apps.get_model('mainapp', 'PickupRequest')
+    BuyerActedListing = apps.get_model('mainapp', 'BuyerActedListing')
+
+    pairs = PickupRequest.objects.filter(waste_report__status='pending') \
+        .order_by().values_list('buyer_id', 'waste_report_id').distinct()
+    batch = []
+    for buyer_id, waste_report_id in pairs.iterator():
+        batch.append(BuyerActedListing(buyer_id=buyer_id, waste_report_id=waste_report_id))
+        if len(batch) >= 1000:
+            BuyerActedListing.objects.bulk_create(batch, ignore_conflicts=True)
+            batch = []
+    BuyerActedListing.objects.bulk_create(batch, ignore_conflicts=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mainapp', '0021_keyset_pagination_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BuyerActedListing',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('buyer', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='acted_listings', to='mainapp.buyer')),
+                ('waste_report', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='acted_by', to='mainapp.wastereport')),
+            ],
+            options={
+                'verbose_name': 'Buyer Acted Listing',
+                'verbose_name_plural': 'Buyer Acted Listings',
+                'unique_together': {('buyer', 'waste_report')},
+            },
+        ),
+        migrations.RunPython(backfill_acted_listings, migrations.RunPython.noop),
+    ]
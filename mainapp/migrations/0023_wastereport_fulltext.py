@@ -0,0 +1,28 @@
+# Generated by Django 4.2.30 on 2026-10-17 03:12
+
+from django.db import migrations
+
+
+def create_fulltext_index(apps, schema_editor):
+    from mainapp.search import create_index_sql
+
+    for statement in create_index_sql(schema_editor.connection.vendor):
+        schema_editor.execute(statement)
+
+
+def drop_fulltext_index(apps, schema_editor):
+    from mainapp.search import drop_index_sql
+
+    for statement in drop_index_sql(schema_editor.connection.vendor):
+        schema_editor.execute(statement)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mainapp', '0022_buyer_acted_listings'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_fulltext_index, drop_fulltext_index),
+    ]
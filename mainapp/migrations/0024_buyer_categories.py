@@ -0,0 +1,112 @@
+# Generated by Django 4.2.30 on 2026-10-17 03:09
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+# WasteReport.WASTE_TYPE_CHOICES codes plus the buyer-only 'mixed'
+CATEGORIES = [
+    ('plastic', 'Plastic'),
+    ('paper', 'Paper'),
+    ('organic', 'Organic'),
+    ('metal', 'Metal'),
+    ('glass', 'Glass'),
+    ('e_waste', 'E-Waste'),
+    ('medical', 'Medical Waste'),
+    ('construction', 'Construction Waste'),
+    ('other', 'Other'),
+    ('mixed', 'Mixed Waste'),
+]
+
+# Legacy codes and labels stored in the JSON list
+ALIASES = {
+    'ewaste': 'e_waste',
+    'e-waste': 'e_waste',
+    'e waste': 'e_waste',
+    'paper & cardboard': 'paper',
+    'mixed waste': 'mixed',
+    'medical waste': 'medical',
+    'construction waste': 'construction',
+}
+
+
+def seed_and_backfill(apps, schema_editor):
+    """
+    Create the categories and copy each buyer's JSON list into the link table.
+    Codes that match no category are printed; 0030 saves them to
+    LegacyBuyerCategory before it removes the JSON column.
+    """
+    WasteCategory = apps.get_model('mainapp', 'WasteCategory')
+    Buyer = apps.get_model('mainapp', 'Buyer')
+    BuyerCategory = apps.get_model('mainapp', 'BuyerCategory')
+
+    for code, name in CATEGORIES:
+        WasteCategory.objects.get_or_create(code=code, defaults={'name': name})
+    known = {code for code, _ in CATEGORIES}
+
+    links = []
+    unmapped = {}
+    for buyer_id, handled in Buyer.objects.values_list('id', 'waste_categories_handled').iterator(chunk_size=2000):
+        if not isinstance(handled, list):
+            if handled:
+                unmapped[buyer_id] = [handled]
+            continue
+        codes = {str(code): ALIASES.get(str(code).strip().lower(), str(code).strip().lower()) for code in handled}
+        links.extend(BuyerCategory(buyer_id=buyer_id, category_id=code) for code in sorted(set(codes.values()) & known))
+        missed = sorted(original for original, code in codes.items() if code not in known)
+        if missed:
+            unmapped[buyer_id] = missed
+    BuyerCategory.objects.bulk_create(links, batch_size=1000, ignore_conflicts=True)
+
+    if unmapped:
+        print(f"\n  ⚠️ {len(unmapped)} buyer(s) have waste categories that match no category and were not copied:")
+        for buyer_id, codes in sorted(unmapped.items()):
+            print(f"    buyer {buyer_id}: {codes}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mainapp', '0023_wastereport_fulltext'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='WasteCategory',
+            fields=[
+                ('code', models.CharField(max_length=20, primary_key=True, serialize=False)),
+                ('name', models.CharField(max_length=50)),
+            ],
+            options={
+                'verbose_name': 'Waste Category',
+                'verbose_name_plural': 'Waste Categories',
+                'ordering': ['code'],
+            },
+        ),
+        migrations.CreateModel(
+            name='BuyerCategory',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('buyer', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='category_links', to='mainapp.buyer')),
+                ('category', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='buyer_links', to='mainapp.wastecategory')),
+            ],
+            options={
+                'verbose_name': 'Buyer Category',
+                'verbose_name_plural': 'Buyer Categories',
+            },
+        ),
+        migrations.AddField(
+            model_name='buyer',
+            name='categories',
+            field=models.ManyToManyField(blank=True, help_text='Waste categories this buyer handles', related_name='buyers', through='mainapp.BuyerCategory', to='mainapp.wastecategory'),
+        ),
+        migrations.AddIndex(
+            model_name='buyercategory',
+            index=models.Index(fields=['category', 'buyer'], name='buyercategory_category_buyer'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='buyercategory',
+            unique_together={('buyer', 'category')},
+        ),
+        migrations.RunPython(seed_and_backfill, migrations.RunPython.noop),
+    ]
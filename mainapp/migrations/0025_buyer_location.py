@@ -0,0 +1,23 @@
+# Generated by Django 4.2.30 on 2026-10-17 03:13
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mainapp', '0024_buyer_categories'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='buyer',
+            name='latitude',
+            field=models.DecimalField(blank=True, decimal_places=5, help_text='Shop location, for buyer recommendations', max_digits=8, null=True),
+        ),
+        migrations.AddField(
+            model_name='buyer',
+            name='longitude',
+            field=models.DecimalField(blank=True, decimal_places=5, max_digits=8, null=True),
+        ),
+    ]
@@ -0,0 +1,55 @@
+# Generated by Django 4.2.30 on 2026-10-17 03:16
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mainapp', '0025_buyer_location'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SavedSearch',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(blank=True, max_length=100)),
+                ('latitude', models.DecimalField(blank=True, decimal_places=5, max_digits=8, null=True)),
+                ('longitude', models.DecimalField(blank=True, decimal_places=5, max_digits=8, null=True)),
+                ('radius_km', models.DecimalField(blank=True, decimal_places=2, help_text='Match reports within this distance of the point (empty = anywhere)', max_digits=6, null=True)),
+                ('min_quantity_kg', models.DecimalField(blank=True, decimal_places=2, max_digits=8, null=True)),
+                ('conditions', models.JSONField(blank=True, default=list, help_text='Waste conditions to match (empty = any)')),
+                ('is_active', models.BooleanField(default=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('buyer', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='saved_searches', to='mainapp.buyer')),
+                ('categories', models.ManyToManyField(blank=True, help_text='Waste types to match (none = any)', related_name='saved_searches', to='mainapp.wastecategory')),
+            ],
+            options={
+                'verbose_name': 'Saved Search',
+                'verbose_name_plural': 'Saved Searches',
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.AlterField(
+            model_name='notification',
+            name='notification_type',
+            field=models.CharField(choices=[('pickup_request', 'Pickup Request'), ('request_accepted', 'Request Accepted'), ('request_rejected', 'Request Rejected'), ('pickup_completed', 'Pickup Completed'), ('saved_search_match', 'Saved Search Match'), ('system', 'System Notification')], max_length=20),
+        ),
+        migrations.CreateModel(
+            name='SavedSearchKey',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('category', models.CharField(blank=True, max_length=20)),
+                ('cell', models.CharField(blank=True, max_length=12)),
+                ('saved_search', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='keys', to='mainapp.savedsearch')),
+            ],
+            options={
+                'verbose_name': 'Saved Search Key',
+                'verbose_name_plural': 'Saved Search Keys',
+                'indexes': [models.Index(fields=['category', 'cell'], name='savedsearchkey_category_cell')],
+            },
+        ),
+    ]
@@ -0,0 +1,64 @@
+# Generated by Django 4.2.30 on 2026-10-17 03:20
+
+from django.db import migrations, models
+
+
+def backfill_rating_aggregates(apps, schema_editor):
+    Buyer = apps.get_model('mainapp', 'Buyer')
+    BuyerRating = apps.get_model('mainapp', 'BuyerRating')
+
+    aggregates = {}
+    rows = BuyerRating.objects.order_by().values_list('buyer_id', 'rating').annotate(count=models.Count('pk'))
+    for buyer_id, rating, count in rows:
+        values = aggregates.setdefault(buyer_id, {'rating_count': 0, 'rating_sum': 0})
+        values['rating_count'] += count
+        values['rating_sum'] += rating * count
+        values[f'rating_count_{rating}'] = values.get(f'rating_count_{rating}', 0) + count
+    for buyer_id, values in aggregates.items():
+        Buyer.objects.filter(pk=buyer_id).update(**values)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mainapp', '0026_saved_searches'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='buyer',
+            name='rating_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='buyer',
+            name='rating_count_1',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='buyer',
+            name='rating_count_2',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='buyer',
+            name='rating_count_3',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='buyer',
+            name='rating_count_4',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='buyer',
+            name='rating_count_5',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='buyer',
+            name='rating_sum',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(backfill_rating_aggregates, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,72 @@
+# Generated by Django 4.2.30 on 2026-10-17 03:21
+
+from decimal import Decimal
+import re
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+# WasteReport.QUANTITY_TYPE_KG at the time of this migration
+SIZE_CLASS_KG = {'small': 1.5, 'medium': 6.5, 'large': 10}
+NUMBER = re.compile(r'\d+(?:\.\d+)?')
+
+
+def parse_weight_kg(text):
+    """kg from a stored quantity string: '5.00 kg', '500 g', 'Small (1–2 kg)', '3-10 kg'"""
+    text = (text or '').strip().lower()
+    for label, kg in SIZE_CLASS_KG.items():
+        if text.startswith(label):
+            return Decimal(str(kg))
+    numbers = [Decimal(number) for number in NUMBER.findall(text)]
+    if not numbers:
+        return None
+    if len(numbers) >= 2 and re.search(r'\d\s*[–-]\s*\d', text):
+        weight = (numbers[0] + numbers[1]) / 2
+    else:
+        weight = numbers[0]
+    if re.search(r'\d\s*g\b', text):
+        weight /= 1000
+    return min(weight, Decimal('999999.99')).quantize(Decimal('0.01'))
+
+
+def backfill_buyer_and_weight(apps, schema_editor):
+    PickupHistory = apps.get_model('mainapp', 'PickupHistory')
+    Buyer = apps.get_model('mainapp', 'Buyer')
+
+    # Shop names that identify exactly one buyer
+    shops = {}
+    for buyer_id, shop_name in Buyer.objects.values_list('id', 'shop_name'):
+        shops[shop_name] = None if shop_name in shops else buyer_id
+
+    rows = PickupHistory.objects.values_list('id', 'quantity', 'buyer_shop_name', 'pickup_request__buyer_id')
+    for history_id, quantity, shop_name, request_buyer_id in rows.iterator(chunk_size=2000):
+        PickupHistory.objects.filter(pk=history_id).update(
+            weight_kg=parse_weight_kg(quantity),
+            buyer_id=request_buyer_id or shops.get(shop_name),
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mainapp', '0027_buyer_rating_aggregates'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='pickuphistory',
+            name='buyer',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='pickup_history', to='mainapp.buyer'),
+        ),
+        migrations.AddField(
+            model_name='pickuphistory',
+            name='weight_kg',
+            field=models.DecimalField(blank=True, decimal_places=2, help_text='Quantity collected in kg', max_digits=8, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='pickuphistory',
+            index=models.Index(fields=['buyer', 'completed_at'], name='pickuphistory_buyer_completed'),
+        ),
+        migrations.RunPython(backfill_buyer_and_weight, migrations.RunPython.noop),
+    ]
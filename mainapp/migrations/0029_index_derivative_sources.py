@@ -0,0 +1,34 @@
+# Generated by Django 4.2.30 on 2026-10-17 03:36
+
+from django.db import migrations, models
+import mainapp.media_storage
+
+
+def rebuild_fulltext_index(apps, schema_editor):
+    # Altering a column makes SQLite rebuild the table, which drops the search triggers
+    from mainapp.search import rebuild_index_sql
+
+    for statement in rebuild_index_sql(schema_editor.connection.vendor):
+        schema_editor.execute(statement)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mainapp', '0028_pickuphistory_buyer_weight'),
+    ]
+
+    operations = [
+        migrations.RunPython(migrations.RunPython.noop, rebuild_fulltext_index),
+        migrations.AlterField(
+            model_name='buyer',
+            name='shop_photo',
+            field=models.ImageField(blank=True, db_index=True, null=True, storage=mainapp.media_storage.media_storage, upload_to='buyer_shops/'),
+        ),
+        migrations.AlterField(
+            model_name='wastereport',
+            name='image',
+            field=models.ImageField(db_index=True, help_text='Upload waste photo', storage=mainapp.media_storage.media_storage, upload_to='waste_reports/'),
+        ),
+        migrations.RunPython(rebuild_fulltext_index, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,82 @@
+# Generated by Django 4.2.30 on 2026-10-17 05:12
+
+import importlib
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+ALIASES = importlib.import_module('mainapp.migrations.0024_buyer_categories').ALIASES
+
+
+def save_unmapped_codes(apps, schema_editor):
+    """
+    Keep every JSON code that has no matching link row in LegacyBuyerCategory
+    before the column is dropped, so it can still be mapped by hand afterwards
+    """
+    Buyer = apps.get_model('mainapp', 'Buyer')
+    BuyerCategory = apps.get_model('mainapp', 'BuyerCategory')
+    LegacyBuyerCategory = apps.get_model('mainapp', 'LegacyBuyerCategory')
+
+    linked = {}
+    for buyer_id, code in BuyerCategory.objects.values_list('buyer_id', 'category_id').iterator(chunk_size=2000):
+        linked.setdefault(buyer_id, set()).add(code)
+
+    rows = []
+    for buyer_id, handled in Buyer.objects.values_list('id', 'waste_categories_handled').iterator(chunk_size=2000):
+        if not handled:
+            continue
+        codes = {str(code)[:100] for code in (handled if isinstance(handled, list) else [handled])}
+        rows.extend(
+            LegacyBuyerCategory(buyer_id=buyer_id, code=code)
+            for code in sorted(codes)
+            if ALIASES.get(code.strip().lower(), code.strip().lower()) not in linked.get(buyer_id, ())
+        )
+    LegacyBuyerCategory.objects.bulk_create(rows, batch_size=1000, ignore_conflicts=True)
+    if rows:
+        print(f"\n  ⚠️ Saved {len(rows)} unmapped waste category code(s) to LegacyBuyerCategory")
+
+
+def restore_json_lists(apps, schema_editor):
+    """Rebuild the JSON lists from the link and legacy tables when the removal is reversed"""
+    Buyer = apps.get_model('mainapp', 'Buyer')
+    BuyerCategory = apps.get_model('mainapp', 'BuyerCategory')
+    LegacyBuyerCategory = apps.get_model('mainapp', 'LegacyBuyerCategory')
+
+    handled = {}
+    for buyer_id, code in BuyerCategory.objects.order_by('buyer_id', 'category_id').values_list('buyer_id', 'category_id'):
+        handled.setdefault(buyer_id, []).append(code)
+    for buyer_id, code in LegacyBuyerCategory.objects.order_by('buyer_id', 'code').values_list('buyer_id', 'code'):
+        handled.setdefault(buyer_id, []).append(code)
+    buyers = list(Buyer.objects.filter(pk__in=handled).only('pk'))
+    for buyer in buyers:
+        buyer.waste_categories_handled = handled[buyer.pk]
+    Buyer.objects.bulk_update(buyers, ['waste_categories_handled'], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mainapp', '0029_index_derivative_sources'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LegacyBuyerCategory',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('code', models.CharField(max_length=100)),
+                ('buyer', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='legacy_categories', to='mainapp.buyer')),
+            ],
+            options={
+                'verbose_name': 'Legacy Buyer Category',
+                'verbose_name_plural': 'Legacy Buyer Categories',
+                'unique_together': {('buyer', 'code')},
+            },
+        ),
+        migrations.RunPython(save_unmapped_codes, restore_json_lists),
+        migrations.RemoveField(
+            model_name='buyer',
+            name='waste_categories_handled',
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.30 on 2026-10-17 03:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mainapp', '0030_remove_buyer_waste_categories_handled'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='wastereport',
+            name='classification_queued_at',
+            field=models.DateTimeField(blank=True, help_text='When the current classification job was queued or picked up by a worker', null=True),
+        ),
+    ]
@@ -1,6 +1,14 @@
+import uuid
+from decimal import Decimal
+
 from django.db import models
 from django.contrib.auth.models import User
 from django.core.validators import RegexValidator
+from django.utils import timezone
+
+from . import geo
+from .image_derivatives import derivative_url
+from .media_storage import media_storage
 
 class Task(models.Model):
     STATUS_CHOICES = [
@@ -38,6 +46,13 @@ class Note(models.Model):
         return self.title
 
 
+class WasteReportQuerySet(models.QuerySet):
+    def open_for_buyer(self, buyer):
+        """Pending reports the buyer has not sent a pickup request for yet"""
+        acted = BuyerActedListing.objects.filter(buyer=buyer).values('waste_report_id')
+        return self.filter(status='pending').exclude(pk__in=acted)
+
+
 class WasteReport(models.Model):
     WASTE_TYPE_CHOICES = [
         ('plastic', '♻️ Plastic'),
@@ -57,6 +72,13 @@ class WasteReport(models.Model):
         ('large', 'Large (10+ kg)'),
     ]
     
+    # Weight assumed for a size class when nothing more precise is known
+    QUANTITY_TYPE_KG = {
+        'small': 1.5,
+        'medium': 6.5,
+        'large': 10,
+    }
+    
     CONDITION_CHOICES = [
         ('dry', 'Dry'),
         ('wet', 'Wet'),
@@ -72,6 +94,14 @@ class WasteReport(models.Model):
         ('cancelled', 'Cancelled'),
     ]
     
+    CLASSIFICATION_STATUS_CHOICES = [
+        ('not_requested', 'Not Requested'),
+        ('pending', 'Pending'),
+        ('processing', 'Processing'),
+        ('completed', 'Completed'),
+        ('failed', 'Failed'),
+    ]
+    
     # User Information
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='waste_reports')
     name = models.CharField(max_length=200, blank=True)
@@ -86,30 +116,56 @@ class WasteReport(models.Model):
     waste_condition = models.CharField(max_length=20, choices=CONDITION_CHOICES, blank=True)
     
     # Photo
-    image = models.ImageField(upload_to='waste_reports/', help_text="Upload waste photo")
+    image = models.ImageField(upload_to='waste_reports/', storage=media_storage, db_index=True, help_text="Upload waste photo")
+    image_derivatives = models.JSONField(default=dict, blank=True, help_text="Resized WebP/JPEG variants of the photo")
     
     # Location
     location_auto = models.BooleanField(default=False)
     latitude = models.DecimalField(max_digits=8, decimal_places=5, null=True, blank=True)
     longitude = models.DecimalField(max_digits=8, decimal_places=5, null=True, blank=True)
+    geohash = models.CharField(max_length=12, blank=True, editable=False, help_text="Geohash of latitude/longitude, for radius search")
     area = models.CharField(max_length=200, blank=True)
     city = models.CharField(max_length=100, blank=True)
     state = models.CharField(max_length=100, blank=True)
     landmark = models.CharField(max_length=200, blank=True)
     full_address = models.TextField(blank=True, help_text="Complete pickup address with house/flat number, street, etc.")
     
+    # AI Classification (filled in by the background classification queue)
+    classification_status = models.CharField(max_length=20, choices=CLASSIFICATION_STATUS_CHOICES, default='not_requested')
+    ai_classification = models.JSONField(null=True, blank=True, help_text="Raw result from the waste classifier")
+    classification_error = models.CharField(max_length=255, blank=True)
+    classified_at = models.DateTimeField(null=True, blank=True)
+    classification_queued_at = models.DateTimeField(null=True, blank=True, help_text="When the current classification job was queued or picked up by a worker")
+    estimated_weight_kg = models.DecimalField(max_digits=8, decimal_places=3, null=True, blank=True, db_index=True, help_text="Total weight estimated by the classifier")
+    recyclability_score = models.PositiveSmallIntegerField(null=True, blank=True, help_text="Share of the estimated weight that is recyclable (0-100)")
+    
     # Additional
     additional_notes = models.TextField(blank=True)
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    objects = WasteReportQuerySet.as_manager()
+    
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', 'geohash'], name='wastereport_status_geohash'),
+            models.Index(fields=['status', 'created_at'], name='wastereport_status_created'),
+        ]
     
     def __str__(self):
         return f"{self.get_waste_type_display()} - {self.user.username} ({self.created_at.strftime('%Y-%m-%d')})"
     
+    def save(self, *args, **kwargs):
+        """Keep the geohash in sync with the coordinates"""
+        has_point = self.latitude is not None and self.longitude is not None
+        self.geohash = geo.encode(self.latitude, self.longitude) if has_point else ''
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and {'latitude', 'longitude'} & set(update_fields):
+            kwargs['update_fields'] = set(update_fields) | {'geohash'}
+        super().save(*args, **kwargs)
+    
     @property
     def location_display(self):
         """Return formatted location"""
@@ -119,12 +175,85 @@ class WasteReport(models.Model):
             parts = [self.area, self.city, self.landmark]
             return ", ".join([p for p in parts if p])
     
+    @property
+    def thumbnail_url(self):
+        """Card-sized JPEG of the photo (the original until derivatives exist)"""
+        return derivative_url(self.image, self.image_derivatives, 480, 'JPEG')
+    
+    @property
+    def thumbnail_webp_url(self):
+        return derivative_url(self.image, self.image_derivatives, 480, 'WEBP')
+    
     @property
     def quantity_display(self):
         """Return formatted quantity"""
         if self.exact_quantity:
             return f"{self.exact_quantity} kg"
         return self.get_quantity_type_display()
+    
+    @property
+    def weight_kg(self):
+        """Best known weight: exact quantity, else the classifier's estimate, else the size class"""
+        if self.exact_quantity:
+            return self.exact_quantity
+        if self.estimated_weight_kg:
+            return round(self.estimated_weight_kg, 2)
+        weight = self.QUANTITY_TYPE_KG.get(self.quantity_type)
+        return Decimal(str(weight)) if weight is not None else None
+
+
+class WasteReportMaterial(models.Model):
+    """One material detected in a waste report's photo by the AI classifier"""
+    
+    report = models.ForeignKey(WasteReport, on_delete=models.CASCADE, related_name='materials')
+    material = models.CharField(max_length=30, db_index=True)
+    estimated_weight_kg = models.DecimalField(max_digits=8, decimal_places=3)
+    recyclable = models.BooleanField(default=False)
+    
+    class Meta:
+        ordering = ['-estimated_weight_kg']
+        unique_together = ['report', 'material']
+        indexes = [
+            models.Index(fields=['material', 'estimated_weight_kg'], name='wastematerial_material_weight'),
+        ]
+        verbose_name = 'Waste Report Material'
+        verbose_name_plural = 'Waste Report Materials'
+    
+    def __str__(self):
+        return f"{self.material} ({self.estimated_weight_kg} kg) - report #{self.report_id}"
+
+
+# Legacy codes and labels found in Buyer.waste_categories_handled before categories were normalized
+WASTE_CATEGORY_ALIASES = {
+    'ewaste': 'e_waste',
+    'e-waste': 'e_waste',
+    'e waste': 'e_waste',
+    'paper & cardboard': 'paper',
+    'mixed waste': 'mixed',
+    'medical waste': 'medical',
+    'construction waste': 'construction',
+}
+
+
+def normalize_waste_category(code):
+    """Canonical category code (as in WasteReport.WASTE_TYPE_CHOICES) for user or legacy input"""
+    code = str(code).strip().lower()
+    return WASTE_CATEGORY_ALIASES.get(code, code)
+
+
+class WasteCategory(models.Model):
+    """Kind of waste a buyer accepts; codes are the WasteReport waste_type codes plus 'mixed'"""
+    
+    code = models.CharField(max_length=20, primary_key=True)
+    name = models.CharField(max_length=50)
+    
+    class Meta:
+        ordering = ['code']
+        verbose_name = 'Waste Category'
+        verbose_name_plural = 'Waste Categories'
+    
+    def __str__(self):
+        return self.name
 
 
 class Buyer(models.Model):
@@ -145,7 +274,7 @@ class Buyer(models.Model):
         ('paper', 'Paper & Cardboard'),
         ('glass', 'Glass'),
         ('organic', 'Organic'),
-        ('ewaste', 'E-Waste'),
+        ('e_waste', 'E-Waste'),
         ('mixed', 'Mixed Waste'),
     ]
     
@@ -163,14 +292,27 @@ class Buyer(models.Model):
     # Business Details
     shop_name = models.CharField(max_length=300)
     shop_type = models.CharField(max_length=50, choices=SHOP_TYPE_CHOICES)
-    waste_categories_handled = models.JSONField(default=list, help_text="List of waste categories this buyer handles")
+    categories = models.ManyToManyField(WasteCategory, through='BuyerCategory', related_name='buyers', blank=True,
+                                        help_text="Waste categories this buyer handles")
     shop_address = models.TextField()
-    shop_photo = models.ImageField(upload_to='buyer_shops/', null=True, blank=True)
+    latitude = models.DecimalField(max_digits=8, decimal_places=5, null=True, blank=True, help_text="Shop location, for buyer recommendations")
+    longitude = models.DecimalField(max_digits=8, decimal_places=5, null=True, blank=True)
+    shop_photo = models.ImageField(upload_to='buyer_shops/', storage=media_storage, null=True, blank=True, db_index=True)
+    shop_photo_derivatives = models.JSONField(default=dict, blank=True, help_text="Resized WebP/JPEG variants of the shop photo")
     
     # Verification Details
     aadhaar_number = models.CharField(max_length=500, help_text="Encrypted Aadhaar number")
     aadhaar_last_4 = models.CharField(max_length=4, help_text="Last 4 digits for display")
-    trade_license = models.FileField(upload_to='buyer_licenses/', null=True, blank=True, help_text="Upload trade license/business registration (optional)")
+    trade_license = models.FileField(upload_to='buyer_licenses/', storage=media_storage, null=True, blank=True, help_text="Upload trade license/business registration (optional)")
+    
+    # Rating aggregates, kept in step with BuyerRating by signals (repair: manage.py repair_buyer_ratings)
+    rating_count = models.PositiveIntegerField(default=0, editable=False)
+    rating_sum = models.PositiveIntegerField(default=0, editable=False)
+    rating_count_1 = models.PositiveIntegerField(default=0, editable=False)
+    rating_count_2 = models.PositiveIntegerField(default=0, editable=False)
+    rating_count_3 = models.PositiveIntegerField(default=0, editable=False)
+    rating_count_4 = models.PositiveIntegerField(default=0, editable=False)
+    rating_count_5 = models.PositiveIntegerField(default=0, editable=False)
     
     # Status & Metadata
     is_verified = models.BooleanField(default=False, help_text="Admin verification status")
@@ -185,22 +327,69 @@ class Buyer(models.Model):
         """Return masked Aadhaar number"""
         return f"XXXX XXXX {self.aadhaar_last_4}"
     
+    @property
+    def shop_photo_thumbnail_url(self):
+        return derivative_url(self.shop_photo, self.shop_photo_derivatives, 480, 'JPEG')
+    
+    @property
+    def shop_photo_thumbnail_webp_url(self):
+        return derivative_url(self.shop_photo, self.shop_photo_derivatives, 480, 'WEBP')
+    
+    @property
+    def waste_categories_handled(self):
+        """Category codes this buyer handles (uses prefetched categories when available)"""
+        return [category.code for category in self.categories.all()]
+    
     @property
     def waste_categories_display(self):
         """Return comma-separated waste categories"""
-        return ", ".join(self.waste_categories_handled) if self.waste_categories_handled else "None"
+        return ", ".join(self.waste_categories_handled) or "None"
+    
+    def set_categories(self, codes):
+        """Replace the handled categories; unknown codes are ignored"""
+        codes = {normalize_waste_category(code) for code in codes or []}
+        known = WasteCategory.objects.filter(code__in=codes)
+        self.categories.set(known)
     
     @property
     def average_rating(self):
-        """Calculate average rating"""
-        from django.db.models import Avg
-        avg = self.ratings.aggregate(Avg('rating'))['rating__avg']
-        return round(avg, 1) if avg else 0
+        """Average rating, from the stored aggregates"""
+        return round(self.rating_sum / self.rating_count, 1) if self.rating_count else 0
     
     @property
     def total_ratings(self):
         """Get total number of ratings"""
-        return self.ratings.count()
+        return self.rating_count
+    
+    @property
+    def rating_histogram(self):
+        """{stars: number of ratings} for 1-5 stars"""
+        return {stars: getattr(self, f'rating_count_{stars}') for stars in range(1, 6)}
+    
+    @classmethod
+    def adjust_rating_aggregates(cls, buyer_id, rating, delta):
+        """Add (delta=1) or remove (delta=-1) one rating in a single UPDATE"""
+        cls.objects.filter(pk=buyer_id).update(**{
+            'rating_count': models.F('rating_count') + delta,
+            'rating_sum': models.F('rating_sum') + delta * rating,
+            f'rating_count_{rating}': models.F(f'rating_count_{rating}') + delta,
+        })
+    
+    @classmethod
+    def rating_aggregates(cls, buyer_ids):
+        """{buyer_id: {field: value}} recomputed from BuyerRating, for the given buyers"""
+        aggregates = {
+            buyer_id: dict({'rating_count': 0, 'rating_sum': 0}, **{f'rating_count_{stars}': 0 for stars in range(1, 6)})
+            for buyer_id in buyer_ids
+        }
+        rows = BuyerRating.objects.filter(buyer_id__in=buyer_ids).order_by() \
+            .values_list('buyer_id', 'rating').annotate(count=models.Count('pk'))
+        for buyer_id, rating, count in rows:
+            values = aggregates[buyer_id]
+            values['rating_count'] += count
+            values['rating_sum'] += rating * count
+            values[f'rating_count_{rating}'] += count
+        return aggregates
     
     class Meta:
         ordering = ['-created_at']
@@ -208,6 +397,42 @@ class Buyer(models.Model):
         verbose_name_plural = 'Buyers'
 
 
+class BuyerCategory(models.Model):
+    """Buyer accepts a waste category; indexed by category for "buyers who accept X" lookups"""
+    
+    buyer = models.ForeignKey(Buyer, on_delete=models.CASCADE, related_name='category_links')
+    category = models.ForeignKey(WasteCategory, on_delete=models.CASCADE, related_name='buyer_links')
+    
+    class Meta:
+        unique_together = ['buyer', 'category']
+        indexes = [
+            models.Index(fields=['category', 'buyer'], name='buyercategory_category_buyer'),
+        ]
+        verbose_name = 'Buyer Category'
+        verbose_name_plural = 'Buyer Categories'
+    
+    def __str__(self):
+        return f"{self.buyer.shop_name} - {self.category_id}"
+
+
+class LegacyBuyerCategory(models.Model):
+    """
+    A code from the removed Buyer.waste_categories_handled JSON list that
+    matched no WasteCategory, kept so it can still be mapped by hand
+    """
+    
+    buyer = models.ForeignKey(Buyer, on_delete=models.CASCADE, related_name='legacy_categories')
+    code = models.CharField(max_length=100)
+    
+    class Meta:
+        unique_together = ['buyer', 'code']
+        verbose_name = 'Legacy Buyer Category'
+        verbose_name_plural = 'Legacy Buyer Categories'
+    
+    def __str__(self):
+        return f"{self.buyer.shop_name} - {self.code}"
+
+
 class PickupRequest(models.Model):
     """Pickup request from buyer to user for waste collection"""
     
@@ -252,10 +477,85 @@ class PickupRequest(models.Model):
     
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['buyer', 'created_at'], name='pickuprequest_buyer_created'),
+        ]
         verbose_name = 'Pickup Request'
         verbose_name_plural = 'Pickup Requests'
 
 
+class BuyerActedListing(models.Model):
+    """
+    A pending waste report the buyer already sent a pickup request for.
+    Maintained from PickupRequest saves/deletes (see signals.py) and pruned
+    once the report leaves 'pending', so a buyer's open feed is one indexed
+    lookup instead of an anti-join over all pickup requests.
+    """
+    
+    buyer = models.ForeignKey(Buyer, on_delete=models.CASCADE, related_name='acted_listings')
+    waste_report = models.ForeignKey(WasteReport, on_delete=models.CASCADE, related_name='acted_by')
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        unique_together = ['buyer', 'waste_report']
+        verbose_name = 'Buyer Acted Listing'
+        verbose_name_plural = 'Buyer Acted Listings'
+    
+    def __str__(self):
+        return f"{self.buyer.shop_name} → report #{self.waste_report_id}"
+
+
+class SavedSearch(models.Model):
+    """Standing filter of a buyer: new matching waste reports are pushed as notifications"""
+    
+    buyer = models.ForeignKey(Buyer, on_delete=models.CASCADE, related_name='saved_searches')
+    name = models.CharField(max_length=100, blank=True)
+    categories = models.ManyToManyField(WasteCategory, blank=True, related_name='saved_searches',
+                                        help_text="Waste types to match (none = any)")
+    latitude = models.DecimalField(max_digits=8, decimal_places=5, null=True, blank=True)
+    longitude = models.DecimalField(max_digits=8, decimal_places=5, null=True, blank=True)
+    radius_km = models.DecimalField(max_digits=6, decimal_places=2, null=True, blank=True,
+                                    help_text="Match reports within this distance of the point (empty = anywhere)")
+    min_quantity_kg = models.DecimalField(max_digits=8, decimal_places=2, null=True, blank=True)
+    conditions = models.JSONField(default=list, blank=True, help_text="Waste conditions to match (empty = any)")
+    is_active = models.BooleanField(default=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        ordering = ['-created_at']
+        verbose_name = 'Saved Search'
+        verbose_name_plural = 'Saved Searches'
+    
+    def __str__(self):
+        return f"{self.buyer.shop_name} - {self.name or self.pk}"
+    
+    @property
+    def has_area(self):
+        return self.latitude is not None and self.longitude is not None and self.radius_km is not None
+
+
+class SavedSearchKey(models.Model):
+    """
+    Inverted index of saved searches: one row per (category, geohash cell) a
+    search matches, '' meaning any category / anywhere. See percolation.py.
+    """
+    
+    saved_search = models.ForeignKey(SavedSearch, on_delete=models.CASCADE, related_name='keys')
+    category = models.CharField(max_length=20, blank=True)
+    cell = models.CharField(max_length=12, blank=True)
+    
+    class Meta:
+        indexes = [
+            models.Index(fields=['category', 'cell'], name='savedsearchkey_category_cell'),
+        ]
+        verbose_name = 'Saved Search Key'
+        verbose_name_plural = 'Saved Search Keys'
+    
+    def __str__(self):
+        return f"{self.category or '*'}/{self.cell or '*'} -> {self.saved_search_id}"
+
+
 class BuyerRating(models.Model):
     """User ratings for buyers"""
     
@@ -287,11 +587,13 @@ class PickupHistory(models.Model):
     # User & Buyer Info
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='pickup_history')
     user_username = models.CharField(max_length=150, help_text="Username at time of pickup")
+    buyer = models.ForeignKey(Buyer, on_delete=models.SET_NULL, null=True, blank=True, related_name='pickup_history')
     buyer_shop_name = models.CharField(max_length=200, help_text="Shop name at time of pickup")
     
     # Waste Details
     waste_type = models.CharField(max_length=50, help_text="Type of waste collected")
     quantity = models.CharField(max_length=100, help_text="Quantity collected")
+    weight_kg = models.DecimalField(max_digits=8, decimal_places=2, null=True, blank=True, help_text="Quantity collected in kg")
     location = models.CharField(max_length=500, blank=True, help_text="Pickup location")
     
     # Transaction Details
@@ -310,6 +612,11 @@ class PickupHistory(models.Model):
     
     class Meta:
         ordering = ['-completed_at']
+        indexes = [
+            models.Index(fields=['user', 'completed_at'], name='pickuphistory_user_completed'),
+            models.Index(fields=['buyer_shop_name', 'completed_at'], name='pickuphistory_shop_completed'),
+            models.Index(fields=['buyer', 'completed_at'], name='pickuphistory_buyer_completed'),
+        ]
         verbose_name = 'Pickup History'
         verbose_name_plural = 'Pickup Histories'
 
@@ -322,6 +629,7 @@ class Notification(models.Model):
         ('request_accepted', 'Request Accepted'),
         ('request_rejected', 'Request Rejected'),
         ('pickup_completed', 'Pickup Completed'),
+        ('saved_search_match', 'Saved Search Match'),
         ('system', 'System Notification'),
     ]
     
@@ -338,6 +646,76 @@ class Notification(models.Model):
     
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['user', 'created_at'], name='notification_user_created'),
+        ]
     
     def __str__(self):
         return f"{self.user.username} - {self.title}"
+
+
+class ClassificationCacheEntry(models.Model):
+    """Persisted AI classification result keyed by the SHA-256 of the image bytes"""
+    
+    image_digest = models.CharField(max_length=64, unique=True, help_text="SHA-256 hex digest of the image bytes")
+    perceptual_hash = models.CharField(max_length=16, blank=True, help_text="64-bit dHash as hex, for near-duplicate lookup")
+    result = models.JSONField(help_text="Classification result returned by the classifier")
+    hit_count = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    last_used_at = models.DateTimeField(default=timezone.now, db_index=True)
+    
+    class Meta:
+        ordering = ['-last_used_at']
+        verbose_name = 'Classification Cache Entry'
+        verbose_name_plural = 'Classification Cache Entries'
+    
+    def __str__(self):
+        return f"{self.image_digest[:12]} ({self.hit_count} hits)"
+
+
+class UploadSession(models.Model):
+    """Chunked, resumable upload of a waste report photo"""
+    
+    STATUS_CHOICES = [
+        ('uploading', 'Uploading'),
+        ('completed', 'Completed'),
+        ('aborted', 'Aborted'),
+    ]
+    
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='upload_sessions')
+    filename = models.CharField(max_length=255)
+    total_size = models.PositiveBigIntegerField(help_text="Declared file size in bytes")
+    checksum_sha256 = models.CharField(max_length=64, blank=True, help_text="Expected SHA-256 of the whole file (hex)")
+    received_bytes = models.PositiveBigIntegerField(default=0)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='uploading')
+    waste_report = models.ForeignKey(WasteReport, on_delete=models.SET_NULL, null=True, blank=True, related_name='upload_sessions')
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    completed_at = models.DateTimeField(null=True, blank=True)
+    
+    class Meta:
+        ordering = ['-created_at']
+        verbose_name = 'Upload Session'
+        verbose_name_plural = 'Upload Sessions'
+    
+    def __str__(self):
+        return f"{self.filename} ({self.received_bytes}/{self.total_size} bytes, {self.status})"
+
+
+class MediaBlob(models.Model):
+    """A stored media file, named by its SHA-256, with the number of fields referencing it"""
+    
+    name = models.CharField(max_length=255, unique=True, help_text="Storage name, <upload dir>/<sha[:2]>/<sha256><ext>")
+    sha256 = models.CharField(max_length=64, db_index=True)
+    size = models.PositiveBigIntegerField(help_text="File size in bytes")
+    ref_count = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        ordering = ['-created_at']
+        verbose_name = 'Media Blob'
+        verbose_name_plural = 'Media Blobs'
+    
+    def __str__(self):
+        return f"{self.name} ({self.ref_count} refs)"
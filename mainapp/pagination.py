@@ -0,0 +1,162 @@
+"""
+Keyset (cursor) pagination for high-churn lists.
+
+Page-number pagination runs COUNT(*) on every page, reads and throws away
+OFFSET rows to reach deep pages, and shifts items between pages as new rows
+arrive. Here the list is ordered by a unique key such as (created_at, id) and
+the cursor holds the key of the last row sent; the next page is the rows
+after it. With an index on the ordering every page costs the same, and an
+infinite-scroll client never sees duplicates or gaps. The total count is
+only computed when asked for with ?count=true.
+
+Ordering specs are tuples of field names ('-created_at', '-id'), the last one
+unique. Nullable fields sort NULLs last in both directions.
+"""
+import base64
+import binascii
+import datetime
+import decimal
+import json
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db.models import F, Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+DEFAULT_ORDERING = ('-created_at', '-id')
+
+
+def _field(model, name):
+    return model._meta.get_field(name.lstrip('-'))
+
+
+def order_by_keyset(queryset, ordering):
+    """Order a queryset by a keyset spec, NULLs last"""
+    expressions = []
+    for name in ordering:
+        expression = F(name.lstrip('-'))
+        expression = expression.desc(nulls_last=True) if name.startswith('-') else expression.asc(nulls_last=True)
+        expressions.append(expression)
+    return queryset.order_by(*expressions)
+
+
+def after_position(model, ordering, position):
+    """Q matching the rows that come after ``position`` (one value per ordering field)"""
+    condition = Q(pk__in=[])
+    equal = Q()
+    for name, value in zip(ordering, position):
+        column = name.lstrip('-')
+        nullable = _field(model, column).null
+        if value is None:
+            # NULLs sort last: only more NULLs with a later tie-breaker follow
+            later = Q(pk__in=[])
+            same = Q(**{f'{column}__isnull': True})
+        else:
+            later = Q(**{f"{column}__{'lt' if name.startswith('-') else 'gt'}": value})
+            if nullable:
+                later |= Q(**{f'{column}__isnull': True})
+            same = Q(**{column: value})
+        condition |= equal & later
+        equal &= same
+    return condition
+
+
+class KeysetPagination(BasePagination):
+    """
+    Cursor pagination on a unique ordering. The view may define
+    ``keyset_ordering`` or ``get_keyset_ordering()``; default (-created_at, -id).
+    """
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+    count_query_param = 'count'
+    max_page_size = 100
+
+    def get_ordering(self, view):
+        if hasattr(view, 'get_keyset_ordering'):
+            return view.get_keyset_ordering()
+        return getattr(view, 'keyset_ordering', DEFAULT_ORDERING)
+
+    def get_page_size(self, request):
+        page_size = getattr(settings, 'REST_FRAMEWORK', {}).get('PAGE_SIZE') or 20
+        try:
+            requested = int(request.query_params.get(self.page_size_query_param, page_size))
+        except ValueError:
+            requested = page_size
+        return max(1, min(requested, self.max_page_size))
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.ordering = self.get_ordering(view)
+        model = queryset.model
+        page_size = self.get_page_size(request)
+
+        self.count = None
+        if request.query_params.get(self.count_query_param, '').lower() in ('1', 'true', 'yes'):
+            self.count = queryset.count()
+
+        queryset = order_by_keyset(queryset, self.ordering)
+        position = self.decode_cursor(request, model)
+        if position is not None:
+            queryset = queryset.filter(after_position(model, self.ordering, position))
+
+        rows = list(queryset[:page_size + 1])
+        self.next_position = None
+        if len(rows) > page_size:
+            rows = rows[:page_size]
+            last = rows[-1]
+            self.next_position = [getattr(last, name.lstrip('-')) for name in self.ordering]
+        return rows
+
+    def decode_cursor(self, request, model):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            position = json.loads(base64.urlsafe_b64decode(encoded.encode() + b'=' * (-len(encoded) % 4)))
+            if not isinstance(position, list) or len(position) != len(self.ordering):
+                raise ValueError
+            return [
+                None if value is None else _field(model, name).to_python(value)
+                for name, value in zip(self.ordering, position)
+            ]
+        except (ValueError, TypeError, binascii.Error, ValidationError):
+            raise NotFound('Invalid cursor')
+
+    def encode_cursor(self, position):
+        def plain(value):
+            if isinstance(value, (datetime.datetime, datetime.date)):
+                return value.isoformat()
+            if isinstance(value, decimal.Decimal):
+                return str(value)
+            return value
+        encoded = base64.urlsafe_b64encode(json.dumps([plain(v) for v in position]).encode()).decode()
+        return encoded.rstrip('=')
+
+    def get_next_link(self):
+        if self.next_position is None:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, self.encode_cursor(self.next_position))
+
+    def get_paginated_response(self, data):
+        response = OrderedDict()
+        if self.count is not None:
+            response['count'] = self.count
+        response['next'] = self.get_next_link()
+        response['results'] = data
+        return Response(response)
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'properties': {
+                'count': {'type': 'integer', 'description': 'Only with ?count=true'},
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
@@ -0,0 +1,103 @@
+"""
+Saved-search percolation: match each new waste report against the buyers'
+standing filters and notify the buyers whose filters match.
+
+Every saved search is indexed by SavedSearchKey rows, one per category it
+accepts ('' for any) times one per geohash cell covering its area ('' for
+anywhere). A new report looks up the keys for its category and each prefix
+of its geohash, so only the searches that can match are loaded; each is
+then checked exactly (distance, quantity, condition). Ingest cost grows with
+the number of matching searches, not with the number of buyers.
+"""
+from django.db import transaction
+
+from . import geo
+from .models import Notification, SavedSearch, SavedSearchKey
+
+
+# Smallest quantity a report of each size class can have (WasteReport.QUANTITY_TYPE_CHOICES)
+QUANTITY_TYPE_MIN_KG = {
+    'small': 1,
+    'medium': 3,
+    'large': 10,
+}
+
+
+def search_keys(saved_search):
+    """(category, cell) pairs indexing a saved search"""
+    categories = [category.code for category in saved_search.categories.all()] or ['']
+    cells = ['']
+    if saved_search.has_area:
+        prefixes = geo.covering_cells(saved_search.latitude, saved_search.longitude, float(saved_search.radius_km))
+        # Single-character cells do not cover circles around the poles; match anywhere, check exactly
+        if len(prefixes[0]) > 1:
+            cells = prefixes
+    return [(category, cell) for category in categories for cell in cells]
+
+
+def rebuild_keys(saved_search):
+    """Replace the index rows of a saved search (none while it is inactive)"""
+    with transaction.atomic():
+        SavedSearchKey.objects.filter(saved_search=saved_search).delete()
+        if saved_search.is_active:
+            SavedSearchKey.objects.bulk_create([
+                SavedSearchKey(saved_search=saved_search, category=category, cell=cell)
+                for category, cell in search_keys(saved_search)
+            ])
+
+
+def report_quantity_kg(report):
+    """Quantity used for min_quantity_kg: the exact quantity, else the size class minimum"""
+    if report.exact_quantity is not None:
+        return float(report.exact_quantity)
+    return QUANTITY_TYPE_MIN_KG.get(report.quantity_type, 0)
+
+
+def matches(saved_search, report):
+    """Exact check of a candidate search found through the index"""
+    if saved_search.conditions and report.waste_condition not in saved_search.conditions:
+        return False
+    if saved_search.min_quantity_kg is not None and report_quantity_kg(report) < float(saved_search.min_quantity_kg):
+        return False
+    if saved_search.has_area:
+        if report.latitude is None or report.longitude is None:
+            return False
+        distance = geo.haversine_km(saved_search.latitude, saved_search.longitude, report.latitude, report.longitude)
+        if distance > float(saved_search.radius_km):
+            return False
+    return True
+
+
+def matching_searches(report):
+    """Active saved searches matching a report"""
+    cells = [''] + [report.geohash[:length] for length in range(1, len(report.geohash) + 1)]
+    candidate_ids = SavedSearchKey.objects.filter(
+        category__in=['', report.waste_type], cell__in=cells
+    ).values('saved_search_id')
+    candidates = SavedSearch.objects.filter(pk__in=candidate_ids, is_active=True) \
+        .exclude(buyer__user_id=report.user_id).select_related('buyer')
+    return [saved_search for saved_search in candidates if matches(saved_search, report)]
+
+
+def percolate(report):
+    """Notify every buyer with a saved search matching a new report; returns the number notified"""
+    if report.status != 'pending':
+        return 0
+    notifications = {}
+    for saved_search in matching_searches(report):
+        # One notification per buyer, however many of their searches match
+        user_id = saved_search.buyer.user_id
+        if user_id in notifications:
+            continue
+        label = f" '{saved_search.name}'" if saved_search.name else ''
+        place = report.area or report.city
+        notifications[user_id] = Notification(
+            user_id=user_id,
+            notification_type='saved_search_match',
+            title=f'New waste matching your search{label}',
+            message=f"{report.get_waste_type_display()} ({report.get_quantity_type_display()})"
+                    + (f" in {place}" if place else ''),
+            waste_report=report,
+        )
+    Notification.objects.bulk_create(notifications.values(), batch_size=500)
+    return len(notifications)
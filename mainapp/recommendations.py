@@ -0,0 +1,291 @@
+"""
+Buyer recommendations for a waste report.
+
+Each buyer gets a score out of 1:
+    W_CATEGORY   * category match (1 for the report's category, 0.5 for 'mixed')
+  + W_DISTANCE   * closeness (1 at the report, 0 at RECOMMENDATION_RADIUS_KM or without location)
+  + W_RATING     * rating / 5 (smoothed towards 3 stars for buyers with few ratings)
+  + W_COMPLETION * share of recent pickups completed (smoothed towards 50%)
+
+CandidateIndex keeps, per category, the buyers handling it in two orders:
+by their location-independent score, and by geohash. A query scores the
+buyers in the geohash cells tiling the radius around the report (the only
+ones that can get closeness points), then walks the score-ordered list with
+a top-k heap and stops at the first buyer that cannot beat the k-th best. The work depends on
+the buyers near the report and k, not on the number of buyers.
+
+The index is rebuilt every RECOMMENDATION_INDEX_TTL seconds. When a buyer or
+their categories change in this process, only that buyer's entries are
+replaced (after commit), which copies the lists of their categories but reads
+one buyer from the database. Rating and pickup changes move a buyer's quality
+by a few hundredths at most and wait for the next rebuild.
+"""
+import bisect
+import copy
+import heapq
+import threading
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import Count, Q
+from django.utils import timezone
+
+from . import geo
+
+
+W_CATEGORY = 0.4
+W_DISTANCE = 0.3
+W_RATING = 0.2
+W_COMPLETION = 0.1
+
+MIXED = 'mixed'
+MIXED_MATCH = 0.5
+
+# Bayesian smoothing: a buyer starts as if they had these ratings / pickups
+RATING_PRIOR, RATING_PRIOR_WEIGHT = 3.0, 3
+COMPLETION_PRIOR, COMPLETION_PRIOR_WEIGHT = 0.5, 2
+
+ENDED_PICKUP_STATUSES = ['completed', 'rejected', 'cancelled']
+
+
+def buyer_quality(rating_total, rating_count, completed, ended):
+    """Location-independent part of the score"""
+    rating = (rating_total + RATING_PRIOR * RATING_PRIOR_WEIGHT) / (rating_count + RATING_PRIOR_WEIGHT)
+    completion = (completed + COMPLETION_PRIOR * COMPLETION_PRIOR_WEIGHT) / (ended + COMPLETION_PRIOR_WEIGHT)
+    return W_RATING * rating / 5 + W_COMPLETION * completion
+
+
+def load_buyer_rows(buyer_ids=None):
+    """(buyer_id, user_id, latitude, longitude, quality, category codes) for every buyer, or the given ones"""
+    from .models import Buyer, BuyerCategory, PickupRequest
+
+    since = timezone.now() - timedelta(days=getattr(settings, 'RECOMMENDATION_COMPLETION_DAYS', 30))
+    pickup_rows = PickupRequest.objects.filter(created_at__gte=since, status__in=ENDED_PICKUP_STATUSES)
+    links = BuyerCategory.objects.all()
+    buyers = Buyer.objects.order_by()
+    if buyer_ids is not None:
+        pickup_rows = pickup_rows.filter(buyer_id__in=buyer_ids)
+        links = links.filter(buyer_id__in=buyer_ids)
+        buyers = buyers.filter(pk__in=buyer_ids)
+    pickups = {
+        row['buyer_id']: (row['completed'], row['ended'])
+        for row in pickup_rows.values('buyer_id').annotate(
+            completed=Count('id', filter=Q(status='completed')), ended=Count('id')
+        )
+    }
+    categories = {}
+    for buyer_id, code in links.values_list('buyer_id', 'category_id').iterator(chunk_size=5000):
+        categories.setdefault(buyer_id, []).append(code)
+
+    rows = buyers.values_list('id', 'user_id', 'latitude', 'longitude', 'rating_sum', 'rating_count')
+    for buyer_id, user_id, latitude, longitude, rating_sum, rating_count in rows.iterator(chunk_size=5000):
+        if buyer_id not in categories:
+            continue
+        quality = buyer_quality(rating_sum, rating_count, *pickups.get(buyer_id, (0, 0)))
+        has_point = latitude is not None and longitude is not None
+        yield (
+            buyer_id, user_id,
+            float(latitude) if has_point else None,
+            float(longitude) if has_point else None,
+            quality, categories[buyer_id],
+        )
+
+
+class CandidateLists:
+    """Immutable per-category candidate lists built from buyer rows"""
+
+    def __init__(self, rows):
+        # buyer_id -> (user_id, latitude, longitude, quality)
+        self.buyers = {}
+        # buyer_id -> category codes
+        self.codes = {}
+        by_quality = {}
+        by_cell = {}
+        for buyer_id, user_id, latitude, longitude, quality, codes in rows:
+            self.buyers[buyer_id] = (user_id, latitude, longitude, quality)
+            self.codes[buyer_id] = list(codes)
+            cell = geo.encode(latitude, longitude) if latitude is not None else None
+            for code in codes:
+                by_quality.setdefault(code, []).append((quality, buyer_id))
+                if cell:
+                    by_cell.setdefault(code, []).append((cell, buyer_id))
+        # Best first; ids break ties so the order is deterministic
+        self.by_quality = {
+            code: [buyer_id for _, buyer_id in sorted(items, key=lambda item: (-item[0], item[1]))]
+            for code, items in by_quality.items()
+        }
+        self.by_cell = {code: sorted(items) for code, items in by_cell.items()}
+
+    def _quality_key(self, buyer_id):
+        return -self.buyers[buyer_id][3], buyer_id
+
+    def replace_buyers(self, buyer_ids, rows):
+        """
+        New lists with the given buyers' entries replaced by ``rows`` (buyers
+        without a row are removed). Only the lists of categories those buyers
+        left or joined are copied; the rest are shared with this instance.
+        """
+        changed = copy.copy(self)
+        changed.buyers = dict(self.buyers)
+        changed.codes = dict(self.codes)
+        changed.by_quality = dict(self.by_quality)
+        changed.by_cell = dict(self.by_cell)
+
+        buyer_ids = set(buyer_ids)
+        touched = set()
+        for buyer_id in buyer_ids:
+            touched.update(changed.codes.pop(buyer_id, []))
+            changed.buyers.pop(buyer_id, None)
+        cells = {}
+        for buyer_id, user_id, latitude, longitude, quality, codes in rows:
+            changed.buyers[buyer_id] = (user_id, latitude, longitude, quality)
+            changed.codes[buyer_id] = list(codes)
+            cells[buyer_id] = geo.encode(latitude, longitude) if latitude is not None else None
+            touched.update(codes)
+
+        for code in touched:
+            by_quality = [b for b in changed.by_quality.get(code, []) if b not in buyer_ids]
+            by_cell = [item for item in changed.by_cell.get(code, []) if item[1] not in buyer_ids]
+            for buyer_id, cell in cells.items():
+                if code not in changed.codes[buyer_id]:
+                    continue
+                key = changed._quality_key(buyer_id)
+                position = 0
+                while position < len(by_quality) and changed._quality_key(by_quality[position]) < key:
+                    position += 1
+                by_quality.insert(position, buyer_id)
+                if cell:
+                    bisect.insort(by_cell, (cell, buyer_id))
+            changed.by_quality[code] = by_quality
+            changed.by_cell[code] = by_cell
+        return changed
+
+    def _in_cells(self, code, prefixes):
+        cells = self.by_cell.get(code, [])
+        if len(prefixes[0]) == 1:
+            # Single-character cells do not cover circles around the poles: take every located buyer
+            yield from (buyer_id for _, buyer_id in cells)
+            return
+        for prefix in prefixes:
+            start = bisect.bisect_left(cells, (prefix,))
+            end = bisect.bisect_left(cells, (prefix + '~',))
+            yield from (buyer_id for _, buyer_id in cells[start:end])
+
+    def top(self, waste_type, latitude, longitude, k, radius_km, exclude_user_id=None):
+        """
+        [(score, buyer_id, distance_km)] of the k best buyers, best first,
+        and the number of buyers checked. distance_km is None without locations.
+        """
+        has_point = latitude is not None and longitude is not None
+        prefixes = geo.box_cells(latitude, longitude, radius_km) if has_point else None
+        heap = []
+        seen = set()
+
+        def consider(buyer_id, category_score):
+            if buyer_id in seen:
+                return
+            seen.add(buyer_id)
+            user_id, buyer_lat, buyer_lng, quality = self.buyers[buyer_id]
+            if user_id == exclude_user_id:
+                return
+            distance = None
+            score = category_score + quality
+            if len(heap) == k and score + W_DISTANCE <= heap[0][0]:
+                # Cannot make the cut even next door
+                return
+            if has_point and buyer_lat is not None:
+                distance = geo.haversine_km(latitude, longitude, buyer_lat, buyer_lng)
+                score += W_DISTANCE * max(0.0, 1 - distance / radius_km)
+            item = (score, -buyer_id, distance)
+            if len(heap) < k:
+                heapq.heappush(heap, item)
+            elif item > heap[0]:
+                heapq.heappushpop(heap, item)
+
+        matches = [(waste_type, W_CATEGORY)]
+        if waste_type != MIXED:
+            matches.append((MIXED, W_CATEGORY * MIXED_MATCH))
+
+        # Buyers that can score closeness points
+        if has_point:
+            for code, category_score in matches:
+                for buyer_id in self._in_cells(code, prefixes):
+                    consider(buyer_id, category_score)
+
+        # Everyone else scores category + quality only: walk best first until nobody can make the cut
+        for code, category_score in matches:
+            for buyer_id in self.by_quality.get(code, []):
+                if len(heap) == k and category_score + self.buyers[buyer_id][3] <= heap[0][0]:
+                    break
+                consider(buyer_id, category_score)
+
+        ranked = sorted(heap, reverse=True)
+        return [(score, -negative_id, distance) for score, negative_id, distance in ranked], len(seen)
+
+
+class CandidateIndex:
+    """Process-wide CandidateLists, rebuilt from the database when stale"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._lists = None
+        self._built_at = 0.0
+        self._stale = True
+        self._stats = {'builds': 0, 'updates': 0, 'queries': 0, 'checked': 0, 'build_ms': 0.0}
+
+    def invalidate(self):
+        self._stale = True
+
+    def _expired(self):
+        ttl = getattr(settings, 'RECOMMENDATION_INDEX_TTL', 300)
+        return self._lists is None or self._stale or time.monotonic() - self._built_at > ttl
+
+    def lists(self):
+        if self._expired():
+            with self._lock:
+                if self._expired():
+                    # Cleared first: a change during the build marks the new lists stale again
+                    self._stale = False
+                    started = time.monotonic()
+                    self._lists = CandidateLists(load_buyer_rows())
+                    self._built_at = time.monotonic()
+                    self._stats['builds'] += 1
+                    self._stats['build_ms'] = round((self._built_at - started) * 1000, 1)
+        return self._lists
+
+    def update_buyers(self, buyer_ids):
+        """Replace the entries of changed (or deleted) buyers instead of rebuilding everything"""
+        buyer_ids = set(buyer_ids)
+        if not buyer_ids or self._lists is None:
+            # Nothing built yet: the first query loads current rows anyway
+            return
+        rows = list(load_buyer_rows(buyer_ids))
+        with self._lock:
+            if self._lists is not None:
+                self._lists = self._lists.replace_buyers(buyer_ids, rows)
+                self._stats['updates'] += 1
+
+    def recommend(self, report, k=10):
+        """[(score, buyer_id, distance_km)] of the k best buyers for a waste report"""
+        radius_km = getattr(settings, 'RECOMMENDATION_RADIUS_KM', 50)
+        has_point = report.latitude is not None and report.longitude is not None
+        latitude = float(report.latitude) if has_point else None
+        longitude = float(report.longitude) if has_point else None
+        ranked, checked = self.lists().top(
+            report.waste_type, latitude, longitude, k, radius_km, exclude_user_id=report.user_id
+        )
+        with self._lock:
+            self._stats['queries'] += 1
+            self._stats['checked'] += checked
+        return ranked
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+        lists = self._lists
+        stats['buyers'] = len(lists.buyers) if lists else 0
+        return stats
+
+
+candidate_index = CandidateIndex()
@@ -0,0 +1,178 @@
+"""
+Chunked, resumable uploads of report photos.
+
+A client initiates an UploadSession with the file size (and optionally its
+SHA-256), then PUTs the bytes in chunks at increasing offsets. Each chunk is
+streamed from the request onto a chunk file on disk in small blocks, so a
+worker never holds a whole photo in memory, and no database lock is held while
+a slow client sends it. The session row is then locked briefly to check that
+the offset has not moved, append the chunk to the part file and record the new
+offset. A dropped connection only costs the chunk in flight: the client asks
+for the session's offset and resumes from there. Finalize verifies size and checksum and hands the part
+file to the report's ImageField, which moves it into media storage.
+"""
+import hashlib
+import os
+import shutil
+import tempfile
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files.uploadedfile import UploadedFile
+from django.utils import timezone
+
+
+BLOCK_SIZE = 64 * 1024
+CHUNK_SUFFIX = '.chunk'
+
+
+class UploadError(ValueError):
+    """Raised for a chunk or finalize request that cannot be accepted"""
+
+    def __init__(self, message, status_code=400):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+def upload_dir():
+    return str(_setting('UPLOAD_SESSION_DIR', settings.BASE_DIR / 'upload_sessions'))
+
+
+def part_path(session):
+    return os.path.join(upload_dir(), f'{session.id}.part')
+
+
+def is_expired(session):
+    ttl = timedelta(hours=_setting('UPLOAD_SESSION_TTL_HOURS', 24))
+    return session.status == 'uploading' and session.updated_at < timezone.now() - ttl
+
+
+def parse_checksum(header):
+    """Accept 'sha256 <hex>' (or a bare hex digest); return the lowercase hex digest"""
+    if not header:
+        return None
+    parts = header.strip().split()
+    if len(parts) == 2 and parts[0].lower() == 'sha256':
+        value = parts[1]
+    elif len(parts) == 1:
+        value = parts[0]
+    else:
+        raise UploadError("Upload-Checksum must look like 'sha256 <hex digest>'")
+    value = value.lower()
+    if len(value) != 64 or any(c not in '0123456789abcdef' for c in value):
+        raise UploadError('Upload-Checksum must be a hex SHA-256 digest')
+    return value
+
+
+def check_chunk(session, offset, length):
+    """Reject a chunk that is not at the session's offset or does not fit the declared size"""
+    if offset != session.received_bytes:
+        raise UploadError(f'Expected offset {session.received_bytes}', status_code=409)
+    if length <= 0:
+        raise UploadError('Empty chunk')
+    if length > _setting('UPLOAD_CHUNK_MAX_BYTES', 8 * 1024 * 1024):
+        raise UploadError('Chunk is too large')
+    if offset + length > session.total_size:
+        raise UploadError('Chunk goes past the declared file size')
+
+
+def receive_chunk(session, stream, length, checksum=None):
+    """
+    Stream ``length`` bytes from ``stream`` into a chunk file of their own.
+
+    No lock is held while this runs, so concurrent requests for the same
+    offset each write a separate file and only one of them is committed.
+    Returns the chunk file's path; it is removed again if the body is short
+    or the chunk's SHA-256 does not match.
+    """
+    os.makedirs(upload_dir(), exist_ok=True)
+    fd, path = tempfile.mkstemp(dir=upload_dir(), prefix=f'{session.id}.', suffix=CHUNK_SUFFIX)
+    digest = hashlib.sha256()
+    written = 0
+    try:
+        with os.fdopen(fd, 'wb') as chunk:
+            while written < length:
+                block = stream.read(min(BLOCK_SIZE, length - written))
+                if not block:
+                    break
+                chunk.write(block)
+                digest.update(block)
+                written += len(block)
+        if written != length:
+            raise UploadError(f'Chunk ended after {written} of {length} bytes')
+        if checksum and digest.hexdigest() != checksum:
+            raise UploadError('Chunk checksum mismatch, please resend it')
+    except Exception:
+        discard_chunk(path)
+        raise
+    return path
+
+
+def commit_chunk(session, chunk_path, offset):
+    """
+    Append a received chunk to the part file at ``offset``; returns the new offset.
+
+    Call this with the session row locked and ``offset`` re-checked, so the
+    part file only ever grows by committed chunks. It is a local file copy,
+    which keeps the lock short however slow the client was.
+    """
+    with open(part_path(session), 'ab') as part, open(chunk_path, 'rb') as chunk:
+        part.truncate(offset)
+        part.seek(offset)
+        try:
+            shutil.copyfileobj(chunk, part, BLOCK_SIZE)
+        except Exception:
+            part.truncate(offset)
+            raise
+        return part.tell()
+
+
+def discard_chunk(path):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as part:
+        for block in iter(lambda: part.read(BLOCK_SIZE), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class SessionUploadedFile(UploadedFile):
+    """The completed part file, presented like Django's TemporaryUploadedFile"""
+
+    def __init__(self, path, name, size):
+        super().__init__(open(path, 'rb'), name=name, content_type=None, size=size)
+        self._path = path
+
+    def temporary_file_path(self):
+        # FileSystemStorage moves a file with a temporary path instead of copying it
+        return self._path
+
+
+def verify_complete(session):
+    """Check size and whole-file checksum; returns a SessionUploadedFile"""
+    path = part_path(session)
+    if session.received_bytes != session.total_size or not os.path.exists(path):
+        raise UploadError(f'Upload incomplete: {session.received_bytes} of {session.total_size} bytes received',
+                          status_code=409)
+    if os.path.getsize(path) != session.total_size:
+        raise UploadError('Stored upload does not match the declared size, please restart it', status_code=409)
+    if session.checksum_sha256 and file_sha256(path) != session.checksum_sha256:
+        raise UploadError('File checksum mismatch, please restart the upload')
+    return SessionUploadedFile(path, session.filename, session.total_size)
+
+
+def discard(session):
+    try:
+        os.remove(part_path(session))
+    except FileNotFoundError:
+        pass
@@ -0,0 +1,110 @@
+"""
+Full-text search over waste report text fields.
+
+The index is kept by the database itself, so every save (and queryset
+update) is reflected immediately:
+- SQLite: an external-content FTS5 table kept in sync by triggers, ranked
+  with bm25()
+- MySQL: a FULLTEXT index on the columns, ranked with MATCH ... AGAINST
+Both answer a query from the index instead of scanning the table. Other
+backends fall back to an unranked icontains filter.
+
+The index is created by migration 0023_wastereport_fulltext. SQLite cannot
+alter a column in place, so a migration that alters mainapp_wastereport
+rebuilds the table and loses the triggers; such a migration must recreate
+them with rebuild_index_sql() afterwards (see 0029_index_derivative_sources).
+"""
+import re
+
+from django.db import connection
+from django.db.models import Q
+
+
+SEARCH_FIELDS = ['additional_notes', 'area', 'city', 'landmark', 'full_address', 'waste_type_other']
+TABLE = 'mainapp_wastereport'
+FTS_TABLE = 'mainapp_wastereport_fts'
+FULLTEXT_INDEX = 'wastereport_fulltext'
+MAX_TERMS = 10
+
+
+def search_terms(query):
+    """Words of a user query, lowercased, at most MAX_TERMS"""
+    return [term.lower() for term in re.findall(r'\w+', query or '')][:MAX_TERMS]
+
+
+def _columns():
+    qn = connection.ops.quote_name
+    return ', '.join(f'{qn(TABLE)}.{qn(field)}' for field in SEARCH_FIELDS)
+
+
+def search_reports(queryset, query):
+    """
+    Reports matching every word of the query (prefix match), with a ``rank``
+    attribute (higher is better). Returns an empty queryset for an empty query.
+    """
+    terms = search_terms(query)
+    if not terms:
+        return queryset.extra(select={'rank': '0'}).none()
+
+    if connection.vendor == 'sqlite':
+        match = ' '.join(f'"{term}"*' for term in terms)
+        return queryset.extra(
+            tables=[FTS_TABLE],
+            where=[f'{FTS_TABLE}.rowid = {TABLE}.id', f'{FTS_TABLE} MATCH %s'],
+            params=[match],
+            select={'rank': f'-bm25({FTS_TABLE})'},
+        )
+
+    if connection.vendor == 'mysql':
+        match = ' '.join(f'+{term}*' for term in terms)
+        against = f'MATCH ({_columns()}) AGAINST (%s IN BOOLEAN MODE)'
+        return queryset.extra(
+            where=[against],
+            params=[match],
+            select={'rank': against},
+            select_params=[match],
+        )
+
+    condition = Q()
+    for term in terms:
+        any_field = Q()
+        for field in SEARCH_FIELDS:
+            any_field |= Q(**{f'{field}__icontains': term})
+        condition &= any_field
+    return queryset.filter(condition).extra(select={'rank': '0'})
+
+
+def create_index_sql(vendor):
+    """Statements creating the full-text index for a database vendor"""
+    if vendor == 'sqlite':
+        columns = ', '.join(SEARCH_FIELDS)
+        new_values = ', '.join(f'new.{field}' for field in SEARCH_FIELDS)
+        old_values = ', '.join(f'old.{field}' for field in SEARCH_FIELDS)
+        delete_row = f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, {columns}) VALUES ('delete', old.id, {old_values});"
+        insert_row = f'INSERT INTO {FTS_TABLE}(rowid, {columns}) VALUES (new.id, {new_values});'
+        return [
+            f"CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5({columns}, content='{TABLE}', content_rowid='id')",
+            f'CREATE TRIGGER {FTS_TABLE}_ai AFTER INSERT ON {TABLE} BEGIN {insert_row} END',
+            f'CREATE TRIGGER {FTS_TABLE}_ad AFTER DELETE ON {TABLE} BEGIN {delete_row} END',
+            f'CREATE TRIGGER {FTS_TABLE}_au AFTER UPDATE OF {columns} ON {TABLE} BEGIN {delete_row} {insert_row} END',
+            f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')",
+        ]
+    if vendor == 'mysql':
+        return [f"ALTER TABLE {TABLE} ADD FULLTEXT INDEX {FULLTEXT_INDEX} ({', '.join(SEARCH_FIELDS)})"]
+    return []
+
+
+def drop_index_sql(vendor):
+    if vendor == 'sqlite':
+        return [f'DROP TRIGGER IF EXISTS {FTS_TABLE}_{suffix}' for suffix in ('ai', 'ad', 'au')] + \
+            [f'DROP TABLE IF EXISTS {FTS_TABLE}']
+    if vendor == 'mysql':
+        return [f'ALTER TABLE {TABLE} DROP INDEX {FULLTEXT_INDEX}']
+    return []
+
+
+def rebuild_index_sql(vendor):
+    """Statements recreating the index after a migration rebuilt the table"""
+    if vendor == 'sqlite':
+        return drop_index_sql(vendor) + create_index_sql(vendor)
+    return []
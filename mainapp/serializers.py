@@ -1,6 +1,30 @@
 from rest_framework import serializers
+from django.conf import settings
 from django.contrib.auth.models import User
-from .models import Task, Note, WasteReport, Buyer, PickupRequest, BuyerRating, PickupHistory, Notification
+from django.core.files.storage import default_storage
+from .models import (
+    Task, Note, WasteReport, WasteReportMaterial, Buyer, PickupRequest, BuyerRating, PickupHistory, Notification,
+    UploadSession, SavedSearch, WasteCategory, normalize_waste_category,
+)
+from . import image_ingest
+
+
+def derivative_urls(serializer, field_file, derivatives):
+    """{width: {format: url}} for the derivatives of the current photo"""
+    if not field_file or (derivatives or {}).get('source') != field_file.name:
+        return {}
+    urls = {}
+    for variant in derivatives.get('variants', []):
+        urls.setdefault(str(variant['width']), {})[variant['format']] = \
+            absolute_url(serializer, default_storage.url(variant['name']))
+    return urls
+
+
+def absolute_url(serializer, url):
+    if not url:
+        return None
+    request = serializer.context.get('request')
+    return request.build_absolute_uri(url) if request is not None else url
 
 
 class UserSerializer(serializers.ModelSerializer):
@@ -49,6 +73,12 @@ class NoteSerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'author', 'created_at', 'updated_at']
 
 
+class WasteReportMaterialSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = WasteReportMaterial
+        fields = ['material', 'estimated_weight_kg', 'recyclable']
+
+
 class WasteReportSerializer(serializers.ModelSerializer):
     user_username = serializers.ReadOnlyField(source='user.username')
     waste_type_display = serializers.ReadOnlyField(source='get_waste_type_display')
@@ -56,6 +86,11 @@ class WasteReportSerializer(serializers.ModelSerializer):
     waste_condition_display = serializers.ReadOnlyField(source='get_waste_condition_display')
     status_display = serializers.ReadOnlyField(source='get_status_display')
     location_display = serializers.ReadOnlyField()
+    classification_status_display = serializers.ReadOnlyField(source='get_classification_status_display')
+    materials = WasteReportMaterialSerializer(many=True, read_only=True)
+    image_thumbnail = serializers.SerializerMethodField()
+    image_thumbnail_webp = serializers.SerializerMethodField()
+    image_derivatives = serializers.SerializerMethodField()
     
     class Meta:
         model = WasteReport
@@ -63,13 +98,28 @@ class WasteReportSerializer(serializers.ModelSerializer):
                   'waste_type', 'waste_type_display', 'waste_type_other',
                   'quantity_type', 'quantity_type_display', 'exact_quantity',
                   'waste_condition', 'waste_condition_display',
-                  'image', 'location_auto', 'latitude', 'longitude',
+                  'image', 'image_thumbnail', 'image_thumbnail_webp', 'image_derivatives',
+                  'location_auto', 'latitude', 'longitude',
                   'area', 'city', 'state', 'landmark', 'full_address',
                   'additional_notes', 'status', 'status_display',
                   'location_display', 'created_at', 'updated_at',
-                  'ai_classification', 'estimated_weight_kg', 'material_breakdown',
-                  'recyclability_score', 'disposal_recommendations']
-        read_only_fields = ['id', 'user', 'created_at', 'updated_at']
+                  'classification_status', 'classification_status_display',
+                  'ai_classification', 'classification_error', 'classified_at',
+                  'estimated_weight_kg', 'recyclability_score', 'materials']
+        read_only_fields = ['id', 'user', 'created_at', 'updated_at',
+                            'classification_status', 'ai_classification',
+                            'classification_error', 'classified_at',
+                            'estimated_weight_kg', 'recyclability_score']
+
+
+    def get_image_thumbnail(self, obj):
+        return absolute_url(self, obj.thumbnail_url)
+    
+    def get_image_thumbnail_webp(self, obj):
+        return absolute_url(self, obj.thumbnail_webp_url)
+    
+    def get_image_derivatives(self, obj):
+        return derivative_urls(self, obj.image, obj.image_derivatives)
 
 
 class WasteReportCreateSerializer(serializers.ModelSerializer):
@@ -77,25 +127,48 @@ class WasteReportCreateSerializer(serializers.ModelSerializer):
     
     class Meta:
         model = WasteReport
-        fields = ['name', 'mobile_number', 'email', 'waste_type', 'waste_type_other',
+        fields = ['id', 'name', 'mobile_number', 'email', 'waste_type', 'waste_type_other',
                   'quantity_type', 'exact_quantity', 'waste_condition', 'image',
                   'location_auto', 'latitude', 'longitude', 'area', 'city', 'state',
-                  'landmark', 'full_address', 'additional_notes']
+                  'landmark', 'full_address', 'additional_notes', 'classification_status']
+        read_only_fields = ['id', 'classification_status']
+    
+    def validate_image(self, image):
+        try:
+            image_ingest.validate_image(image)
+        except image_ingest.InvalidImageError as e:
+            raise serializers.ValidationError(str(e))
+        return image
 
 
 class BuyerSerializer(serializers.ModelSerializer):
     user_username = serializers.ReadOnlyField(source='user.username')
+    waste_types_accepted = serializers.SlugRelatedField(source='categories', slug_field='code', many=True, read_only=True)
     average_rating = serializers.ReadOnlyField()
     total_ratings = serializers.ReadOnlyField()
+    rating_histogram = serializers.ReadOnlyField()
+    shop_photo_thumbnail = serializers.SerializerMethodField()
+    shop_photo_thumbnail_webp = serializers.SerializerMethodField()
+    shop_photo_derivatives = serializers.SerializerMethodField()
     
     class Meta:
         model = Buyer
-        fields = ['id', 'user', 'user_username', 'shop_name', 'contact_number',
-                  'email', 'address', 'city', 'state', 'pincode',
+        fields = ['id', 'user', 'user_username', 'full_name', 'shop_name', 'shop_type',
+                  'mobile_number', 'shop_address', 'latitude', 'longitude',
                   'waste_types_accepted', 'trade_license', 'shop_photo',
+                  'shop_photo_thumbnail', 'shop_photo_thumbnail_webp', 'shop_photo_derivatives',
                   'is_verified', 'created_at', 'updated_at',
-                  'average_rating', 'total_ratings']
+                  'average_rating', 'total_ratings', 'rating_histogram']
         read_only_fields = ['id', 'user', 'is_verified', 'created_at', 'updated_at']
+    
+    def get_shop_photo_thumbnail(self, obj):
+        return absolute_url(self, obj.shop_photo_thumbnail_url)
+    
+    def get_shop_photo_thumbnail_webp(self, obj):
+        return absolute_url(self, obj.shop_photo_thumbnail_webp_url)
+    
+    def get_shop_photo_derivatives(self, obj):
+        return derivative_urls(self, obj.shop_photo, obj.shop_photo_derivatives)
 
 
 class PickupRequestSerializer(serializers.ModelSerializer):
@@ -132,16 +205,12 @@ class BuyerRatingSerializer(serializers.ModelSerializer):
 
 
 class PickupHistorySerializer(serializers.ModelSerializer):
-    waste_report_details = WasteReportSerializer(source='waste_report', read_only=True)
-    buyer_details = BuyerSerializer(source='buyer', read_only=True)
-    user_username = serializers.ReadOnlyField(source='user.username')
-    
     class Meta:
         model = PickupHistory
-        fields = ['id', 'user', 'user_username', 'waste_report', 'waste_report_details',
-                  'buyer', 'buyer_details', 'pickup_date', 'pickup_time',
-                  'pickup_address', 'price_paid', 'notes', 'created_at']
-        read_only_fields = ['id', 'created_at']
+        fields = ['id', 'user', 'user_username', 'buyer', 'buyer_shop_name',
+                  'waste_type', 'quantity', 'weight_kg', 'location', 'offered_price',
+                  'reported_at', 'scheduled_at', 'completed_at', 'pickup_request']
+        read_only_fields = fields
 
 
 class NotificationSerializer(serializers.ModelSerializer):
@@ -156,3 +225,68 @@ class NotificationSerializer(serializers.ModelSerializer):
                   'pickup_request', 'pickup_request_details',
                   'waste_report', 'waste_report_details']
         read_only_fields = ['id', 'user', 'created_at']
+
+
+class WasteCategoryField(serializers.SlugRelatedField):
+    """Category by code, accepting legacy spellings such as 'ewaste'"""
+    
+    def to_internal_value(self, data):
+        return super().to_internal_value(normalize_waste_category(data))
+
+
+class SavedSearchSerializer(serializers.ModelSerializer):
+    categories = WasteCategoryField(
+        many=True, slug_field='code', queryset=WasteCategory.objects.all(), required=False
+    )
+    conditions = serializers.ListField(
+        child=serializers.ChoiceField(choices=WasteReport.CONDITION_CHOICES), required=False
+    )
+    
+    class Meta:
+        model = SavedSearch
+        fields = ['id', 'name', 'categories', 'latitude', 'longitude', 'radius_km',
+                  'min_quantity_kg', 'conditions', 'is_active', 'created_at', 'updated_at']
+        read_only_fields = ['id', 'created_at', 'updated_at']
+    
+    def validate_radius_km(self, value):
+        max_radius = getattr(settings, 'GEO_MAX_RADIUS_KM', 100)
+        if value is not None and not 0 < value <= max_radius:
+            raise serializers.ValidationError(f"Must be between 0 and {max_radius} km")
+        return value
+    
+    def validate(self, attrs):
+        area = [attrs.get(field, getattr(self.instance, field, None)) for field in ('latitude', 'longitude', 'radius_km')]
+        if any(value is not None for value in area) and any(value is None for value in area):
+            raise serializers.ValidationError("latitude, longitude and radius_km must be given together")
+        return attrs
+
+
+class UploadSessionSerializer(serializers.ModelSerializer):
+    status_display = serializers.ReadOnlyField(source='get_status_display')
+    
+    class Meta:
+        model = UploadSession
+        fields = ['id', 'filename', 'total_size', 'checksum_sha256', 'received_bytes',
+                  'status', 'status_display', 'waste_report', 'created_at', 'updated_at', 'completed_at']
+        read_only_fields = ['id', 'received_bytes', 'status', 'waste_report',
+                            'created_at', 'updated_at', 'completed_at']
+    
+    def validate_filename(self, value):
+        value = value.replace('\\', '/').rsplit('/', 1)[-1].strip()
+        if not value:
+            raise serializers.ValidationError("Filename is required")
+        return value[-100:]
+    
+    def validate_total_size(self, value):
+        max_bytes = getattr(settings, 'CLASSIFIER_IMAGE_MAX_BYTES', 20 * 1024 * 1024)
+        if value <= 0:
+            raise serializers.ValidationError("File is empty")
+        if value > max_bytes:
+            raise serializers.ValidationError(f"Image file is too large ({value} bytes), maximum is {max_bytes} bytes")
+        return value
+    
+    def validate_checksum_sha256(self, value):
+        value = value.strip().lower()
+        if value and (len(value) != 64 or any(c not in '0123456789abcdef' for c in value)):
+            raise serializers.ValidationError("Must be a hex SHA-256 digest")
+        return value
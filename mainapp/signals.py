@@ -0,0 +1,234 @@
+"""
+Model signal handlers for mainapp
+"""
+from django.apps import apps
+from django.db import transaction
+from django.db.models.fields.files import FieldFile
+from django.db.models.signals import m2m_changed, post_delete, post_init, post_save
+from django.dispatch import receiver
+
+from .buyer_stats import invalidate_buyer_stats
+from .image_derivatives import derivative_generator, release_derivatives
+from .media_storage import MEDIA_FIELDS as MEDIA_FIELD_LABELS
+from .models import Buyer, BuyerActedListing, BuyerRating, PickupHistory, PickupRequest, SavedSearch, WasteReport
+from .percolation import percolate, rebuild_keys
+from .recommendations import candidate_index
+
+
+# Reference-counted file fields per model class
+MEDIA_FIELDS = {}
+for _label, _field in MEDIA_FIELD_LABELS:
+    MEDIA_FIELDS.setdefault(apps.get_model(_label), []).append(_field)
+
+
+def _stored_name(instance, field):
+    """Name of the file the row currently has in the database, without loading deferred fields"""
+    value = instance.__dict__.get(field)
+    if isinstance(value, FieldFile):
+        return value.name if value._committed else ''
+    return value if isinstance(value, str) else ''
+
+
+def _release(model, field, name):
+    release = getattr(model._meta.get_field(field).storage, 'release', None)
+    if name and release is not None:
+        release(name)
+
+
+@receiver(post_init, sender=WasteReport)
+@receiver(post_init, sender=Buyer)
+def remember_media_names(sender, instance, **kwargs):
+    instance._media_names = {
+        field: _stored_name(instance, field)
+        for field in MEDIA_FIELDS[sender] if field in instance.__dict__
+    }
+
+
+def _release_replaced_media(instance, update_fields):
+    """Drop the reference to a file that was replaced or cleared by this save"""
+    model = type(instance)
+    media_names = getattr(instance, '_media_names', {})
+    for field in MEDIA_FIELDS[model]:
+        if field not in media_names or (update_fields is not None and field not in update_fields):
+            continue
+        old, new = media_names[field], _stored_name(instance, field)
+        if old != new:
+            _release(model, field, old)
+        media_names[field] = new
+
+
+def _schedule_derivatives(instance, image_field, json_field, update_fields):
+    """Queue derivative generation after commit if the photo is new or replaced"""
+    if update_fields is not None and image_field not in update_fields:
+        return
+    field_file = getattr(instance, image_field)
+    derivatives = getattr(instance, json_field) or {}
+    if not field_file or derivatives.get('source') == field_file.name:
+        return
+    model, pk = type(instance), instance.pk
+    transaction.on_commit(lambda: derivative_generator.enqueue(model, pk, image_field, json_field))
+
+
+@receiver(post_init, sender=WasteReport)
+def remember_status(sender, instance, **kwargs):
+    instance._loaded_status = instance.__dict__.get('status')
+
+
+def _sync_acted_listings(instance, update_fields):
+    """Prune acted-listing rows when a report leaves 'pending', rebuild them if it returns"""
+    if update_fields is not None and 'status' not in update_fields:
+        return
+    previous = getattr(instance, '_loaded_status', None)
+    instance._loaded_status = instance.status
+    if previous is None or previous == instance.status:
+        return
+    if instance.status != 'pending':
+        BuyerActedListing.objects.filter(waste_report=instance).delete()
+    else:
+        buyer_ids = PickupRequest.objects.filter(waste_report=instance).order_by() \
+            .values_list('buyer_id', flat=True).distinct()
+        BuyerActedListing.objects.bulk_create(
+            [BuyerActedListing(buyer_id=buyer_id, waste_report=instance) for buyer_id in buyer_ids],
+            ignore_conflicts=True
+        )
+
+
+def _percolate_after_commit(report):
+    def run():
+        try:
+            notified = percolate(report)
+            if notified:
+                print(f"Saved searches: notified {notified} buyer(s) of report {report.pk}")
+        except Exception as e:
+            # Notifications are best effort, the report is already saved
+            print(f"Saved search percolation failed for report {report.pk}: {e}")
+    transaction.on_commit(run)
+
+
+@receiver(post_save, sender=WasteReport)
+def waste_report_saved(sender, instance, created=False, update_fields=None, **kwargs):
+    _release_replaced_media(instance, update_fields)
+    _sync_acted_listings(instance, update_fields)
+    _schedule_derivatives(instance, 'image', 'image_derivatives', update_fields)
+    if created:
+        _percolate_after_commit(instance)
+
+
+# Buyer fields the recommendation candidate lists are built from
+CANDIDATE_FIELDS = {'user', 'latitude', 'longitude', 'rating_sum', 'rating_count'}
+
+
+def _update_candidates(buyer_ids):
+    """Refresh these buyers' recommendation entries once the change is committed"""
+    buyer_ids = set(buyer_ids)
+    transaction.on_commit(lambda: candidate_index.update_buyers(buyer_ids))
+
+
+@receiver(post_save, sender=Buyer)
+def buyer_saved(sender, instance, update_fields=None, **kwargs):
+    _release_replaced_media(instance, update_fields)
+    _schedule_derivatives(instance, 'shop_photo', 'shop_photo_derivatives', update_fields)
+    if update_fields is None or CANDIDATE_FIELDS.intersection(update_fields):
+        _update_candidates([instance.pk])
+
+
+def _release_deleted_media(instance):
+    model = type(instance)
+    for field in MEDIA_FIELDS[model]:
+        _release(model, field, _stored_name(instance, field))
+
+
+@receiver(post_delete, sender=WasteReport)
+def waste_report_deleted(sender, instance, **kwargs):
+    _release_deleted_media(instance)
+    release_derivatives(sender, 'image_derivatives', instance.image_derivatives)
+
+
+@receiver(post_delete, sender=Buyer)
+def buyer_deleted(sender, instance, **kwargs):
+    _release_deleted_media(instance)
+    release_derivatives(sender, 'shop_photo_derivatives', instance.shop_photo_derivatives)
+    _update_candidates([instance.pk])
+
+
+@receiver(post_init, sender=BuyerRating)
+def remember_rating(sender, instance, **kwargs):
+    instance._loaded_rating = (instance.__dict__.get('buyer_id'), instance.__dict__.get('rating'))
+
+
+@receiver(post_save, sender=BuyerRating)
+def buyer_rating_saved(sender, instance, created, **kwargs):
+    """Keep Buyer.rating_count/rating_sum/rating_count_N in step; each change is one UPDATE"""
+    previous = None if created else getattr(instance, '_loaded_rating', None)
+    current = (instance.buyer_id, instance.rating)
+    if previous == current:
+        return
+    with transaction.atomic():
+        if previous and previous[0] is not None and previous[1] is not None:
+            Buyer.adjust_rating_aggregates(previous[0], previous[1], -1)
+        Buyer.adjust_rating_aggregates(instance.buyer_id, instance.rating, 1)
+    instance._loaded_rating = current
+
+
+@receiver(post_delete, sender=BuyerRating)
+def buyer_rating_deleted(sender, instance, **kwargs):
+    buyer_id, rating = getattr(instance, '_loaded_rating', (instance.buyer_id, instance.rating))
+    Buyer.adjust_rating_aggregates(buyer_id, rating, -1)
+
+
+@receiver(m2m_changed, sender=Buyer.categories.through)
+def buyer_categories_changed(sender, instance, action, reverse, pk_set=None, **kwargs):
+    # Ratings are left to the index TTL: one rating barely moves a buyer's score
+    if not action.startswith('post_'):
+        return
+    if not reverse:
+        _update_candidates([instance.pk])
+    elif pk_set:
+        _update_candidates(pk_set)
+    else:
+        # A category cleared of all its buyers
+        candidate_index.invalidate()
+
+
+@receiver(post_save, sender=PickupRequest)
+def pickup_request_saved(sender, instance, created, **kwargs):
+    # Rows only exist for pending reports; _sync_acted_listings rebuilds them
+    # from the requests if the report returns to 'pending'
+    if created and WasteReport.objects.filter(pk=instance.waste_report_id, status='pending').exists():
+        BuyerActedListing.objects.get_or_create(buyer_id=instance.buyer_id, waste_report_id=instance.waste_report_id)
+    invalidate_buyer_stats(instance.buyer_id)
+
+
+@receiver(post_delete, sender=PickupRequest)
+def pickup_request_deleted(sender, instance, **kwargs):
+    others = PickupRequest.objects.filter(buyer_id=instance.buyer_id, waste_report_id=instance.waste_report_id)
+    if not others.exists():
+        BuyerActedListing.objects.filter(buyer_id=instance.buyer_id, waste_report_id=instance.waste_report_id).delete()
+    invalidate_buyer_stats(instance.buyer_id)
+
+
+@receiver(post_save, sender=PickupHistory)
+@receiver(post_delete, sender=PickupHistory)
+def pickup_history_changed(sender, instance, **kwargs):
+    invalidate_buyer_stats(instance.buyer_id)
+
+
+@receiver(post_save, sender=SavedSearch)
+def saved_search_saved(sender, instance, **kwargs):
+    rebuild_keys(instance)
+
+
+@receiver(m2m_changed, sender=SavedSearch.categories.through)
+def saved_search_categories_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    # reverse: category.saved_searches was changed from the category side.
+    # A reverse clear sends no pk_set, so note the searches before the rows go.
+    if action == 'pre_clear' and reverse:
+        instance._cleared_saved_search_ids = list(instance.saved_searches.values_list('pk', flat=True))
+        return
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if action == 'post_clear' and reverse:
+        pk_set = instance.__dict__.pop('_cleared_saved_search_ids', [])
+    searches = SavedSearch.objects.filter(pk__in=pk_set or []) if reverse else [instance]
+    for saved_search in searches:
+        rebuild_keys(saved_search)
@@ -0,0 +1,161 @@
+"""
+Single-flight coalescing of identical in-flight classifications.
+
+When several requests for the same image digest arrive together (double
+submits, "classify" followed quickly by "submit"), only the first one calls
+the model; the others wait on its future and get a copy of its result. The
+leader checks the cache once more before calling, since a previous leader
+may have stored the result just after this caller's cache lookup.
+
+Optionally the leader also takes an advisory file lock per digest in
+CLASSIFIER_SINGLE_FLIGHT_LOCK_DIR, so workers in other processes on the same
+host wait for it too and then pick the stored result up from the cache.
+Each digest has its own lock file, so different images never wait for each
+other. The holder deletes the file before unlocking; a waiter that then gets
+the lock on the deleted file notices and locks the path afresh.
+"""
+import copy
+import os
+import threading
+import time
+from concurrent.futures import Future
+
+from django.conf import settings
+
+try:
+    import fcntl
+except ImportError:  # Windows: in-process coalescing only
+    fcntl = None
+
+
+class SingleFlight:
+    """Registry of in-flight calls keyed by a string, one shared future per key"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+        self._counters = {
+            'leaders': 0,
+            'coalesced': 0,
+            'leader_cache_hits': 0,
+            'cross_process_waits': 0,
+            'cross_process_hits': 0,
+        }
+
+    @property
+    def lock_dir(self):
+        lock_dir = getattr(settings, 'CLASSIFIER_SINGLE_FLIGHT_LOCK_DIR', None)
+        return str(lock_dir) if lock_dir and fcntl is not None else None
+
+    def do(self, key, fn, recheck=None):
+        """
+        Run fn() once per key across concurrent callers.
+
+        Returns (result, shared); shared is True when the result came from
+        another caller's call, in this process or (after waiting on its lock)
+        another one. ``recheck`` is called by the leader before fn() (after
+        taking the cross-process lock, if any) and may return an already
+        stored result; a result stored before the leader started is not shared.
+        """
+        with self._lock:
+            future = self._calls.get(key)
+            leader = future is None
+            if leader:
+                future = Future()
+                self._calls[key] = future
+                self._counters['leaders'] += 1
+            else:
+                self._counters['coalesced'] += 1
+
+        if not leader:
+            return copy.deepcopy(future.result()), True
+
+        try:
+            result, shared = self._run_leader(key, fn, recheck)
+            future.set_result(copy.deepcopy(result))
+            return result, shared
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+
+    def _run_leader(self, key, fn, recheck):
+        lock_dir = self.lock_dir
+        if lock_dir is None:
+            return self._recheck_or_call(fn, recheck, 'leader_cache_hits', shared=False)
+
+        os.makedirs(lock_dir, exist_ok=True)
+        path = os.path.join(lock_dir, f'{key}.lock')
+        lock_file, waited = self._acquire(path)
+        if lock_file is None:
+            # The other process is taking too long, don't wait forever
+            return fn(), False
+        try:
+            if waited:
+                return self._recheck_or_call(fn, recheck, 'cross_process_hits', shared=True)
+            return self._recheck_or_call(fn, recheck, 'leader_cache_hits', shared=False)
+        finally:
+            self._release(path, lock_file)
+
+    def _recheck_or_call(self, fn, recheck, counter, shared):
+        if recheck is not None:
+            result = recheck()
+            if result is not None:
+                with self._lock:
+                    self._counters[counter] += 1
+                return result, shared
+        return fn(), False
+
+    def _acquire(self, path):
+        """
+        Lock the file at ``path``, waiting at most the remote call deadline.
+        Returns (open lock file or None on timeout, waited).
+        """
+        deadline = time.monotonic() + getattr(settings, 'CLASSIFIER_REMOTE_TIMEOUT_SECONDS', 20) + 5
+        waited = False
+        while True:
+            lock_file = open(path, 'a')
+            while True:
+                try:
+                    fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                    break
+                except BlockingIOError:
+                    pass
+                if not waited:
+                    waited = True
+                    with self._lock:
+                        self._counters['cross_process_waits'] += 1
+                if time.monotonic() >= deadline:
+                    lock_file.close()
+                    return None, waited
+                time.sleep(0.05)
+            try:
+                current = os.stat(path).st_ino
+            except FileNotFoundError:
+                current = None
+            if current == os.fstat(lock_file.fileno()).st_ino:
+                return lock_file, waited
+            # The previous holder deleted this file while we waited: lock the new one
+            lock_file.close()
+
+    def _release(self, path, lock_file):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+        finally:
+            lock_file.close()
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._counters)
+            stats['in_flight'] = len(self._calls)
+        stats['cross_process'] = self.lock_dir is not None
+        return stats
+
+
+classification_flights = SingleFlight()
@@ -0,0 +1,77 @@
+from decimal import Decimal
+
+from django.test import TestCase
+
+from mainapp.models import BuyerActedListing, PickupRequest, WasteReport
+
+from .utils import make_buyer, make_report, make_user
+
+
+class ActedListingTests(TestCase):
+    def setUp(self):
+        self.owner = make_user('reporter')
+        self.reports = [make_report(self.owner) for _ in range(4)]
+        self.buyer = make_buyer('dealer')
+        self.other = make_buyer('rival')
+
+    def request_pickup(self, report, buyer=None):
+        return PickupRequest.objects.create(waste_report=report, buyer=buyer or self.buyer,
+                                            user=self.owner, offered_price=Decimal('100'))
+
+    def open_ids(self, buyer=None):
+        return set(WasteReport.objects.open_for_buyer(buyer or self.buyer).values_list('pk', flat=True))
+
+    def anti_join_ids(self, buyer=None):
+        return set(WasteReport.objects.filter(status='pending')
+                   .exclude(pickup_requests__buyer=buyer or self.buyer).values_list('pk', flat=True))
+
+    def test_requested_reports_leave_only_that_buyers_feed(self):
+        self.request_pickup(self.reports[0])
+        self.request_pickup(self.reports[1], self.other)
+
+        self.assertEqual(self.open_ids(), {r.pk for r in self.reports[1:]})
+        self.assertEqual(self.open_ids(self.other), {self.reports[0].pk, self.reports[2].pk, self.reports[3].pk})
+        self.assertEqual(self.open_ids(), self.anti_join_ids())
+
+    def test_listing_returns_after_the_last_request_is_deleted(self):
+        first = self.request_pickup(self.reports[0])
+        second = self.request_pickup(self.reports[0])
+
+        first.delete()
+        self.assertNotIn(self.reports[0].pk, self.open_ids())
+        second.delete()
+        self.assertIn(self.reports[0].pk, self.open_ids())
+        self.assertFalse(BuyerActedListing.objects.exists())
+
+    def test_rows_are_pruned_and_rebuilt_with_the_report_status(self):
+        report = self.reports[0]
+        self.request_pickup(report)
+        self.request_pickup(report, self.other)
+
+        report.status = 'in_progress'
+        report.save(update_fields=['status'])
+        self.assertFalse(BuyerActedListing.objects.filter(waste_report=report).exists())
+
+        report = WasteReport.objects.get(pk=report.pk)
+        report.status = 'pending'
+        report.save()
+        self.assertEqual(set(BuyerActedListing.objects.filter(waste_report=report).values_list('buyer', flat=True)),
+                         {self.buyer.pk, self.other.pk})
+        self.assertEqual(self.open_ids(), self.anti_join_ids())
+
+    def test_saves_without_status_leave_rows_alone(self):
+        self.request_pickup(self.reports[0])
+        self.reports[0].city = 'Mumbai'
+        self.reports[0].save(update_fields=['city'])
+        self.assertEqual(BuyerActedListing.objects.count(), 1)
+
+    def test_requests_on_reports_that_are_not_pending_add_no_rows(self):
+        report = self.reports[0]
+        report.status = 'in_progress'
+        report.save(update_fields=['status'])
+        self.request_pickup(report)
+        self.assertFalse(BuyerActedListing.objects.exists())
+
+        report.status = 'pending'
+        report.save(update_fields=['status'])
+        self.assertEqual(list(BuyerActedListing.objects.values_list('buyer', flat=True)), [self.buyer.pk])
@@ -0,0 +1,76 @@
+import threading
+import time
+from unittest import mock
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+
+from mainapp import api_views, waste_classifier
+
+from .utils import image_bytes, make_user
+
+
+class ClassifyWasteImagesTests(TestCase):
+    def test_keeps_order_and_bounds_concurrency(self):
+        lock = threading.Lock()
+        running = {'now': 0, 'max': 0}
+
+        def classify(image_file):
+            with lock:
+                running['now'] += 1
+                running['max'] = max(running['max'], running['now'])
+            time.sleep(0.02)
+            with lock:
+                running['now'] -= 1
+            return {'name': image_file.name}
+
+        files = [SimpleUploadedFile(f'{index}.jpg', b'') for index in range(8)]
+        with mock.patch.object(waste_classifier, 'classify_waste_image', side_effect=classify):
+            results = waste_classifier.classify_waste_images(files, max_workers=3)
+
+        self.assertEqual([result['name'] for result in results], [f'{index}.jpg' for index in range(8)])
+        self.assertLessEqual(running['max'], 3)
+        self.assertGreater(running['max'], 1)
+
+    def test_an_exception_only_fails_its_own_item(self):
+        def classify(image_file):
+            if image_file.name == 'bad.jpg':
+                raise RuntimeError('boom')
+            return {'confidence': 80}
+
+        files = [SimpleUploadedFile('good.jpg', b''), SimpleUploadedFile('bad.jpg', b'')]
+        with mock.patch.object(waste_classifier, 'classify_waste_image', side_effect=classify):
+            good, bad = waste_classifier.classify_waste_images(files)
+        self.assertEqual(good, {'confidence': 80})
+        self.assertIn('boom', bad['error'])
+
+
+class ClassifyBatchEndpointTests(TestCase):
+    url = '/api/waste-reports/classify-batch/'
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(make_user('uploader'))
+
+    def test_invalid_files_fail_individually(self):
+        result = {'waste_category': 'single', 'materials_detected': [], 'confidence': 82}
+        with mock.patch.object(api_views, 'classify_waste_images', side_effect=lambda files: [result] * len(files)) as batch:
+            response = self.client.post(self.url, {'images': [
+                SimpleUploadedFile('lot1.jpg', image_bytes(seed=1)),
+                SimpleUploadedFile('notes.txt', b'just text'),
+                SimpleUploadedFile('lot2.jpg', image_bytes(seed=2)),
+            ]}, format='multipart')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual((response.data['succeeded'], response.data['failed']), (2, 1))
+        self.assertEqual([item['success'] for item in response.data['results']], [True, False, True])
+        self.assertEqual(len(batch.call_args.args[0]), 2)
+
+    @override_settings(CLASSIFIER_BATCH_MAX_IMAGES=1)
+    def test_too_many_images(self):
+        response = self.client.post(self.url, {'images': [
+            SimpleUploadedFile('a.jpg', image_bytes(seed=1)),
+            SimpleUploadedFile('b.jpg', image_bytes(seed=2)),
+        ]}, format='multipart')
+        self.assertEqual(response.status_code, 400)
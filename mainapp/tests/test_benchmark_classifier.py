@@ -0,0 +1,30 @@
+import io
+import shutil
+import tempfile
+
+from django.core.management import call_command
+from django.test import TransactionTestCase
+
+from mainapp.classification_cache import classification_cache
+from mainapp.image_hashing import near_duplicate_index
+from mainapp.models import ClassificationCacheEntry
+
+
+class BenchmarkClassifierTests(TransactionTestCase):
+    def setUp(self):
+        self.fixtures = tempfile.mkdtemp(prefix='classifier-fixtures-')
+        self.addCleanup(shutil.rmtree, self.fixtures, ignore_errors=True)
+        self.addCleanup(classification_cache.clear)
+        self.addCleanup(near_duplicate_index.reset)
+
+    def test_leaves_no_replayed_results_behind(self):
+        ClassificationCacheEntry.objects.create(image_digest='real-photo', perceptual_hash='00000000000000ff', result={})
+        output = io.StringIO()
+        call_command(
+            'benchmark_classifier', endpoint='api', requests=3, concurrency=1, distinct_images=3,
+            latency_ms=0, jitter_ms=0, seed=7, fixtures=self.fixtures, stdout=output
+        )
+        self.assertIn('Removed 3 benchmark result(s)', output.getvalue())
+        self.assertEqual(list(ClassificationCacheEntry.objects.values_list('image_digest', flat=True)), ['real-photo'])
+        self.assertEqual(len(classification_cache._lru), 0)
+        self.assertEqual([digest for digest, _, _ in near_duplicate_index.lookup('00000000000000ff')], ['real-photo'])
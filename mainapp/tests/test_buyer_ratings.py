@@ -0,0 +1,61 @@
+import io
+
+from django.core.management import call_command
+from django.test import TestCase
+
+from mainapp.management.commands.repair_buyer_ratings import AGGREGATE_FIELDS
+from mainapp.models import Buyer, BuyerRating
+
+from .utils import make_buyer, make_user
+
+
+class RatingAggregateTests(TestCase):
+    def setUp(self):
+        self.buyer = make_buyer('dealer')
+        self.other = make_buyer('rival')
+        self.raters = [make_user(f'rater{n}') for n in range(3)]
+
+    def stored(self, buyer):
+        return Buyer.objects.values(*AGGREGATE_FIELDS).get(pk=buyer.pk)
+
+    def assert_in_step(self):
+        expected = Buyer.rating_aggregates([self.buyer.pk, self.other.pk])
+        for buyer in (self.buyer, self.other):
+            self.assertEqual(self.stored(buyer), expected[buyer.pk])
+
+    def test_create_update_move_and_delete(self):
+        ratings = [BuyerRating.objects.create(buyer=self.buyer, user=user, rating=stars)
+                   for user, stars in zip(self.raters, (5, 4, 4))]
+        buyer = Buyer.objects.get(pk=self.buyer.pk)
+        self.assertEqual((buyer.average_rating, buyer.total_ratings), (4.3, 3))
+        self.assertEqual(buyer.rating_histogram, {1: 0, 2: 0, 3: 0, 4: 2, 5: 1})
+
+        ratings[0].rating = 1
+        ratings[0].save()
+        self.assert_in_step()
+
+        rating = BuyerRating.objects.get(pk=ratings[1].pk)
+        rating.buyer = self.other
+        rating.rating = 2
+        rating.save()
+        self.assert_in_step()
+        self.assertEqual(self.stored(self.other)['rating_count_2'], 1)
+
+        ratings[2].save()
+        ratings[2].delete()
+        self.assert_in_step()
+        self.assertEqual(Buyer.objects.get(pk=self.buyer.pk).average_rating, 1.0)
+
+    def test_repair_command_fixes_drift(self):
+        BuyerRating.objects.create(buyer=self.buyer, user=self.raters[0], rating=5)
+        # Bulk updates bypass the signals
+        BuyerRating.objects.update(rating=3)
+
+        output = io.StringIO()
+        call_command('repair_buyer_ratings', '--dry-run', stdout=output)
+        self.assertIn('1 would be repaired', output.getvalue())
+        self.assertEqual(self.stored(self.buyer)['rating_count_5'], 1)
+
+        call_command('repair_buyer_ratings', '--batch-size', '1', stdout=io.StringIO())
+        self.assert_in_step()
+        self.assertEqual(self.stored(self.buyer)['rating_count_3'], 1)
@@ -0,0 +1,108 @@
+import importlib
+from decimal import Decimal
+from unittest import mock
+
+from django.core.cache import cache
+from django.db import connection
+from django.test import SimpleTestCase, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from mainapp import signals
+from mainapp.buyer_stats import buyer_stats
+from mainapp.models import PickupHistory, PickupRequest, WasteReport
+
+from .utils import make_buyer, make_report, make_user
+
+
+parse_weight_kg = importlib.import_module('mainapp.migrations.0028_pickuphistory_buyer_weight').parse_weight_kg
+
+
+class ParseWeightTests(SimpleTestCase):
+    def test_quantity_strings(self):
+        cases = {
+            '5.00 kg': Decimal('5.00'),
+            '500 g': Decimal('0.50'),
+            'Small (1–2 kg)': Decimal('1.50'),
+            'Large (10+ kg)': Decimal('10.00'),
+            '3-10 kg': Decimal('6.50'),
+            ' 12 KG ': Decimal('12.00'),
+            'a few bags': None,
+            '': None,
+            None: None,
+        }
+        for text, expected in cases.items():
+            self.assertEqual(parse_weight_kg(text), expected, text)
+
+
+class WeightPropertyTests(SimpleTestCase):
+    def test_exact_then_estimate_then_size_class(self):
+        report = WasteReport(quantity_type='medium', exact_quantity=Decimal('4.5'),
+                             estimated_weight_kg=Decimal('7.123'))
+        self.assertEqual(report.weight_kg, Decimal('4.5'))
+        report.exact_quantity = None
+        self.assertEqual(report.weight_kg, Decimal('7.12'))
+        report.estimated_weight_kg = None
+        self.assertEqual(report.weight_kg, Decimal(str(WasteReport.QUANTITY_TYPE_KG['medium'])))
+
+
+class BuyerStatsTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        patch = mock.patch.object(signals.derivative_generator, 'enqueue')
+        patch.start()
+        self.addCleanup(patch.stop)
+        self.buyer = make_buyer('dealer')
+        self.owner = make_user('reporter')
+
+    def request_pickup(self, status='pending'):
+        return PickupRequest.objects.create(waste_report=make_report(self.owner), buyer=self.buyer,
+                                            user=self.owner, offered_price=Decimal('50'), status=status)
+
+    def record_pickup(self, weight_kg):
+        now = timezone.now()
+        return PickupHistory.objects.create(
+            user=self.owner, user_username='reporter', buyer=self.buyer, buyer_shop_name='dealer scrap',
+            waste_type='metal', quantity=f'{weight_kg} kg', weight_kg=weight_kg, offered_price=Decimal('50'),
+            reported_at=now, scheduled_at=now, completed_at=now,
+        )
+
+    def test_counts_and_weight_in_one_cached_query(self):
+        for status in ('pending', 'pending', 'accepted', 'completed', 'rejected'):
+            self.request_pickup(status)
+        self.record_pickup(Decimal('2.50'))
+        self.record_pickup(Decimal('4.25'))
+
+        stats, queries = self.stats_queries()
+        self.assertEqual(len(queries), 1)
+        self.assertEqual(stats, {
+            'total_requests': 5, 'pending_requests': 2, 'accepted_requests': 1, 'completed_requests': 1,
+            'active_requests': 3, 'total_waste_kg': 6.75,
+        })
+        self.assertEqual(self.stats_queries()[1], [])
+
+    def stats_queries(self):
+        """buyer_stats() plus the queries it ran, leaving out the database cache backend's own"""
+        with CaptureQueriesContext(connection) as captured:
+            stats = buyer_stats(self.buyer.pk)
+        queries = [query['sql'] for query in captured.captured_queries
+                   if 'mainapp_cache' not in query['sql'] and 'SAVEPOINT' not in query['sql']]
+        return stats, queries
+
+    def test_changes_drop_the_cached_stats_after_commit(self):
+        self.assertEqual(buyer_stats(self.buyer.pk)['total_requests'], 0)
+        with self.captureOnCommitCallbacks(execute=True):
+            pickup = self.request_pickup()
+        self.assertEqual(buyer_stats(self.buyer.pk)['total_requests'], 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.record_pickup(Decimal('3'))
+        self.assertEqual(buyer_stats(self.buyer.pk)['total_waste_kg'], 3.0)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            pickup.delete()
+        self.assertEqual(buyer_stats(self.buyer.pk)['total_requests'], 0)
+
+    def test_buyer_without_pickups(self):
+        self.assertEqual(buyer_stats(self.buyer.pk)['total_waste_kg'], 0.0)
@@ -0,0 +1,112 @@
+from datetime import timedelta
+from unittest import mock
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from mainapp import waste_classifier
+from mainapp.classification_cache import ClassificationCache, LRUCache, image_digest, is_cacheable
+from mainapp.image_hashing import NearDuplicateIndex
+from mainapp.models import ClassificationCacheEntry
+
+from .utils import image_bytes
+
+
+RESULT = {
+    'waste_category': 'single',
+    'materials_detected': [{'material': 'plastic_pet', 'recyclable': True, 'estimated_weight_kg': 0.03}],
+    'confidence': 90,
+}
+
+
+class LRUCacheTests(TestCase):
+    def test_evicts_least_recently_used(self):
+        lru = LRUCache(2)
+        lru.set('a', 1)
+        lru.set('b', 2)
+        lru.get('a')
+        lru.set('c', 3)
+        self.assertEqual(lru.get('a'), 1)
+        self.assertIsNone(lru.get('b'))
+        self.assertEqual(len(lru), 2)
+
+
+class ClassificationCacheTests(TestCase):
+    def setUp(self):
+        self.cache = ClassificationCache()
+
+    def test_is_cacheable(self):
+        self.assertTrue(is_cacheable(RESULT))
+        self.assertTrue(is_cacheable({'waste_category': 'fake', 'error': 'Fake image'}))
+        self.assertFalse(is_cacheable({'waste_category': 'single', 'error': 'Classification failed'}))
+        self.assertFalse(is_cacheable(None))
+
+    def test_memory_then_database_hit(self):
+        self.cache.set('d1', RESULT)
+        self.assertEqual(self.cache.get('d1'), RESULT)
+        self.cache.clear()
+        self.assertEqual(self.cache.get('d1'), RESULT)
+        stats = self.cache.stats()
+        self.assertEqual((stats['memory_hits'], stats['db_hits']), (1, 1))
+        self.assertEqual(ClassificationCacheEntry.objects.get(image_digest='d1').hit_count, 1)
+
+    def test_returns_copies(self):
+        self.cache.set('d1', RESULT)
+        self.cache.get('d1')['confidence'] = 0
+        self.assertEqual(self.cache.get('d1')['confidence'], 90)
+
+    def test_expired_entry_is_a_miss(self):
+        self.cache.set('d1', RESULT)
+        self.cache.clear()
+        ClassificationCacheEntry.objects.update(last_used_at=timezone.now() - self.cache.ttl - timedelta(seconds=1))
+        self.assertIsNone(self.cache.get('d1'))
+
+    @override_settings(CLASSIFIER_CACHE_MAX_ENTRIES=2)
+    def test_evict_trims_to_max_entries(self):
+        now = timezone.now()
+        for age, digest in enumerate(['new', 'mid', 'old']):
+            ClassificationCacheEntry.objects.create(
+                image_digest=digest, result=RESULT, last_used_at=now - timedelta(minutes=age)
+            )
+        self.assertEqual(self.cache.evict(), 1)
+        self.assertEqual(set(ClassificationCacheEntry.objects.values_list('image_digest', flat=True)), {'new', 'mid'})
+
+
+@override_settings(WASTE_CLASSIFIER_BACKEND='remote')
+class ClassifyWasteImageCacheTests(TestCase):
+    def setUp(self):
+        patches = [
+            mock.patch.object(waste_classifier, 'classification_cache', ClassificationCache()),
+            mock.patch.object(waste_classifier, 'near_duplicate_index', NearDuplicateIndex()),
+            mock.patch.object(waste_classifier, '_classify_with_backend', return_value=dict(RESULT)),
+        ]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+        self.backend = waste_classifier._classify_with_backend
+
+    def test_repeat_upload_skips_the_model(self):
+        content = image_bytes(seed=1)
+        first = waste_classifier.classify_waste_image(SimpleUploadedFile('a.jpg', content))
+        second = waste_classifier.classify_waste_image(SimpleUploadedFile('b.jpg', content))
+        self.assertEqual(self.backend.call_count, 1)
+        self.assertNotIn('cached', first)
+        self.assertTrue(second['cached'])
+        self.assertTrue(ClassificationCacheEntry.objects.filter(image_digest=image_digest(content)).exists())
+
+    def test_failures_are_not_cached(self):
+        self.backend.return_value = {'waste_category': 'single', 'confidence': 0, 'error': 'Classification failed: boom'}
+        content = image_bytes(seed=2)
+        waste_classifier.classify_waste_image(SimpleUploadedFile('a.jpg', content))
+        waste_classifier.classify_waste_image(SimpleUploadedFile('a.jpg', content))
+        self.assertEqual(self.backend.call_count, 2)
+        self.assertFalse(ClassificationCacheEntry.objects.exists())
+
+    def test_result_stored_before_the_leader_recheck_is_a_cache_hit(self):
+        # Another caller stored the result between this caller's lookup and its recheck
+        with mock.patch.object(waste_classifier.classification_cache, 'get', side_effect=[None, dict(RESULT)]):
+            result = waste_classifier.classify_waste_image(SimpleUploadedFile('a.jpg', image_bytes(seed=3)))
+        self.backend.assert_not_called()
+        self.assertTrue(result['cached'])
+        self.assertNotIn('coalesced', result)
@@ -0,0 +1,137 @@
+import io
+from datetime import timedelta
+from unittest import mock
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from mainapp import classification_queue as queue_module
+from mainapp.classification_queue import (
+    ClassificationQueue, classify_report, schedule_classification, stale_classifications
+)
+from mainapp.models import WasteReport
+
+from .utils import TemporaryMediaMixin, image_bytes, make_report, make_user
+
+
+RESULT = {
+    'waste_category': 'single',
+    'materials_detected': [{'material': 'paper', 'recyclable': True, 'estimated_weight_kg': 0.5}],
+    'confidence': 77,
+}
+
+
+class ScheduleClassificationTests(TestCase):
+    def setUp(self):
+        self.report = make_report(make_user('reporter'))
+
+    def test_queued_after_commit(self):
+        with mock.patch.object(queue_module.classification_queue, 'enqueue', return_value=True) as enqueue:
+            with self.captureOnCommitCallbacks(execute=True):
+                schedule_classification(self.report)
+                enqueue.assert_not_called()
+        enqueue.assert_called_once_with(self.report.pk)
+        self.report.refresh_from_db()
+        self.assertEqual(self.report.classification_status, 'pending')
+
+    def test_full_queue_marks_report_failed(self):
+        with mock.patch.object(queue_module.classification_queue, 'enqueue', return_value=False):
+            with self.captureOnCommitCallbacks(execute=True):
+                schedule_classification(self.report)
+        self.report.refresh_from_db()
+        self.assertEqual(self.report.classification_status, 'failed')
+        self.assertIn('queue is full', self.report.classification_error)
+
+
+class ClassificationQueueTests(TestCase):
+    @override_settings(CLASSIFIER_QUEUE_MAX=0)
+    def test_rejects_when_full(self):
+        queue = ClassificationQueue()
+        self.assertFalse(queue.enqueue(1))
+        self.assertEqual(queue.stats()['rejected'], 1)
+
+
+class ClassifyReportTests(TemporaryMediaMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.report = make_report(make_user('reporter'), image=SimpleUploadedFile('pile.jpg', image_bytes(seed=4)))
+
+    def test_stores_the_result(self):
+        with mock.patch('mainapp.waste_classifier.classify_waste_image', return_value=dict(RESULT)):
+            self.assertTrue(classify_report(self.report.pk))
+        self.report.refresh_from_db()
+        self.assertEqual(self.report.classification_status, 'completed')
+        self.assertEqual(self.report.ai_classification['confidence'], 77)
+
+    def test_model_failure_leaves_report_failed(self):
+        failure = {'waste_category': 'single', 'confidence': 0, 'error': 'Classification failed: timeout'}
+        with mock.patch('mainapp.waste_classifier.classify_waste_image', return_value=failure):
+            self.assertFalse(classify_report(self.report.pk))
+        self.report.refresh_from_db()
+        self.assertEqual(self.report.classification_status, 'failed')
+        self.assertEqual(self.report.classification_error, 'Classification failed: timeout')
+
+    def test_missing_report(self):
+        self.assertFalse(classify_report(self.report.pk + 100))
+        self.assertEqual(WasteReport.objects.get(pk=self.report.pk).classification_status, 'not_requested')
+
+
+@override_settings(CLASSIFIER_JOB_TIMEOUT_SECONDS=600)
+class StaleClassificationTests(TestCase):
+    def setUp(self):
+        self.user = make_user('reporter')
+        self.report = make_report(self.user, classification_status='processing')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        patch = mock.patch.object(queue_module.classification_queue, 'enqueue', return_value=True)
+        self.enqueue = patch.start()
+        self.addCleanup(patch.stop)
+
+    def age(self, seconds):
+        WasteReport.objects.filter(pk=self.report.pk).update(
+            classification_queued_at=timezone.now() - timedelta(seconds=seconds)
+        )
+
+    def retry(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.client.post(f'/api/waste-reports/{self.report.pk}/classification/')
+
+    def test_schedule_records_when_queued(self):
+        schedule_classification(self.report)
+        self.report.refresh_from_db()
+        self.assertIsNotNone(self.report.classification_queued_at)
+
+    def test_recent_job_is_still_in_progress(self):
+        self.age(60)
+        self.assertEqual(self.retry().status_code, 409)
+        self.enqueue.assert_not_called()
+
+    def test_lost_job_is_requeued(self):
+        self.age(3600)
+        response = self.retry()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['classification_status'], 'pending')
+        self.enqueue.assert_called_once_with(self.report.pk)
+        self.assertFalse(stale_classifications().exists())
+
+    def test_job_without_timestamp_is_stale(self):
+        self.assertEqual(list(stale_classifications()), [self.report])
+
+    def test_command_requeues_stale_jobs(self):
+        self.age(3600)
+        fresh = make_report(self.user, classification_status='pending', classification_queued_at=timezone.now())
+        make_report(self.user, classification_status='completed')
+
+        out = io.StringIO()
+        call_command('requeue_stale_classifications', '--dry-run', stdout=out)
+        self.assertIn('Would requeue 1', out.getvalue())
+        self.enqueue.assert_not_called()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command('requeue_stale_classifications', stdout=io.StringIO())
+        self.enqueue.assert_called_once_with(self.report.pk)
+        self.assertEqual(WasteReport.objects.get(pk=self.report.pk).classification_status, 'pending')
+        self.assertEqual(WasteReport.objects.get(pk=fresh.pk).classification_status, 'pending')
@@ -0,0 +1,99 @@
+import json
+import os
+import shutil
+import tempfile
+import time
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from mainapp.classifier_client import (
+    CircuitBreaker, CircuitOpenError, GeminiClassifierClient, RecordingTransport, ReplayError, ReplayTransport,
+)
+
+
+class FailingTransport:
+    requires_api_key = False
+
+    def __init__(self, error=None):
+        self.error = error
+        self.calls = 0
+
+    def generate(self, api_key, prompt, image_bytes, mime_type, timeout):
+        self.calls += 1
+        if self.error:
+            raise self.error
+        return '{"confidence": 90}'
+
+
+class CircuitBreakerTests(SimpleTestCase):
+    def test_opens_after_consecutive_failures(self):
+        breaker = CircuitBreaker(failure_threshold=2, reset_timeout=60)
+        breaker.record_failure()
+        self.assertTrue(breaker.allow_request())
+        breaker.record_failure()
+        self.assertEqual(breaker.state, CircuitBreaker.OPEN)
+        self.assertFalse(breaker.allow_request())
+
+    def test_success_resets_the_failure_count(self):
+        breaker = CircuitBreaker(failure_threshold=2, reset_timeout=60)
+        breaker.record_failure()
+        breaker.record_success()
+        breaker.record_failure()
+        self.assertEqual(breaker.state, CircuitBreaker.CLOSED)
+
+    def test_half_open_allows_a_single_probe(self):
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=60)
+        breaker.record_failure()
+        with mock.patch('mainapp.classifier_client.time.monotonic', return_value=time.monotonic() + 61):
+            self.assertEqual(breaker.state, CircuitBreaker.HALF_OPEN)
+            self.assertTrue(breaker.allow_request())
+            self.assertFalse(breaker.allow_request())
+            breaker.record_failure()
+            self.assertEqual(breaker.state, CircuitBreaker.OPEN)
+
+
+class ClientTests(SimpleTestCase):
+    def make_client(self, transport):
+        client = GeminiClassifierClient()
+        client.breaker = CircuitBreaker(failure_threshold=2, reset_timeout=60)
+        client.set_transport(transport)
+        return client
+
+    def test_fails_fast_once_the_breaker_opens(self):
+        transport = FailingTransport(TimeoutError('deadline'))
+        client = self.make_client(transport)
+        for _ in range(2):
+            with self.assertRaises(TimeoutError):
+                client.generate('', 'prompt', b'image', 'image/jpeg')
+        with self.assertRaises(CircuitOpenError):
+            client.generate('', 'prompt', b'image', 'image/jpeg')
+        self.assertEqual(transport.calls, 2)
+        stats = client.stats()
+        self.assertEqual((stats['failures'], stats['timeouts']), (2, 2))
+
+    def test_returns_the_transport_text(self):
+        client = self.make_client(FailingTransport())
+        self.assertEqual(client.generate('', 'prompt', b'image', 'image/jpeg'), '{"confidence": 90}')
+
+
+class RecordReplayTests(SimpleTestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp(prefix='classifier-fixtures-')
+        self.addCleanup(shutil.rmtree, self.directory, ignore_errors=True)
+
+    def test_replays_what_was_recorded(self):
+        recorder = RecordingTransport(FailingTransport(), self.directory)
+        recorder.generate('', 'prompt', b'image-a', 'image/jpeg', 5)
+        self.assertEqual(len(os.listdir(self.directory)), 1)
+
+        replay = ReplayTransport(self.directory)
+        self.assertEqual(json.loads(replay.generate('', 'prompt', b'image-a', 'image/jpeg', 5)), {'confidence': 90})
+        # Unknown images get one of the recorded fixtures
+        self.assertEqual(json.loads(replay.generate('', 'prompt', b'other', 'image/jpeg', 5)), {'confidence': 90})
+
+    def test_injected_errors_and_deadline(self):
+        with self.assertRaises(ReplayError):
+            ReplayTransport(self.directory, error_rate=1.0).generate('', 'prompt', b'x', 'image/jpeg', 5)
+        with self.assertRaises(TimeoutError):
+            ReplayTransport(self.directory, latency_ms=50).generate('', 'prompt', b'x', 'image/jpeg', 0.01)
@@ -0,0 +1,65 @@
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+
+from mainapp.facets import facet_counts, field_filters
+from mainapp.models import WasteReport
+
+from .utils import make_buyer, make_report, make_user
+
+
+class FacetCountTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = make_user('reporter')
+        for waste_type, city, condition in [
+            ('plastic', 'Pune', 'dry'), ('plastic', 'pune', 'wet'), ('metal', 'Mumbai', 'dry'),
+            ('plastic', 'Mumbai', 'dry'), ('paper', 'Pune', 'dry'),
+        ]:
+            make_report(cls.owner, waste_type=waste_type, city=city, waste_condition=condition)
+        make_report(cls.owner, waste_type='glass', status='completed')
+
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+
+    def test_counts_per_value_with_labels(self):
+        with self.assertNumQueries(2):
+            result = facet_counts(WasteReport.objects.filter(status='pending'), ['waste_type', 'waste_condition'])
+        self.assertEqual(result['total'], 5)
+        self.assertEqual([(e['value'], e['count']) for e in result['facets']['waste_type']],
+                         [('plastic', 3), ('metal', 1), ('paper', 1)])
+        self.assertEqual(result['facets']['waste_condition'][0], {'value': 'dry', 'count': 4, 'label': 'Dry'})
+
+    def test_field_filters(self):
+        self.assertEqual(field_filters({'city': ' pune,Mumbai ,', 'waste_type': '', 'page': '2'}),
+                         {'city': ['Mumbai', 'pune']})
+
+    def test_endpoint_applies_filters_and_caches_per_scope(self):
+        client = APIClient()
+        client.force_authenticate(make_buyer('dealer').user)
+        url = '/api/waste-reports/facets/'
+
+        response = client.get(url, {'facets': 'waste_type', 'city': 'PUNE'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['total'], 3)
+        self.assertEqual({e['value']: e['count'] for e in response.data['facets']['waste_type']},
+                         {'plastic': 2, 'paper': 1})
+
+        make_report(self.owner, waste_type='paper', city='Pune')
+        # Buyers share the cached counts until FACETS_CACHE_SECONDS pass
+        other = APIClient()
+        other.force_authenticate(make_buyer('rival').user)
+        self.assertEqual(other.get(url, {'facets': 'waste_type', 'city': 'PUNE'}).data['total'], 3)
+        with override_settings(FACETS_CACHE_SECONDS=0):
+            cache.clear()
+            self.assertEqual(other.get(url, {'facets': 'waste_type', 'city': 'pune'}).data['total'], 4)
+
+        owner_client = APIClient()
+        owner_client.force_authenticate(self.owner)
+        self.assertEqual(owner_client.get(url, {'facets': 'waste_type'}).data['total'], 7)
+
+    def test_unknown_facet_is_rejected(self):
+        client = APIClient()
+        client.force_authenticate(self.owner)
+        self.assertEqual(client.get('/api/waste-reports/facets/', {'facets': 'status'}).status_code, 400)
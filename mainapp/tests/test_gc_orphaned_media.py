@@ -0,0 +1,60 @@
+import io
+import os
+
+from django.core.management import call_command
+from django.test import TestCase
+
+from mainapp.models import MediaBlob
+
+from .utils import TemporaryMediaMixin, make_report, make_user
+
+
+class GcOrphanedMediaTests(TemporaryMediaMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        make_report(make_user('reporter'), image='waste_reports/kept.jpg',
+                             image_derivatives={'source': 'waste_reports/kept.jpg', 'variants': [
+                                 {'width': 160, 'format': 'jpg', 'name': 'derivatives/kept_160w.jpg'},
+                             ]})
+        MediaBlob.objects.create(name='waste_reports/ab/blob.jpg', sha256='ab' * 32, size=4, ref_count=0)
+        for name in ('waste_reports/kept.jpg', 'derivatives/kept_160w.jpg', 'waste_reports/ab/blob.jpg',
+                     'waste_reports/orphan.jpg', 'derivatives/old_160w.jpg', 'waste_reports/fresh.jpg'):
+            self.write(name, old=name != 'waste_reports/fresh.jpg')
+
+    def write(self, name, old=True):
+        path = os.path.join(self.media_root, *name.split('/'))
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'wb') as media:
+            media.write(b'data')
+        if old:
+            os.utime(path, (0, 0))
+
+    def remaining(self):
+        return sorted(
+            os.path.relpath(os.path.join(directory, name), self.media_root).replace(os.sep, '/')
+            for directory, _, names in os.walk(self.media_root) for name in names
+        )
+
+    def gc(self, *args):
+        output = io.StringIO()
+        call_command('gc_orphaned_media', *args, stdout=output)
+        return output.getvalue()
+
+    def test_deletes_only_old_unreferenced_files(self):
+        output = self.gc('--batch-size', '2')
+        self.assertEqual(self.remaining(), [
+            'derivatives/kept_160w.jpg', 'waste_reports/ab/blob.jpg',
+            'waste_reports/fresh.jpg', 'waste_reports/kept.jpg',
+        ])
+        self.assertIn('2 orphaned', output)
+        self.assertIn('1 within the 24h grace period', output)
+
+    def test_dry_run_lists_orphans_without_deleting(self):
+        output = self.gc('--dry-run')
+        self.assertEqual(len(self.remaining()), 6)
+        self.assertIn('waste_reports/orphan.jpg', output)
+        self.assertIn('2 would be deleted', output)
+
+    def test_grace_period_can_be_shortened(self):
+        self.gc('--grace-hours', '0')
+        self.assertNotIn('waste_reports/fresh.jpg', self.remaining())
@@ -0,0 +1,66 @@
+import random
+
+from django.test import SimpleTestCase, TestCase
+
+from mainapp import geo
+from mainapp.models import WasteReport
+
+from .utils import make_report, make_user
+
+
+class GeohashTests(SimpleTestCase):
+    def test_encode(self):
+        self.assertEqual(geo.encode(57.64911, 10.40744, 11), 'u4pruydqqvj')
+        self.assertEqual(len(geo.encode(18.5204, 73.8567)), geo.GEOHASH_PRECISION)
+        self.assertTrue(geo.encode(18.5204, 73.8567).startswith(geo.encode(18.5204, 73.8567, 4)))
+
+    def test_prefix_range(self):
+        self.assertEqual(geo.prefix_range('tdr1'), ('tdr1', 'tdr2'))
+        self.assertEqual(geo.prefix_range('tdr9'), ('tdr9', 'tdrb'))
+        self.assertEqual(geo.prefix_range('tdrz'), ('tdrz', 'tds'))
+        self.assertEqual(geo.prefix_range('zz'), ('zz', None))
+
+    def test_prefix_range_matches_startswith(self):
+        rng = random.Random(7)
+        hashes = [geo.encode(rng.uniform(-90, 90), rng.uniform(-180, 180)) for _ in range(2000)]
+        for prefix in ('t', 'tek9', 'z', 'zz', 'b', '9'):
+            low, high = geo.prefix_range(prefix)
+            in_range = {h for h in hashes if low <= h and (high is None or h < high)}
+            self.assertEqual(in_range, {h for h in hashes if h.startswith(prefix)})
+
+    def test_covering_cells_contain_the_circle(self):
+        rng = random.Random(3)
+        for _ in range(200):
+            latitude, longitude, radius = rng.uniform(-80, 80), rng.uniform(-179, 179), rng.uniform(0.1, 50)
+            cells = geo.covering_cells(latitude, longitude, radius)
+            dlat, dlng = geo.radius_degrees(latitude, radius)
+            for point_lat, point_lng in ((latitude + dlat * 0.99, longitude), (latitude, longitude - dlng * 0.99)):
+                self.assertTrue(any(geo.encode(point_lat, point_lng).startswith(cell) for cell in cells))
+
+
+class FilterWithinTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        user = make_user('reporter')
+        rng = random.Random(11)
+        cls.points = [(18.5204 + rng.uniform(-0.2, 0.2), 73.8567 + rng.uniform(-0.2, 0.2)) for _ in range(300)]
+        for latitude, longitude in cls.points:
+            make_report(user, latitude=round(latitude, 6), longitude=round(longitude, 6))
+
+    def within(self, latitude, longitude, radius_km):
+        candidates = geo.filter_within(WasteReport.objects.filter(status='pending'), latitude, longitude, radius_km)
+        ranked = geo.rank_by_distance(candidates.values_list('pk', 'latitude', 'longitude'),
+                                      latitude, longitude, radius_km)
+        return {pk for _, pk in ranked}
+
+    def test_matches_a_full_scan(self):
+        rows = WasteReport.objects.values_list('pk', 'latitude', 'longitude')
+        for radius_km in (0.5, 2, 5, 15):
+            expected = {pk for _, pk in geo.rank_by_distance(rows, 18.5204, 73.8567, radius_km)}
+            self.assertEqual(self.within(18.5204, 73.8567, radius_km), expected)
+        self.assertTrue(expected)
+
+    def test_uses_ranges_not_like(self):
+        sql = str(geo.filter_within(WasteReport.objects.all(), 18.5204, 73.8567, 2).query)
+        self.assertNotIn('LIKE', sql.upper())
+        self.assertIn('"geohash" >=', sql)
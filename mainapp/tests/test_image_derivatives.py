@@ -0,0 +1,96 @@
+import io
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
+
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from PIL import Image
+
+from mainapp.image_derivatives import (
+    DerivativeGenerator, derivative_url, pick_variant, render_derivatives, shared_derivatives,
+)
+from mainapp.models import WasteReport
+
+from .utils import TemporaryMediaMixin, image_bytes, make_report, make_user
+
+
+class RenderDerivativesTests(TestCase):
+    def test_renders_each_width_and_format_without_exif(self):
+        exif = Image.Exif()
+        exif[0x010F] = 'CameraMaker'
+        buffer = io.BytesIO()
+        Image.new('RGB', (600, 300), (10, 120, 200)).save(buffer, format='JPEG', exif=exif)
+
+        variants = render_derivatives(buffer.getvalue(), [160, 480, 960], ['WEBP', 'JPEG'], 80)
+
+        self.assertEqual([(w, h, f) for w, h, f, _ in variants],
+                         [(160, 80, 'WEBP'), (160, 80, 'JPEG'), (480, 240, 'WEBP'), (480, 240, 'JPEG')])
+        for _, _, _, data in variants:
+            with Image.open(io.BytesIO(data)) as image:
+                self.assertEqual(len(image.getexif()), 0)
+
+    def test_small_photo_gets_one_variant_at_its_width(self):
+        variants = render_derivatives(image_bytes(size=(100, 50)), [160, 480], ['JPEG'], 80)
+        self.assertEqual([(w, h) for w, h, _, _ in variants], [(100, 50)])
+
+    def test_pick_variant(self):
+        derivatives = {'source': 'a.jpg', 'variants': [
+            {'width': 160, 'format': 'jpg', 'name': 'd/a_160w.jpg'},
+            {'width': 480, 'format': 'jpg', 'name': 'd/a_480w.jpg'},
+        ]}
+        self.assertEqual(pick_variant(derivatives, 200, 'JPEG')['width'], 480)
+        self.assertEqual(pick_variant(derivatives, 2000, 'JPEG')['width'], 480)
+        self.assertIsNone(pick_variant(derivatives, 200, 'WEBP'))
+
+
+@override_settings(IMAGE_DERIVATIVE_WIDTHS=[16, 32], IMAGE_DERIVATIVE_FORMATS=['JPEG'])
+class DerivativeGeneratorTests(TemporaryMediaMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.generator = DerivativeGenerator()
+        pool = ThreadPoolExecutor(max_workers=1)
+        self.addCleanup(pool.shutdown)
+        patch = mock.patch.object(self.generator, '_pools', return_value=(pool, None))
+        patch.start()
+        self.addCleanup(patch.stop)
+        self.owner = make_user('reporter')
+
+    def report_with_photo(self, seed=1):
+        return make_report(self.owner, image=SimpleUploadedFile('pile.jpg', image_bytes(seed=seed)))
+
+    def generate(self, report):
+        return self.generator.generate(WasteReport, report.pk, 'image', 'image_derivatives')
+
+    def test_records_variants_and_serves_them(self):
+        report = self.report_with_photo()
+        derivatives = self.generate(report)
+        report.refresh_from_db()
+        self.assertEqual(report.image_derivatives, derivatives)
+        self.assertEqual([v['width'] for v in derivatives['variants']], [16, 32])
+        self.assertTrue(all(default_storage.exists(v['name']) for v in derivatives['variants']))
+        self.assertTrue(derivative_url(report.image, derivatives, 20).endswith('_32w.jpg'))
+
+    def test_rows_sharing_a_photo_share_derivatives_until_the_last_is_deleted(self):
+        first, second = self.report_with_photo(), self.report_with_photo()
+        self.assertEqual(first.image.name, second.image.name)
+        derivatives = self.generate(first)
+        self.assertEqual(self.generate(second), derivatives)
+        self.assertEqual(self.generator.stats()['shared'], 1)
+        names = [v['name'] for v in derivatives['variants']]
+
+        with self.captureOnCommitCallbacks(execute=True):
+            WasteReport.objects.get(pk=first.pk).delete()
+        self.assertTrue(all(default_storage.exists(name) for name in names))
+        with self.captureOnCommitCallbacks(execute=True):
+            WasteReport.objects.get(pk=second.pk).delete()
+        self.assertFalse(any(default_storage.exists(name) for name in names))
+
+    def test_sharing_lookup_uses_the_image_column(self):
+        report = self.report_with_photo()
+        with CaptureQueriesContext(connection) as queries:
+            shared_derivatives(WasteReport, 'image_derivatives', report.image.name, exclude_pk=report.pk)
+        sql = queries.captured_queries[0]['sql']
+        self.assertIn('"mainapp_wastereport"."image" =', sql.replace('`', '"'))
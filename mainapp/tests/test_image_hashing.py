@@ -0,0 +1,127 @@
+from unittest import mock
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+
+from mainapp import waste_classifier
+from mainapp.classification_cache import ClassificationCache, image_digest
+from mainapp.image_hashing import TREE_HEADROOM, BKTree, NearDuplicateIndex, hamming_distance, perceptual_hash
+from mainapp.models import ClassificationCacheEntry
+
+from .utils import image_bytes
+
+
+RESULT = {
+    'waste_category': 'single',
+    'materials_detected': [{'material': 'glass', 'recyclable': True, 'estimated_weight_kg': 0.4}],
+    'confidence': 88,
+}
+
+
+def distance(a, b):
+    return hamming_distance(int(a, 16), int(b, 16))
+
+
+class PerceptualHashTests(TestCase):
+    def test_recompressed_copy_is_close_and_other_image_is_far(self):
+        original = perceptual_hash(image_bytes(seed=1))
+        self.assertLessEqual(distance(original, perceptual_hash(image_bytes(seed=1, quality=40))), 6)
+        self.assertLessEqual(distance(original, perceptual_hash(image_bytes(seed=1, size=(80, 60)))), 6)
+        self.assertGreater(distance(original, perceptual_hash(image_bytes(seed=2))), 6)
+
+    def test_undecodable_bytes_have_no_hash(self):
+        self.assertIsNone(perceptual_hash(b'not an image'))
+
+
+class BKTreeTests(TestCase):
+    def test_search_returns_matches_nearest_first(self):
+        tree = BKTree()
+        for key, value in [(0b0000, 'a'), (0b0001, 'b'), (0b0111, 'c'), (0b1111, 'd')]:
+            tree.add(key, value)
+        self.assertEqual([value for _, _, value in tree.search(0b0000, 3)], ['a', 'b', 'c'])
+        self.assertEqual(len(tree), 4)
+
+    def test_remove(self):
+        tree = BKTree()
+        tree.add(0b0000, 'a')
+        tree.add(0b0011, 'b')
+        self.assertFalse(tree.remove(0b0011, 'other'))
+        self.assertTrue(tree.remove(0b0011, 'b'))
+        self.assertEqual([value for _, _, value in tree.search(0b0011, 2)], ['a'])
+        self.assertEqual((len(tree), tree.removed), (1, 1))
+        tree.add(0b0011, 'b2')
+        self.assertEqual((len(tree), tree.removed), (2, 0))
+
+
+class NearDuplicateIndexTests(TestCase):
+    @override_settings(CLASSIFIER_CACHE_MAX_ENTRIES=3)
+    def test_tree_size_is_bounded(self):
+        index = NearDuplicateIndex()
+        for key in range(10):
+            index.add(format(1 << key, '016x'), f'd{key}')
+            self.assertLessEqual(index.stats()['indexed'], 3 * TREE_HEADROOM)
+
+    @override_settings(CLASSIFIER_CACHE_MAX_ENTRIES=3)
+    def test_full_cache_table_does_not_reload_on_every_add(self):
+        for key in range(3):
+            ClassificationCacheEntry.objects.create(image_digest=f'db{key}', perceptual_hash=format(1 << key, '016x'),
+                                                    result=RESULT)
+        index = NearDuplicateIndex()
+        with mock.patch.object(index, '_load', wraps=index._load) as load:
+            for key in range(3, 12):
+                index.add(format(1 << key, '016x'), f'd{key}')
+        # The first load, then one rebuild per three new images rather than one per add
+        self.assertEqual(load.call_count, 3)
+
+    def test_loads_classified_images_from_the_database(self):
+        ClassificationCacheEntry.objects.create(image_digest='real', perceptual_hash='00000000000000ff', result=RESULT)
+        ClassificationCacheEntry.objects.create(image_digest='borrowed', perceptual_hash='', result=RESULT)
+        index = NearDuplicateIndex()
+        self.assertEqual([digest for digest, _, _ in index.lookup('00000000000000fe')], ['real'])
+
+
+@override_settings(WASTE_CLASSIFIER_BACKEND='remote', CLASSIFIER_NEAR_DUPLICATE_MAX_DISTANCE=6)
+class NearDuplicateReuseTests(TestCase):
+    def setUp(self):
+        self.cache = ClassificationCache()
+        self.index = NearDuplicateIndex()
+        patches = [
+            mock.patch.object(waste_classifier, 'classification_cache', self.cache),
+            mock.patch.object(waste_classifier, 'near_duplicate_index', self.index),
+            mock.patch.object(waste_classifier, '_classify_with_backend', return_value=dict(RESULT)),
+        ]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+        self.backend = waste_classifier._classify_with_backend
+
+    def classify(self, content):
+        return waste_classifier.classify_waste_image(SimpleUploadedFile('photo.jpg', content))
+
+    def test_near_duplicate_borrows_without_being_indexed(self):
+        original, copy = image_bytes(seed=1), image_bytes(seed=1, quality=40)
+        self.classify(original)
+        result = self.classify(copy)
+
+        self.assertEqual(self.backend.call_count, 1)
+        self.assertTrue(result['cached'])
+        self.assertIn('near_duplicate_distance', result)
+        # The borrowed result serves exact re-uploads but is not a match target
+        entry = ClassificationCacheEntry.objects.get(image_digest=image_digest(copy))
+        self.assertEqual(entry.perceptual_hash, '')
+        self.assertEqual(self.index.stats()['indexed'], 1)
+
+    def test_skips_matches_evicted_from_the_cache(self):
+        content = image_bytes(seed=3)
+        phash = perceptual_hash(content)
+        nearest = format(int(phash, 16) ^ 0b1, '016x')
+        farther = format(int(phash, 16) ^ 0b11, '016x')
+        self.index.add(nearest, 'evicted')
+        self.index.add(farther, 'kept')
+        self.cache.set('kept', RESULT, perceptual_hash=farther)
+
+        result = self.classify(content)
+
+        self.assertEqual(result['near_duplicate_distance'], 2)
+        self.backend.assert_not_called()
+        self.assertEqual([digest for digest, _, _ in self.index.lookup(phash)], ['kept'])
@@ -0,0 +1,74 @@
+import io
+from unittest import mock
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import SimpleTestCase, override_settings
+from PIL import Image
+
+from mainapp import waste_classifier
+from mainapp.image_ingest import InvalidImageError, normalize_image, sniff_format, validate_image
+
+from .utils import image_bytes
+
+
+def upload(content, name='photo.jpg'):
+    return SimpleUploadedFile(name, content)
+
+
+class ValidateImageTests(SimpleTestCase):
+    def test_accepts_every_advertised_format(self):
+        for image_format in ['JPEG', 'PNG', 'WEBP', 'GIF', 'BMP']:
+            with self.subTest(image_format=image_format):
+                content = image_bytes(image_format=image_format)
+                self.assertEqual(sniff_format(content[:16]), image_format)
+                self.assertEqual(validate_image(upload(content)), (image_format, 64, 48))
+
+    def test_error_message_lists_the_accepted_formats(self):
+        with self.assertRaises(InvalidImageError) as raised:
+            validate_image(upload(b'hello, not an image', 'notes.txt'))
+        for name in ['JPG', 'PNG', 'WebP', 'GIF', 'BMP']:
+            self.assertIn(name, str(raised.exception))
+
+    def test_rejects_tiny_and_oversized_files(self):
+        with self.assertRaises(InvalidImageError):
+            validate_image(upload(image_bytes(size=(16, 16))))
+        with override_settings(CLASSIFIER_IMAGE_MAX_BYTES=100):
+            with self.assertRaises(InvalidImageError):
+                validate_image(upload(image_bytes()))
+
+    def test_leaves_the_file_at_the_start(self):
+        image_file = upload(image_bytes())
+        validate_image(image_file)
+        self.assertEqual(image_file.tell(), 0)
+
+
+class NormalizeImageTests(SimpleTestCase):
+    @override_settings(CLASSIFIER_IMAGE_MAX_EDGE=100, CLASSIFIER_IMAGE_FORMAT='JPEG')
+    def test_downscales_and_flattens_transparency(self):
+        buffer = io.BytesIO()
+        Image.new('RGBA', (400, 200), (255, 0, 0, 0)).save(buffer, format='PNG')
+        normalized, mime_type, info = normalize_image(buffer.getvalue())
+        self.assertEqual(mime_type, 'image/jpeg')
+        self.assertEqual(info['size'], [100, 50])
+        with Image.open(io.BytesIO(normalized)) as image:
+            self.assertEqual((image.format, image.mode), ('JPEG', 'RGB'))
+            # Transparent pixels become white, not black
+            self.assertGreater(min(image.getpixel((50, 25))), 240)
+
+    def test_small_upright_jpeg_is_sent_unchanged(self):
+        content = image_bytes()
+        normalized, _, info = normalize_image(content)
+        self.assertIs(normalized, content)
+        self.assertEqual(info['bytes'], len(content))
+
+
+class ClassifyRejectsInvalidImagesTests(SimpleTestCase):
+    def test_nothing_decodes_an_invalid_upload(self):
+        with mock.patch.object(waste_classifier, 'perceptual_hash') as phash, \
+                mock.patch.object(waste_classifier, '_classify_with_backend') as backend, \
+                mock.patch.object(waste_classifier, 'classification_cache') as cache:
+            result = waste_classifier.classify_waste_image(upload(b'GIF89a' + b'\x00' * 40, 'broken.gif'))
+        self.assertTrue(result['error'].startswith('Invalid image:'))
+        phash.assert_not_called()
+        backend.assert_not_called()
+        cache.get.assert_not_called()
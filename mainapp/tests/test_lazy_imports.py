@@ -0,0 +1,42 @@
+import os
+import subprocess
+import sys
+from unittest import mock
+
+from django.conf import settings
+from django.test import SimpleTestCase
+
+from mainapp.crypto import env_cipher, process_cipher
+
+
+IMPORT_CHECK = """
+import sys
+import django
+django.setup()
+import mainapp.api_urls, mainapp.urls, mainapp.admin
+print('loaded:' + ','.join(sorted(name for name in ('google.generativeai', 'cryptography.fernet', 'dotenv') if name in sys.modules)))
+"""
+
+
+class LazyImportTests(SimpleTestCase):
+    def test_url_confs_do_not_import_heavy_sdks(self):
+        output = subprocess.run(
+            [sys.executable, '-c', IMPORT_CHECK],
+            cwd=str(settings.BASE_DIR), env=dict(os.environ), capture_output=True, text=True, check=True,
+        ).stdout.splitlines()
+        self.assertEqual([line for line in output if line.startswith('loaded:')], ['loaded:'])
+
+
+class CipherTests(SimpleTestCase):
+    def test_process_cipher_is_built_once(self):
+        cipher = process_cipher()
+        self.assertIs(process_cipher(), cipher)
+        self.assertEqual(cipher.decrypt(cipher.encrypt(b'123412341234')), b'123412341234')
+
+    def test_env_cipher_uses_the_configured_key(self):
+        from cryptography.fernet import Fernet
+
+        key = Fernet.generate_key().decode()
+        with mock.patch.dict(os.environ, {'ENCRYPTION_KEY': key}):
+            token = env_cipher().encrypt(b'secret')
+        self.assertEqual(Fernet(key.encode()).decrypt(token), b'secret')
@@ -0,0 +1,111 @@
+import io
+import os
+import shutil
+import tempfile
+from unittest import mock
+
+import numpy as np
+from django.test import SimpleTestCase, override_settings
+from PIL import Image
+
+from mainapp import waste_classifier
+from mainapp.local_classifier import LocalClassifier, features_from_bytes, save_reference_set
+
+
+def tinted_image(base, seed, spread=25, pattern=None):
+    """JPEG of noise around an RGB colour"""
+    rng = np.random.default_rng(seed)
+    pixels = np.clip(np.array(base) + rng.normal(0, spread, (48, 48, 3)), 0, 255).astype(np.uint8)
+    if pattern == 'stripes':
+        pixels[::4] = 0
+    buffer = io.BytesIO()
+    Image.fromarray(pixels).save(buffer, format='JPEG', quality=90)
+    return buffer.getvalue()
+
+
+MATERIALS = {
+    'glass': (60, 150, 80),
+    'cardboard': (170, 130, 80),
+    'paper': (225, 225, 220),
+}
+
+
+def build_reference(path, per_material=12):
+    features, labels = [], []
+    for offset, (material, colour) in enumerate(MATERIALS.items()):
+        for index in range(per_material):
+            features.append(features_from_bytes(tinted_image(colour, seed=offset * 100 + index)))
+            labels.append(material)
+    return save_reference_set(path, features, labels)
+
+
+class LocalClassifierTests(SimpleTestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp(prefix='local-classifier-')
+        self.addCleanup(shutil.rmtree, self.directory, ignore_errors=True)
+        self.path = os.path.join(self.directory, 'reference.npz')
+
+    def test_classifies_images_like_the_reference_set(self):
+        typical, maximum = build_reference(self.path)
+        self.assertLess(typical, maximum)
+        result = LocalClassifier(self.path).classify(tinted_image(MATERIALS['glass'], seed=999))
+        self.assertEqual(result['materials_detected'][0]['material'], 'glass')
+        self.assertEqual(result['source'], 'local')
+        self.assertLessEqual(result['nearest_distance'], maximum)
+
+    def test_out_of_distribution_image_gets_no_answer(self):
+        build_reference(self.path)
+        classifier = LocalClassifier(self.path)
+        self.assertIsNone(classifier.classify(tinted_image((230, 20, 160), seed=1, spread=90, pattern='stripes')))
+
+    def test_confidence_drops_with_distance(self):
+        build_reference(self.path)
+        classifier = LocalClassifier(self.path)
+        near = classifier.classify(tinted_image(MATERIALS['paper'], seed=500))
+        farther = classifier.classify(tinted_image(MATERIALS['paper'], seed=500, spread=28))
+        self.assertEqual(farther['materials_detected'][0]['material'], 'paper')
+        self.assertGreater(farther['nearest_distance'], near['nearest_distance'])
+        self.assertLess(farther['confidence'], near['confidence'])
+
+    def test_picks_up_a_reference_set_written_later(self):
+        classifier = LocalClassifier(self.path)
+        self.assertFalse(classifier.is_available)
+        build_reference(self.path)
+        self.assertTrue(classifier.is_available)
+
+    def test_picks_up_a_rewritten_reference_set(self):
+        build_reference(self.path, per_material=4)
+        classifier = LocalClassifier(self.path)
+        self.assertEqual(len(classifier._load()[1]), 12)
+        build_reference(self.path, per_material=6)
+        stat = os.stat(self.path)
+        os.utime(self.path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+        self.assertEqual(len(classifier._load()[1]), 18)
+
+
+class LocalFirstBackendTests(SimpleTestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp(prefix='local-classifier-')
+        self.addCleanup(shutil.rmtree, self.directory, ignore_errors=True)
+        path = os.path.join(self.directory, 'reference.npz')
+        build_reference(path)
+        patch = mock.patch('mainapp.local_classifier.local_classifier', LocalClassifier(path))
+        patch.start()
+        self.addCleanup(patch.stop)
+
+    @override_settings(WASTE_CLASSIFIER_BACKEND='local_first', LOCAL_CLASSIFIER_MIN_CONFIDENCE=0)
+    def test_unfamiliar_image_goes_to_the_remote_model(self):
+        fake = {'waste_category': 'fake', 'materials_detected': [], 'confidence': 0, 'error': 'Fake image'}
+        with mock.patch.object(waste_classifier, '_classify_image_bytes', return_value=fake) as remote:
+            result = waste_classifier._classify_with_backend(
+                tinted_image((230, 20, 160), seed=1, spread=90, pattern='stripes')
+            )
+        remote.assert_called_once()
+        self.assertEqual(result['waste_category'], 'fake')
+
+    @override_settings(WASTE_CLASSIFIER_BACKEND='local_first', LOCAL_CLASSIFIER_MIN_CONFIDENCE=0)
+    def test_familiar_image_is_answered_locally(self):
+        with mock.patch.object(waste_classifier, '_classify_image_bytes') as remote:
+            result = waste_classifier._classify_with_backend(tinted_image(MATERIALS['cardboard'], seed=42))
+        remote.assert_not_called()
+        self.assertEqual(result['source'], 'local')
@@ -0,0 +1,102 @@
+from decimal import Decimal
+
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from mainapp.classification_queue import store_classification, summarize_materials
+from mainapp.models import WasteReportMaterial
+
+from .utils import make_buyer, make_report, make_user
+
+
+def classified(materials, confidence=90):
+    return {'waste_category': 'mixed', 'materials_detected': materials, 'confidence': confidence}
+
+
+class SummarizeMaterialsTests(TestCase):
+    def test_merges_and_scores_by_weight(self):
+        materials, total, score = summarize_materials(classified([
+            {'material': 'plastic_pet', 'recyclable': True, 'estimated_weight_kg': 0.5},
+            {'material': 'plastic_pet', 'recyclable': True, 'estimated_weight_kg': 0.5},
+            {'material': 'organic', 'recyclable': False, 'estimated_weight_kg': 3},
+        ]))
+        self.assertEqual(materials, {'plastic_pet': (1.0, True), 'organic': (3.0, False)})
+        self.assertEqual((total, score), (4.0, 25))
+
+    def test_ignores_junk_and_clamps_weights(self):
+        materials, total, _ = summarize_materials(classified([
+            'plastic',
+            {'recyclable': True},
+            {'material': 'iron', 'recyclable': True, 'estimated_weight_kg': 'heavy'},
+            {'material': 'glass', 'recyclable': True, 'estimated_weight_kg': -2},
+        ]))
+        self.assertEqual(materials, {'iron': (0.0, True), 'glass': (0.0, True)})
+        self.assertEqual(total, 0.0)
+
+    def test_weightless_materials_score_by_count(self):
+        _, _, score = summarize_materials(classified([
+            {'material': 'paper', 'recyclable': True},
+            {'material': 'unknown', 'recyclable': False},
+        ]))
+        self.assertEqual(score, 50)
+
+    def test_nothing_detected(self):
+        self.assertEqual(summarize_materials({'materials_detected': []}), ({}, None, None))
+
+
+class StoreClassificationTests(TestCase):
+    def test_replaces_material_rows(self):
+        report = make_report(make_user('reporter'))
+        store_classification(report.pk, classified([
+            {'material': 'glass', 'recyclable': True, 'estimated_weight_kg': 1.2},
+        ]), True)
+        store_classification(report.pk, classified([
+            {'material': 'paper', 'recyclable': True, 'estimated_weight_kg': 0.4},
+            {'material': 'organic', 'recyclable': False, 'estimated_weight_kg': 1.6},
+        ]), True)
+        report.refresh_from_db()
+        self.assertEqual(report.estimated_weight_kg, Decimal('2.000'))
+        self.assertEqual(report.recyclability_score, 20)
+        self.assertEqual(set(WasteReportMaterial.objects.values_list('material', flat=True)), {'paper', 'organic'})
+
+    def test_failure_clears_materials(self):
+        report = make_report(make_user('reporter'))
+        store_classification(report.pk, classified([{'material': 'glass', 'estimated_weight_kg': 1}]), True)
+        store_classification(report.pk, {'error': 'Classification failed'}, False)
+        report.refresh_from_db()
+        self.assertEqual(report.classification_status, 'failed')
+        self.assertIsNone(report.estimated_weight_kg)
+        self.assertFalse(WasteReportMaterial.objects.exists())
+
+
+class AvailableFilterTests(TestCase):
+    url = '/api/waste-reports/available/'
+
+    def setUp(self):
+        owner = make_user('reporter')
+        self.glass = make_report(owner)
+        self.paper = make_report(owner)
+        self.unclassified = make_report(owner)
+        store_classification(self.glass.pk, classified([{'material': 'glass', 'estimated_weight_kg': 2}]), True)
+        store_classification(self.paper.pk, classified([{'material': 'paper', 'estimated_weight_kg': 0.5}]), True)
+        self.client = APIClient()
+        self.client.force_authenticate(make_buyer('dealer').user)
+
+    def ids(self, **params):
+        response = self.client.get(self.url, params)
+        self.assertEqual(response.status_code, 200)
+        return [row['id'] for row in response.data['results']]
+
+    def test_material_and_weight_filters(self):
+        self.assertEqual(self.ids(material='glass,copper'), [self.glass.pk])
+        self.assertEqual(self.ids(min_weight='1'), [self.glass.pk])
+        self.assertEqual(self.ids(max_weight='1'), [self.paper.pk])
+
+    def test_weight_ordering_puts_unclassified_last(self):
+        self.assertEqual(self.ids(ordering='-weight'), [self.glass.pk, self.paper.pk, self.unclassified.pk])
+        self.assertEqual(self.ids(ordering='weight'), [self.paper.pk, self.glass.pk, self.unclassified.pk])
+
+    def test_invalid_parameters(self):
+        self.assertEqual(self.client.get(self.url, {'min_weight': 'lots'}).status_code, 400)
+        self.assertEqual(self.client.get(self.url, {'min_weight': 'nan'}).status_code, 400)
+        self.assertEqual(self.client.get(self.url, {'ordering': 'price'}).status_code, 400)
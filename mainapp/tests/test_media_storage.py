@@ -0,0 +1,73 @@
+import os
+from unittest import mock
+
+from django.core.files.base import ContentFile
+from django.core.files.uploadedfile import SimpleUploadedFile, TemporaryUploadedFile
+from django.test import TestCase
+
+from mainapp.media_storage import ContentAddressedStorage, content_addressed_storage
+from mainapp.models import MediaBlob, WasteReport
+
+from .utils import TemporaryMediaMixin, image_bytes, make_report, make_user
+
+
+class ContentAddressedStorageTests(TemporaryMediaMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.storage = ContentAddressedStorage()
+
+    def test_same_content_is_stored_once_and_counted(self):
+        first = self.storage.save('reports/a.JPG', ContentFile(b'photo bytes'))
+        second = self.storage.save('reports/b.jpg', ContentFile(b'photo bytes'))
+
+        self.assertEqual(first, second)
+        self.assertRegex(first, r'^reports/[0-9a-f]{2}/[0-9a-f]{64}\.jpg$')
+        self.assertEqual(MediaBlob.objects.get(name=first).ref_count, 2)
+        self.assertEqual(os.listdir(os.path.dirname(self.storage.path(first))), [os.path.basename(first)])
+
+    def test_file_appearing_after_the_exists_check_is_reused(self):
+        name = self.storage.save('reports/a.jpg', ContentFile(b'photo bytes'))
+        MediaBlob.objects.all().delete()
+
+        with mock.patch.object(self.storage, 'exists', return_value=False):
+            again = self.storage.save('reports/b.jpg', ContentFile(b'photo bytes'))
+        self.assertEqual(again, name)
+        self.assertEqual(MediaBlob.objects.get(name=name).ref_count, 1)
+
+    def test_existing_blob_consumes_a_temporary_upload(self):
+        self.storage.save('reports/a.jpg', ContentFile(b'photo bytes'))
+        upload = TemporaryUploadedFile('b.jpg', 'image/jpeg', 11, None)
+        self.addCleanup(upload.close)
+        upload.write(b'photo bytes')
+        upload.seek(0)
+        temporary_path = upload.temporary_file_path()
+
+        with mock.patch.object(self.storage, 'exists', return_value=False):
+            self.storage.save('reports/b.jpg', upload)
+        self.assertFalse(os.path.exists(temporary_path))
+
+    def test_release_deletes_the_file_with_the_last_reference(self):
+        name = self.storage.save('reports/a.jpg', ContentFile(b'photo bytes'))
+        self.storage.save('reports/b.jpg', ContentFile(b'photo bytes'))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(self.storage.release(name), 1)
+        self.assertTrue(self.storage.exists(name))
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(self.storage.release(name), 0)
+        self.assertFalse(self.storage.exists(name))
+        self.assertFalse(MediaBlob.objects.filter(name=name).exists())
+
+    def test_reports_sharing_a_photo_keep_it_until_both_are_deleted(self):
+        user = make_user('reporter')
+        photo = image_bytes(seed=4)
+        reports = [make_report(user, image=SimpleUploadedFile('pile.jpg', photo)) for _ in range(2)]
+        name = reports[0].image.name
+        self.assertEqual(reports[1].image.name, name)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            WasteReport.objects.get(pk=reports[0].pk).delete()
+        self.assertTrue(content_addressed_storage.exists(name))
+        with self.captureOnCommitCallbacks(execute=True):
+            WasteReport.objects.get(pk=reports[1].pk).delete()
+        self.assertFalse(content_addressed_storage.exists(name))
@@ -0,0 +1,73 @@
+import datetime
+from decimal import Decimal
+
+from django.test import TestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from mainapp.models import WasteReport
+
+from .utils import make_buyer, make_report, make_user
+
+
+class KeysetPaginationTests(TestCase):
+    url = '/api/waste-reports/available/'
+
+    @classmethod
+    def setUpTestData(cls):
+        owner = make_user('reporter')
+        weights = [None, Decimal('2.50'), None, Decimal('7.00'), Decimal('2.50'), None, Decimal('1.00'), Decimal('2.50')]
+        same_time = timezone.now() - datetime.timedelta(hours=1)
+        for weight in weights:
+            report = make_report(owner, estimated_weight_kg=weight)
+            if weight == Decimal('2.50'):
+                # Ties on weight and created_at, so only the id breaks them
+                WasteReport.objects.filter(pk=report.pk).update(created_at=same_time)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(make_buyer('dealer').user)
+
+    def walk(self, ordering, page_size=3):
+        ids, pages = [], 0
+        url = f'{self.url}?ordering={ordering}&page_size={page_size}'
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200, response.data)
+            ids += [item['id'] for item in response.data['results']]
+            url = response.data['next']
+            pages += 1
+        return ids, pages
+
+    def expected(self, descending):
+        reports = list(WasteReport.objects.all())
+        with_weight = sorted((r for r in reports if r.estimated_weight_kg is not None),
+                             key=lambda r: (r.estimated_weight_kg if not descending else -r.estimated_weight_kg,
+                                            -r.created_at.timestamp(), -r.pk))
+        without = sorted((r for r in reports if r.estimated_weight_kg is None),
+                         key=lambda r: (-r.created_at.timestamp(), -r.pk))
+        return [r.pk for r in with_weight + without]
+
+    def test_pages_cover_every_row_once_with_nulls_last(self):
+        for ordering, descending in (('weight', False), ('-weight', True)):
+            ids, pages = self.walk(ordering)
+            self.assertEqual(ids, self.expected(descending), ordering)
+            self.assertEqual(pages, 3)
+
+    def test_new_rows_do_not_shift_later_pages(self):
+        first = self.client.get(f'{self.url}?page_size=3')
+        make_report(make_user('late'))
+        second = self.client.get(first.data['next'])
+        seen = [item['id'] for item in first.data['results'] + second.data['results']]
+        self.assertEqual(len(seen), len(set(seen)))
+        self.assertEqual(seen, list(WasteReport.objects.order_by('-created_at', '-id')
+                                    .exclude(user__username='late').values_list('pk', flat=True)[:6]))
+
+    def test_count_only_when_asked(self):
+        self.assertNotIn('count', self.client.get(self.url).data)
+        self.assertEqual(self.client.get(f'{self.url}?count=true').data['count'], 8)
+
+    def test_invalid_cursor_is_not_found(self):
+        for cursor in ('not-base64!', 'W10', 'WyJ4IiwgMV0'):
+            response = self.client.get(f'{self.url}?cursor={cursor}')
+            self.assertEqual(response.status_code, 404, cursor)
@@ -0,0 +1,128 @@
+import random
+from decimal import Decimal
+from unittest import mock
+
+from django.test import TestCase
+
+from mainapp import geo, signals
+from mainapp.models import Notification, SavedSearch, SavedSearchKey, WasteCategory
+from mainapp.percolation import matches, matching_searches, search_keys
+
+from .utils import make_buyer, make_report, make_user
+
+
+PUNE = (Decimal('18.52040'), Decimal('73.85670'))
+
+
+class PercolationTests(TestCase):
+    def setUp(self):
+        # Only the percolation callback matters here, not derivative rendering
+        patch = mock.patch.object(signals.derivative_generator, 'enqueue')
+        patch.start()
+        self.addCleanup(patch.stop)
+        self.buyer = make_buyer('dealer')
+        self.owner = make_user('reporter')
+
+    def save_search(self, buyer=None, categories=(), **fields):
+        saved_search = SavedSearch.objects.create(buyer=buyer or self.buyer, **fields)
+        if categories:
+            saved_search.categories.set(categories)
+        return saved_search
+
+    def report(self, **fields):
+        with self.captureOnCommitCallbacks(execute=True):
+            return make_report(self.owner, **fields)
+
+    def notified(self, report):
+        return set(Notification.objects.filter(waste_report=report, notification_type='saved_search_match')
+                   .values_list('user_id', flat=True))
+
+    def test_keys_follow_categories_area_and_activity(self):
+        saved_search = self.save_search(categories=['metal', 'paper'], latitude=PUNE[0], longitude=PUNE[1],
+                                        radius_km=Decimal('5'))
+        cells = geo.covering_cells(*PUNE, 5)
+        self.assertEqual(set(saved_search.keys.values_list('category', 'cell')),
+                         {(code, cell) for code in ('metal', 'paper') for cell in cells})
+
+        saved_search.categories.set(['glass'])
+        self.assertEqual(set(saved_search.keys.values_list('category', flat=True)), {'glass'})
+
+        saved_search.is_active = False
+        saved_search.save()
+        self.assertFalse(SavedSearchKey.objects.exists())
+
+    def test_keys_follow_changes_made_from_the_category_side(self):
+        metal = self.save_search(categories=['metal', 'paper'])
+        paper = self.save_search(categories=['paper'])
+        category = WasteCategory.objects.get(code='paper')
+
+        category.saved_searches.remove(metal)
+        self.assertEqual(set(metal.keys.values_list('category', flat=True)), {'metal'})
+
+        category.saved_searches.clear()
+        self.assertEqual(set(metal.keys.values_list('category', flat=True)), {'metal'})
+        # No categories left: indexed under the catch-all key
+        self.assertEqual(list(paper.keys.values_list('category', 'cell')), [('', '')])
+
+        category.saved_searches.add(metal, paper)
+        self.assertEqual(set(metal.keys.values_list('category', flat=True)), {'metal', 'paper'})
+        self.assertEqual(set(paper.keys.values_list('category', flat=True)), {'paper'})
+
+    def test_search_without_filters_is_indexed_everywhere(self):
+        self.assertEqual(search_keys(self.save_search()), [('', '')])
+
+    def test_matching_report_notifies_the_buyer_once(self):
+        self.save_search(name='Metal nearby', categories=['metal'], latitude=PUNE[0], longitude=PUNE[1],
+                         radius_km=Decimal('5'))
+        self.save_search(categories=['metal'])
+        report = self.report(waste_type='metal', latitude=Decimal('18.53000'), longitude=Decimal('73.85000'))
+
+        self.assertEqual(self.notified(report), {self.buyer.user_id})
+        self.assertEqual(Notification.objects.filter(waste_report=report).count(), 1)
+
+    def test_non_matching_reports_notify_nobody(self):
+        self.save_search(categories=['metal'], latitude=PUNE[0], longitude=PUNE[1], radius_km=Decimal('5'),
+                         conditions=['dry'], min_quantity_kg=Decimal('3'))
+        near = {'latitude': Decimal('18.53000'), 'longitude': Decimal('73.85000')}
+        misses = [
+            {'waste_type': 'paper', 'waste_condition': 'dry', 'quantity_type': 'large', **near},
+            {'waste_type': 'metal', 'waste_condition': 'dry', 'quantity_type': 'large',
+             'latitude': Decimal('18.70000'), 'longitude': Decimal('73.85000')},
+            {'waste_type': 'metal', 'waste_condition': 'wet', 'quantity_type': 'large', **near},
+            {'waste_type': 'metal', 'waste_condition': 'dry', 'quantity_type': 'small', **near},
+            {'waste_type': 'metal', 'waste_condition': 'dry', 'quantity_type': 'large'},
+        ]
+        for fields in misses:
+            self.assertEqual(self.notified(self.report(**fields)), set(), fields)
+        hit = self.report(waste_type='metal', waste_condition='dry', quantity_type='small',
+                          exact_quantity=Decimal('4'), **near)
+        self.assertEqual(self.notified(hit), {self.buyer.user_id})
+
+    def test_own_reports_and_inactive_searches_are_skipped(self):
+        self.save_search()
+        self.save_search(buyer=make_buyer('dormant'), is_active=False)
+        self.owner = self.buyer.user
+        self.assertEqual(self.notified(self.report(waste_type='metal')), set())
+
+    def test_index_lookup_matches_checking_every_search(self):
+        rng = random.Random(4)
+        searches = []
+        for number in range(30):
+            fields = {}
+            if rng.random() < 0.7:
+                fields.update(latitude=Decimal(f'{18.52 + rng.uniform(-0.3, 0.3):.5f}'),
+                              longitude=Decimal(f'{73.85 + rng.uniform(-0.3, 0.3):.5f}'),
+                              radius_km=Decimal(f'{rng.uniform(0.5, 20):.2f}'))
+            searches.append(self.save_search(buyer=make_buyer(f'buyer{number}'),
+                                             categories=rng.sample(['metal', 'paper', 'plastic'], rng.randint(0, 2)),
+                                             **fields))
+        for _ in range(20):
+            report = make_report(self.owner, waste_type=rng.choice(['metal', 'paper', 'glass']),
+                                 latitude=Decimal(f'{18.52 + rng.uniform(-0.3, 0.3):.5f}'),
+                                 longitude=Decimal(f'{73.85 + rng.uniform(-0.3, 0.3):.5f}'))
+            expected = {
+                s.pk for s in searches
+                if (not s.categories.exists() or s.categories.filter(code=report.waste_type).exists())
+                and matches(s, report)
+            }
+            self.assertEqual({s.pk for s in matching_searches(report)}, expected)
@@ -0,0 +1,94 @@
+import random
+from unittest import mock
+
+from django.test import SimpleTestCase, TestCase
+
+from mainapp import signals
+from mainapp.management.commands.benchmark_recommendations import CITIES, full_scan, synthetic_buyers
+from mainapp.models import BuyerRating
+from mainapp.recommendations import CandidateIndex, CandidateLists
+
+from .utils import make_buyer, make_report, make_user
+
+
+class CandidateListsTests(SimpleTestCase):
+    radius_km = 50
+
+    def assert_matches_full_scan(self, lists, rows, queries=40, seed=1):
+        rng = random.Random(seed)
+        for _ in range(queries):
+            city_lat, city_lng = rng.choice(CITIES)
+            latitude, longitude = city_lat + rng.gauss(0, 0.3), city_lng + rng.gauss(0, 0.3)
+            waste_type = rng.choice(['plastic', 'metal', 'paper', 'e_waste'])
+            ranked, _ = lists.top(waste_type, latitude, longitude, 10, self.radius_km)
+            expected = full_scan(rows, waste_type, latitude, longitude, 10, self.radius_km)
+            self.assertEqual([round(score, 9) for score, _, _ in ranked], [round(score, 9) for score in expected])
+
+    def test_top_k_matches_a_full_scan(self):
+        rows = list(synthetic_buyers(3000, seed=5))
+        self.assert_matches_full_scan(CandidateLists(rows), rows)
+
+    def test_replacing_buyers_matches_a_fresh_build(self):
+        rows = {row[0]: row for row in synthetic_buyers(2000, seed=6)}
+        lists = CandidateLists(rows.values())
+        rng = random.Random(2)
+        for _ in range(20):
+            changed = rng.sample(sorted(rows), 3)
+            new_rows = []
+            for buyer_id in changed[:2]:
+                _, user_id, latitude, longitude, _, _ = rows[buyer_id]
+                row = (buyer_id, user_id, latitude, longitude, rng.random() * 0.3,
+                       rng.sample(['plastic', 'metal', 'paper', 'mixed'], rng.randint(1, 3)))
+                rows[buyer_id] = row
+                new_rows.append(row)
+            del rows[changed[2]]
+            lists = lists.replace_buyers(changed, new_rows)
+
+        fresh = CandidateLists(rows.values())
+        self.assertEqual(lists.buyers, fresh.buyers)
+        self.assertEqual({code: ids for code, ids in lists.by_quality.items() if ids}, fresh.by_quality)
+        self.assertEqual({code: ids for code, ids in lists.by_cell.items() if ids}, fresh.by_cell)
+        self.assert_matches_full_scan(lists, list(rows.values()))
+
+
+class CandidateIndexSignalTests(TestCase):
+    def setUp(self):
+        self.index = CandidateIndex()
+        patch = mock.patch.object(signals, 'candidate_index', self.index)
+        patch.start()
+        self.addCleanup(patch.stop)
+        self.near = make_buyer('near', categories=['metal'], latitude='18.5204', longitude='73.8567')
+        self.far = make_buyer('far', categories=['metal'], latitude='18.9000', longitude='73.8567')
+        self.report = make_report(make_user('reporter'), waste_type='metal', latitude='18.5210', longitude='73.8570')
+
+    def ranked_ids(self):
+        return [buyer_id for _, buyer_id, _ in self.index.recommend(self.report)]
+
+    def test_buyer_changes_update_entries_without_a_rebuild(self):
+        self.assertEqual(self.ranked_ids(), [self.near.pk, self.far.pk])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.far.latitude, self.far.longitude = '18.5205', '73.8568'
+            self.far.save()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.near.set_categories(['paper'])
+        self.assertEqual(self.ranked_ids(), [self.far.pk])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.far.delete()
+        self.assertEqual(self.ranked_ids(), [])
+        self.assertEqual(self.index.stats()['builds'], 1)
+        self.assertGreaterEqual(self.index.stats()['updates'], 3)
+
+    def test_ratings_wait_for_the_next_rebuild(self):
+        self.ranked_ids()
+        with self.captureOnCommitCallbacks(execute=True):
+            BuyerRating.objects.create(buyer=self.far, user=make_user('rater'), rating=5)
+        self.assertEqual(self.index.stats()['updates'], 0)
+        self.assertFalse(self.index._expired())
+
+    def test_unrelated_buyer_saves_are_ignored(self):
+        self.ranked_ids()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.near.save(update_fields=['shop_name'])
+        self.assertEqual(self.index.stats()['updates'], 0)
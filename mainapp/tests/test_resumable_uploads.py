@@ -0,0 +1,124 @@
+import hashlib
+import os
+from unittest import mock
+
+from django.core.management import call_command
+from django.db import transaction
+from django.test import TestCase, TransactionTestCase, override_settings
+from rest_framework.test import APIClient
+
+from mainapp import resumable_uploads
+from mainapp.models import UploadSession, WasteReport
+
+from .utils import TemporaryMediaMixin, image_bytes, make_user
+
+
+class UploadTestMixin(TemporaryMediaMixin):
+    def setUp(self):
+        super().setUp()
+        self.session_dir = os.path.join(self.media_root, 'sessions')
+        session_settings = override_settings(UPLOAD_SESSION_DIR=self.session_dir)
+        session_settings.enable()
+        self.addCleanup(session_settings.disable)
+        self.user = make_user('uploader')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.photo = image_bytes(seed=3, size=(200, 150))
+
+    def start(self, **extra):
+        data = {'filename': 'pile.jpg', 'total_size': len(self.photo), **extra}
+        response = self.client.post('/api/uploads/', data, format='json')
+        self.assertEqual(response.status_code, 201, response.data)
+        return response.data['id']
+
+    def put_chunk(self, session_id, data, offset, **headers):
+        return self.client.put(f'/api/uploads/{session_id}/chunk/', data=data,
+                               content_type='application/octet-stream', HTTP_UPLOAD_OFFSET=str(offset), **headers)
+
+    def chunk_files(self):
+        if not os.path.isdir(self.session_dir):
+            return []
+        return [name for name in os.listdir(self.session_dir) if name.endswith(resumable_uploads.CHUNK_SUFFIX)]
+
+
+class ResumableUploadTests(UploadTestMixin, TestCase):
+    def test_upload_in_chunks_and_finalize(self):
+        session_id = self.start(checksum_sha256=hashlib.sha256(self.photo).hexdigest())
+        half = len(self.photo) // 2
+
+        response = self.put_chunk(session_id, self.photo[:half], 0)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Upload-Offset'], str(half))
+        self.assertFalse(response.data['complete'])
+        response = self.put_chunk(session_id, self.photo[half:], half,
+                                  HTTP_UPLOAD_CHECKSUM=f'sha256 {hashlib.sha256(self.photo[half:]).hexdigest()}')
+        self.assertTrue(response.data['complete'])
+        self.assertEqual(self.chunk_files(), [])
+
+        response = self.client.post(f'/api/uploads/{session_id}/finalize/',
+                                    {'waste_type': 'plastic', 'quantity_type': 'small'}, format='json')
+        self.assertEqual(response.status_code, 201, response.data)
+        report = WasteReport.objects.get(pk=response.data['id'])
+        with report.image.open('rb') as stored:
+            self.assertEqual(stored.read(), self.photo)
+
+        again = self.client.post(f'/api/uploads/{session_id}/finalize/', {}, format='json')
+        self.assertEqual(again.data['id'], report.pk)
+
+    def test_wrong_offset_is_rejected_with_the_current_offset(self):
+        session_id = self.start()
+        self.put_chunk(session_id, self.photo[:100], 0)
+
+        response = self.put_chunk(session_id, self.photo[:100], 0)
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response['Upload-Offset'], '100')
+
+    def test_bad_chunk_checksum_leaves_the_offset_and_no_chunk_file(self):
+        session_id = self.start()
+        response = self.put_chunk(session_id, self.photo[:100], 0, HTTP_UPLOAD_CHECKSUM='sha256 ' + '0' * 64)
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response['Upload-Offset'], '0')
+        self.assertEqual(self.chunk_files(), [])
+
+    def test_offset_moved_while_streaming_is_rejected(self):
+        session_id = self.start()
+        receive_chunk = resumable_uploads.receive_chunk
+
+        def racing_receive(session, *args, **kwargs):
+            path = receive_chunk(session, *args, **kwargs)
+            # A retry of the same chunk commits first
+            UploadSession.objects.filter(pk=session.pk).update(received_bytes=100)
+            return path
+
+        with mock.patch.object(resumable_uploads, 'receive_chunk', side_effect=racing_receive):
+            response = self.put_chunk(session_id, self.photo[:100], 0)
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response['Upload-Offset'], '100')
+        self.assertEqual(self.chunk_files(), [])
+        self.assertFalse(os.path.exists(os.path.join(self.session_dir, f'{session_id}.part')))
+
+    def test_cleanup_removes_stale_chunk_files(self):
+        os.makedirs(self.session_dir)
+        stale = os.path.join(self.session_dir, f'abc.1234{resumable_uploads.CHUNK_SUFFIX}')
+        with open(stale, 'wb') as chunk:
+            chunk.write(b'x' * 10)
+        os.utime(stale, (0, 0))
+
+        call_command('cleanup_upload_sessions', stdout=open(os.devnull, 'w'))
+        self.assertFalse(os.path.exists(stale))
+
+
+class ChunkLockingTests(UploadTestMixin, TransactionTestCase):
+    def test_body_is_streamed_outside_a_transaction(self):
+        session_id = self.start()
+        receive_chunk = resumable_uploads.receive_chunk
+        in_transaction = []
+
+        def observed_receive(*args, **kwargs):
+            in_transaction.append(transaction.get_connection().in_atomic_block)
+            return receive_chunk(*args, **kwargs)
+
+        with mock.patch.object(resumable_uploads, 'receive_chunk', side_effect=observed_receive):
+            response = self.put_chunk(session_id, self.photo[:100], 0)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(in_transaction, [False])
@@ -0,0 +1,77 @@
+from unittest import mock, skipUnless
+
+from django.db import connection
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from mainapp.models import WasteReport
+from mainapp.search import search_reports, search_terms
+
+from .utils import make_report, make_user
+
+
+class SearchTests(TestCase):
+    def setUp(self):
+        self.owner = make_user('reporter')
+        self.bottles = make_report(self.owner, additional_notes='Plastic bottles near the gate', area='Kothrud')
+        self.cans = make_report(self.owner, additional_notes='Aluminium cans', landmark='Behind the bottling plant')
+        self.paper = make_report(self.owner, additional_notes='Old newspapers', city='Mumbai')
+
+    def found(self, query, queryset=None):
+        return [r.pk for r in search_reports(queryset or WasteReport.objects.all(), query).order_by('-rank', 'id')]
+
+    def test_search_terms(self):
+        self.assertEqual(search_terms('  Plastic, BOTTLES!  '), ['plastic', 'bottles'])
+        self.assertEqual(search_terms(''), [])
+        self.assertEqual(len(search_terms('a ' * 50)), 10)
+
+    def test_every_word_must_match_as_a_prefix(self):
+        self.assertEqual(set(self.found('bottl')), {self.bottles.pk, self.cans.pk})
+        self.assertEqual(self.found('bottl kothrud'), [self.bottles.pk])
+        self.assertEqual(self.found('mumbai newspaper'), [self.paper.pk])
+        self.assertEqual(self.found('glass'), [])
+        self.assertEqual(self.found('  '), [])
+
+    def test_index_follows_saves_updates_and_deletes(self):
+        self.paper.additional_notes = 'Cardboard boxes'
+        self.paper.save()
+        self.assertEqual(self.found('cardboard'), [self.paper.pk])
+        self.assertEqual(self.found('newspapers'), [])
+
+        WasteReport.objects.filter(pk=self.cans.pk).update(landmark='Temple')
+        self.assertEqual(self.found('bottl'), [self.bottles.pk])
+
+        self.bottles.delete()
+        self.assertEqual(self.found('plastic'), [])
+
+    def test_rank_prefers_more_matches(self):
+        both = make_report(self.owner, additional_notes='Glass jars and glass bottles', landmark='Glass shop')
+        make_report(self.owner, additional_notes='One glass jar among rags and cloth scraps')
+        results = list(search_reports(WasteReport.objects.all(), 'glass').order_by('-rank'))
+        self.assertEqual(results[0].pk, both.pk)
+        self.assertGreater(results[0].rank, results[1].rank)
+
+    @skipUnless(connection.vendor == 'sqlite', 'SQLite keeps the index with triggers')
+    def test_triggers_survive_later_migrations(self):
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT name FROM sqlite_master WHERE type = 'trigger' AND tbl_name = 'mainapp_wastereport'")
+            triggers = {row[0] for row in cursor.fetchall()}
+        self.assertEqual(triggers, {f'mainapp_wastereport_fts_{suffix}' for suffix in ('ai', 'ad', 'au')})
+
+    def test_other_backends_fall_back_to_icontains(self):
+        with mock.patch.object(connection, 'vendor', 'postgresql'):
+            self.assertEqual(self.found('bottl kothrud'), [self.bottles.pk])
+
+
+class SearchEndpointTests(TestCase):
+    def test_scoped_to_the_users_reports(self):
+        owner, stranger = make_user('reporter'), make_user('stranger')
+        mine = make_report(owner, additional_notes='Plastic bottles')
+        make_report(stranger, additional_notes='Plastic bottles')
+        client = APIClient()
+        client.force_authenticate(owner)
+
+        response = client.get('/api/waste-reports/search/', {'q': 'plastic'})
+        self.assertEqual([item['id'] for item in response.data['results']], [mine.pk])
+        self.assertIn('rank', response.data['results'][0])
+        self.assertEqual(client.get('/api/waste-reports/search/', {'q': '!!'}).status_code, 400)
@@ -0,0 +1,99 @@
+import os
+import shutil
+import tempfile
+import threading
+import time
+
+from django.test import SimpleTestCase, override_settings
+
+from mainapp.single_flight import SingleFlight
+
+
+class SingleFlightTests(SimpleTestCase):
+    def test_concurrent_callers_share_one_call(self):
+        flights = SingleFlight()
+        release = threading.Event()
+        calls = []
+
+        def work():
+            calls.append(1)
+            release.wait(5)
+            return {'value': 1}
+
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(flights.do('key', work))) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        while flights.stats()['coalesced'] < 3:
+            time.sleep(0.01)
+        release.set()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(sorted(shared for _, shared in results), [False, True, True, True])
+        self.assertTrue(all(result == {'value': 1} for result, _ in results))
+
+    def test_leader_rechecks_before_calling(self):
+        flights = SingleFlight()
+        result, shared = flights.do('key', lambda: self.fail('fn should not run'), recheck=lambda: {'stored': True})
+        # Stored before this call started: a cache hit, not a coalesced call
+        self.assertEqual((result, shared), ({'stored': True}, False))
+        self.assertEqual(flights.stats()['leader_cache_hits'], 1)
+
+    def test_errors_reach_every_caller(self):
+        flights = SingleFlight()
+        with self.assertRaises(ValueError):
+            flights.do('key', lambda: (_ for _ in ()).throw(ValueError('boom')))
+        self.assertEqual(flights.stats()['in_flight'], 0)
+
+
+class CrossProcessLockTests(SimpleTestCase):
+    def setUp(self):
+        self.lock_dir = tempfile.mkdtemp(prefix='single-flight-')
+        self.addCleanup(shutil.rmtree, self.lock_dir, ignore_errors=True)
+        lock_settings = override_settings(CLASSIFIER_SINGLE_FLIGHT_LOCK_DIR=self.lock_dir)
+        lock_settings.enable()
+        self.addCleanup(lock_settings.disable)
+
+    def hold(self, flights, key):
+        """Run a call for ``key`` in a thread until the returned event is set"""
+        started, release = threading.Event(), threading.Event()
+
+        def work():
+            started.set()
+            release.wait(5)
+            return {'key': key}
+
+        thread = threading.Thread(target=flights.do, args=(key, work))
+        thread.start()
+        started.wait(5)
+        self.addCleanup(thread.join)
+        self.addCleanup(release.set)
+        return release, thread
+
+    def test_different_digests_do_not_wait_for_each_other(self):
+        # Same two-character prefix: these shared a lock file when locks were striped
+        self.hold(SingleFlight(), 'ab' + '1' * 62)
+        started = time.monotonic()
+        result, shared = SingleFlight().do('ab' + '2' * 62, lambda: 'done')
+        self.assertEqual((result, shared), ('done', False))
+        self.assertLess(time.monotonic() - started, 1)
+
+    def test_other_process_waits_then_reads_the_stored_result(self):
+        key = 'cd' + '3' * 62
+        stored = {}
+        release, thread = self.hold(SingleFlight(), key)
+
+        def finish():
+            time.sleep(0.1)
+            stored['result'] = {'key': key}
+            release.set()
+        threading.Thread(target=finish).start()
+
+        other = SingleFlight()
+        result, shared = other.do(key, lambda: self.fail('fn should not run'), recheck=lambda: stored.get('result'))
+        thread.join()
+        self.assertEqual((result, shared), ({'key': key}, True))
+        self.assertEqual(other.stats()['cross_process_hits'], 1)
+        self.assertEqual(os.listdir(self.lock_dir), [])
@@ -0,0 +1,77 @@
+import io
+from contextlib import redirect_stdout
+
+from django.db import connection
+from django.db.migrations.executor import MigrationExecutor
+from django.test import SimpleTestCase, TestCase, TransactionTestCase
+
+from mainapp.models import normalize_waste_category
+
+from .utils import make_buyer
+
+
+class NormalizeWasteCategoryTests(SimpleTestCase):
+    def test_aliases_and_labels(self):
+        self.assertEqual(normalize_waste_category(' E-Waste '), 'e_waste')
+        self.assertEqual(normalize_waste_category('ewaste'), 'e_waste')
+        self.assertEqual(normalize_waste_category('Paper & Cardboard'), 'paper')
+        self.assertEqual(normalize_waste_category('Mixed Waste'), 'mixed')
+        self.assertEqual(normalize_waste_category('Plastic'), 'plastic')
+        self.assertEqual(normalize_waste_category('furniture'), 'furniture')
+
+
+class SetCategoriesTests(TestCase):
+    def test_normalises_and_ignores_unknown_codes(self):
+        buyer = make_buyer('dealer', categories=['Plastic', 'e-waste', 'furniture'])
+        self.assertEqual(sorted(buyer.categories.values_list('code', flat=True)), ['e_waste', 'plastic'])
+        self.assertEqual(list(buyer.waste_categories_handled), ['e_waste', 'plastic'])
+
+        buyer.set_categories(['metal'])
+        self.assertEqual(list(buyer.categories.values_list('code', flat=True)), ['metal'])
+
+
+class CategoryMigrationTests(TransactionTestCase):
+    before = [('mainapp', '0023_wastereport_fulltext')]
+    backfilled = [('mainapp', '0029_index_derivative_sources')]
+    latest = [('mainapp', '0030_remove_buyer_waste_categories_handled')]
+
+    def migrate(self, targets):
+        executor = MigrationExecutor(connection)
+        output = io.StringIO()
+        with redirect_stdout(output):
+            executor.migrate(targets)
+        return executor.loader.project_state(targets).apps, output.getvalue()
+
+    def tearDown(self):
+        self.migrate(MigrationExecutor(connection).loader.graph.leaf_nodes('mainapp'))
+        super().tearDown()
+
+    def test_unmapped_codes_outlive_the_column_and_removal_reverses(self):
+        old_apps, _ = self.migrate(self.before)
+        User = old_apps.get_model('auth', 'User')
+        Buyer = old_apps.get_model('mainapp', 'Buyer')
+        common = {'full_name': 'Dealer', 'shop_type': 'scrap_dealer', 'shop_address': 'Market Road',
+                  'aadhaar_number': 'encrypted', 'aadhaar_last_4': '1234'}
+        mapped = Buyer.objects.create(user=User.objects.create(username='mapped'), mobile_number='+919000000101',
+                                      shop_name='One', waste_categories_handled=['Plastic', 'E-Waste'], **common)
+        partial = Buyer.objects.create(user=User.objects.create(username='partial'), mobile_number='+919000000102',
+                                       shop_name='Two', waste_categories_handled=['Metal', 'Furniture'], **common)
+
+        new_apps, output = self.migrate(self.backfilled)
+        BuyerCategory = new_apps.get_model('mainapp', 'BuyerCategory')
+        self.assertEqual(sorted(BuyerCategory.objects.filter(buyer_id=mapped.pk).values_list('category_id', flat=True)),
+                         ['e_waste', 'plastic'])
+        self.assertIn(f"buyer {partial.pk}: ['Furniture']", output)
+        self.assertNotIn(f'buyer {mapped.pk}:', output)
+        # The JSON column is kept until 0030
+        self.assertEqual(new_apps.get_model('mainapp', 'Buyer').objects.get(pk=partial.pk).waste_categories_handled,
+                         ['Metal', 'Furniture'])
+
+        latest_apps, _ = self.migrate(self.latest)
+        LegacyBuyerCategory = latest_apps.get_model('mainapp', 'LegacyBuyerCategory')
+        self.assertEqual(list(LegacyBuyerCategory.objects.values_list('buyer_id', 'code')), [(partial.pk, 'Furniture')])
+
+        restored_apps, _ = self.migrate(self.backfilled)
+        Buyer = restored_apps.get_model('mainapp', 'Buyer')
+        self.assertEqual(Buyer.objects.get(pk=mapped.pk).waste_categories_handled, ['e_waste', 'plastic'])
+        self.assertEqual(Buyer.objects.get(pk=partial.pk).waste_categories_handled, ['metal', 'Furniture'])
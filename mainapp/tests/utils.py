@@ -0,0 +1,74 @@
+"""
+Shared helpers for the mainapp tests
+"""
+import io
+import itertools
+import random
+import shutil
+import tempfile
+
+from django.contrib.auth.models import User
+from django.test import override_settings
+from PIL import Image
+
+from mainapp.models import Buyer, WasteReport
+
+
+_mobile_numbers = itertools.count(9000000000)
+
+
+def image_bytes(seed=0, size=(64, 48), image_format='JPEG', quality=90):
+    """Encoded noise image; the same seed gives the same picture"""
+    rng = random.Random(seed)
+    # Coarse blocks scaled up, so dHash sees structure rather than pixel noise
+    small = Image.new('RGB', (9, 8))
+    small.putdata([tuple(rng.randrange(256) for _ in range(3)) for _ in range(72)])
+    image = small.resize(size, Image.BILINEAR)
+    buffer = io.BytesIO()
+    image.save(buffer, format=image_format, **({'quality': quality} if image_format == 'JPEG' else {}))
+    return buffer.getvalue()
+
+
+def make_user(username, **kwargs):
+    return User.objects.create_user(username=username, **kwargs)
+
+
+def make_buyer(username, categories=(), mobile_number=None, **kwargs):
+    user = make_user(username)
+    defaults = {
+        'full_name': username.title(),
+        'mobile_number': mobile_number or f'+91{next(_mobile_numbers)}',
+        'shop_name': f'{username} scrap',
+        'shop_type': 'scrap_dealer',
+        'shop_address': 'Market Road',
+        'aadhaar_number': 'encrypted',
+        'aadhaar_last_4': '1234',
+    }
+    defaults.update(kwargs)
+    buyer = Buyer.objects.create(user=user, **defaults)
+    if categories:
+        buyer.set_categories(categories)
+    return buyer
+
+
+def make_report(user, **kwargs):
+    defaults = {
+        'waste_type': 'plastic',
+        'quantity_type': 'small',
+        'image': 'waste_reports/test.jpg',
+        'city': 'Pune',
+    }
+    defaults.update(kwargs)
+    return WasteReport.objects.create(user=user, **defaults)
+
+
+class TemporaryMediaMixin:
+    """Point MEDIA_ROOT at a temporary directory for the duration of each test"""
+
+    def setUp(self):
+        super().setUp()
+        self.media_root = tempfile.mkdtemp(prefix='mainapp-tests-')
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        media_settings = override_settings(MEDIA_ROOT=self.media_root)
+        media_settings.enable()
+        self.addCleanup(media_settings.disable)
@@ -5,10 +5,11 @@ from django.contrib import messages
 from django.http import JsonResponse
 from django.views.decorators.csrf import csrf_exempt
 from django.utils import timezone
-from django.db.models import Avg
 from .models import Task, Note, WasteReport, Buyer, PickupRequest, BuyerRating, PickupHistory
 from .forms import TaskForm, NoteForm, WasteReportForm, SignUpForm, BuyerRegistrationForm
 from .waste_classifier import classify_waste_image
+from .image_ingest import InvalidImageError, validate_image
+from .buyer_stats import buyer_stats
 
 import json
 
@@ -273,25 +274,18 @@ def buyer_dashboard(request):
     
     buyer = request.user.buyer_profile
     
-    # Get stats
-    total_requests = PickupRequest.objects.filter(buyer=buyer).count()
-    pending_requests = PickupRequest.objects.filter(buyer=buyer, status='pending').count()
-    accepted_requests = PickupRequest.objects.filter(buyer=buyer, status='accepted').count()
-    completed_requests = PickupRequest.objects.filter(buyer=buyer, status='completed').count()
+    # Get stats (one cached query)
+    stats = buyer_stats(buyer.pk)
     
     # Get available waste listings (pending waste reports that buyer hasn't requested yet)
-    available_listings = WasteReport.objects.filter(
-        status='pending'
-    ).exclude(
-        pickup_requests__buyer=buyer
-    ).order_by('-created_at')[:5]
+    available_listings = WasteReport.objects.open_for_buyer(buyer).order_by('-created_at')[:5]
     
     context = {
         'buyer': buyer,
-        'total_requests': total_requests,
-        'pending_requests': pending_requests,
-        'accepted_requests': accepted_requests,
-        'completed_requests': completed_requests,
+        'total_requests': stats['total_requests'],
+        'pending_requests': stats['pending_requests'],
+        'accepted_requests': stats['accepted_requests'],
+        'completed_requests': stats['completed_requests'],
         'available_listings': available_listings,
     }
     return render(request, 'mainapp/buyer_dashboard.html', context)
@@ -307,11 +301,7 @@ def buyer_requests(request):
     buyer = request.user.buyer_profile
     
     # Get all available waste reports (not yet collected, buyer hasn't requested)
-    available_listings = WasteReport.objects.filter(
-        status='pending'
-    ).exclude(
-        pickup_requests__buyer=buyer
-    ).order_by('-created_at')
+    available_listings = WasteReport.objects.open_for_buyer(buyer).order_by('-created_at')
     
     context = {
         'buyer': buyer,
@@ -343,9 +333,11 @@ def buyer_my_pickups(request):
         PickupHistory.objects.create(
             user=pickup.user,
             user_username=pickup.user.username,
+            buyer=buyer,
             buyer_shop_name=buyer.shop_name,
             waste_type=pickup.waste_report.get_waste_type_display(),
             quantity=pickup.waste_report.quantity_display,
+            weight_kg=pickup.waste_report.weight_kg,
             location=f"{pickup.waste_report.city}, {pickup.waste_report.state}" if pickup.waste_report.city else "Location not specified",
             offered_price=pickup.offered_price,
             reported_at=pickup.waste_report.created_at,
@@ -470,9 +462,11 @@ def user_notifications(request):
         PickupHistory.objects.create(
             user=pickup.user,
             user_username=pickup.user.username,
+            buyer=pickup.buyer,
             buyer_shop_name=pickup.buyer.shop_name,
             waste_type=pickup.waste_report.get_waste_type_display(),
             quantity=pickup.waste_report.quantity_display,
+            weight_kg=pickup.waste_report.weight_kg,
             location=f"{pickup.waste_report.city}, {pickup.waste_report.state}" if pickup.waste_report.city else "Location not specified",
             offered_price=pickup.offered_price,
             reported_at=pickup.waste_report.created_at,
@@ -564,7 +558,7 @@ def respond_to_pickup_request(request, pk):
 @login_required
 def browse_buyers(request):
     """Show all buyers to users"""
-    buyers = Buyer.objects.all().annotate(avg_rating=Avg('ratings__rating'))
+    buyers = Buyer.objects.all().prefetch_related('categories')
     
     context = {
         'buyers': buyers,
@@ -714,6 +708,15 @@ def classify_waste_api(request):
             # Log the request
             print(f"[AI Classification] Processing image: {image_file.name}, size: {image_file.size} bytes")
             
+            # Reject non-images and oversized files before any decoding
+            try:
+                validate_image(image_file)
+            except InvalidImageError as e:
+                return JsonResponse({
+                    'success': False,
+                    'error': str(e)
+                }, status=400)
+            
             # Classify the waste
             result = classify_waste_image(image_file)
             
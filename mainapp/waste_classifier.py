@@ -1,19 +1,31 @@
 """
 Waste Classification Utility using Google Gemini AI - Exact copy of working web implementation
 """
-import os
 import json
 import base64
-import google.generativeai as genai
-from dotenv import load_dotenv
+from concurrent.futures import ThreadPoolExecutor
+from django.conf import settings
+from django.db import close_old_connections, connection
 
-load_dotenv()
+from .classification_cache import classification_cache, image_digest, is_cacheable
+from .classifier_client import CircuitOpenError, classifier_client
+from .env import get_env
+from .image_hashing import near_duplicate_index, perceptual_hash
+from .image_ingest import InvalidImageError, normalize_image, validate_image
+from .single_flight import classification_flights
 
 
 def classify_waste_image(image_file):
     """
     Classify waste from an uploaded image file using the exact same logic as web version
     
+    The upload is validated first (type sniffed, header parsed, size limits),
+    so nothing below ever decodes a file that is not an acceptable image.
+    Results are cached by the SHA-256 of the image bytes, so re-uploads of the
+    same photo skip the remote model call. On an exact miss, a perceptual-hash
+    lookup reuses the result of a visually near-identical earlier image, and
+    identical images already being classified wait for that call instead.
+    
     Args:
         image_file: Django UploadedFile object
         
@@ -21,9 +33,181 @@ def classify_waste_image(image_file):
         dict: Classification results with waste_category, materials_detected, confidence
     """
     try:
+        validate_image(image_file)
+    except InvalidImageError as e:
+        print(f"Invalid Image: {e}")
+        return {
+            "waste_category": "single",
+            "materials_detected": [{"material": "unknown", "recyclable": False}],
+            "confidence": 0,
+            "error": f"Invalid image: {str(e)}"
+        }
+    
+    try:
+        image_file.seek(0)
+        image_bytes = image_file.read()
+    except Exception as e:
+        print(f"Classification Error: {e}")
+        return {
+            "waste_category": "single",
+            "materials_detected": [{"material": "unknown", "recyclable": False}],
+            "confidence": 0,
+            "error": f"Classification failed: {str(e)}"
+        }
+    
+    digest = image_digest(image_bytes)
+    cached = _cached_result(digest)
+    if cached is not None:
+        return cached
+    
+    phash = perceptual_hash(image_bytes)
+    if phash:
+        result = _near_duplicate_result(digest, phash)
+        if result is not None:
+            return result
+    
+    # Concurrent requests for the same image share one model call
+    result, shared = classification_flights.do(
+        digest,
+        lambda: _classify_and_store(image_bytes, digest, phash),
+        recheck=lambda: _cached_result(digest)
+    )
+    if shared:
+        print(f"Classification coalesced with in-flight call: {digest[:12]}")
+        result['coalesced'] = True
+    return result
+
+
+def _cached_result(digest):
+    cached = classification_cache.get(digest)
+    if cached is not None:
+        print(f"Classification cache hit: {digest[:12]}")
+        cached['cached'] = True
+    return cached
+
+
+def _classify_and_store(image_bytes, digest, phash):
+    result = _classify_with_backend(image_bytes)
+    # Degraded (outage) answers are not cached so the remote model gets another go
+    if is_cacheable(result) and not result.get('degraded'):
+        classification_cache.set(digest, result, perceptual_hash=phash)
+        if phash:
+            near_duplicate_index.add(phash, digest)
+    return result
+
+
+def classify_waste_images(image_files, max_workers=None):
+    """
+    Classify several uploaded images concurrently.
+    
+    Runs at most ``max_workers`` (default CLASSIFIER_BATCH_CONCURRENCY)
+    classifications at once, so total time tracks the slowest call rather
+    than the sum. Results are returned in the same order as ``image_files``.
+    """
+    if not image_files:
+        return []
+    if max_workers is None:
+        max_workers = getattr(settings, 'CLASSIFIER_BATCH_CONCURRENCY', 4)
+    max_workers = max(1, min(max_workers, len(image_files)))
+    
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='classify-batch') as pool:
+        futures = [pool.submit(_classify_in_thread, image_file) for image_file in image_files]
+        return [future.result() for future in futures]
+
+
+def _classify_in_thread(image_file):
+    """classify_waste_image wrapper that cleans up the thread's DB connection"""
+    close_old_connections()
+    try:
+        return classify_waste_image(image_file)
+    except Exception as e:
+        print(f"Classification Error: {e}")
+        return {
+            "waste_category": "single",
+            "materials_detected": [{"material": "unknown", "recyclable": False}],
+            "confidence": 0,
+            "error": f"Classification failed: {str(e)}"
+        }
+    finally:
+        connection.close()
+
+
+def _near_duplicate_result(digest, phash):
+    """Reuse the cached result of a perceptually similar image, if any"""
+    for match_digest, distance, match_phash in near_duplicate_index.lookup(phash):
+        result = classification_cache.get(match_digest)
+        if result is None:
+            # Evicted from the cache since it was indexed
+            near_duplicate_index.discard(match_phash, match_digest)
+            continue
+        
+        print(f"Classification near-duplicate hit: {digest[:12]} ~ {match_digest[:12]} (distance {distance})")
+        result.pop('cached', None)
+        # Cached for exact re-uploads only: without a perceptual hash the borrowed
+        # result is never indexed, so it cannot be borrowed again further along
+        classification_cache.set(digest, result)
+        
+        result['cached'] = True
+        result['near_duplicate_distance'] = distance
+        return result
+    return None
+
+
+def _classify_with_backend(image_bytes):
+    """
+    Dispatch to the classifier backend chosen by WASTE_CLASSIFIER_BACKEND:
+    
+    - 'remote': Gemini only
+    - 'local_first': local k-NN answers confident cases, Gemini handles the
+      rest, and the local answer is served (marked degraded) if Gemini fails
+    - 'local_only': local k-NN only
+    """
+    backend = getattr(settings, 'WASTE_CLASSIFIER_BACKEND', 'remote')
+    if backend == 'remote':
+        return _classify_image_bytes(image_bytes)
+    
+    # Imported here so NumPy is only loaded when a local backend is configured
+    from .local_classifier import local_classifier
+    local_result = local_classifier.classify(image_bytes)
+    if backend == 'local_only':
+        if local_result is None:
+            if local_classifier.is_available:
+                error = "Local classifier does not recognise this image"
+            else:
+                error = "Local classifier is not available, build it with 'manage.py build_local_classifier'"
+            return {
+                "waste_category": "single",
+                "materials_detected": [{"material": "unknown", "recyclable": False}],
+                "confidence": 0,
+                "error": error
+            }
+        return local_result
+    
+    min_confidence = getattr(settings, 'LOCAL_CLASSIFIER_MIN_CONFIDENCE', 80)
+    if local_result is not None and local_result['confidence'] >= min_confidence:
+        return local_result
+    
+    result = _classify_image_bytes(image_bytes)
+    if is_cacheable(result) or local_result is None:
+        return result
+    
+    print(f"Remote classification failed, serving local result: {result.get('error')}")
+    local_result['degraded'] = True
+    local_result['remote_error'] = result.get('error')
+    return local_result
+
+
+def _classify_image_bytes(image_bytes):
+    """Send the image to Gemini and parse the JSON classification"""
+    try:
+        # Rotate, downscale and re-encode before the upload to the model
+        image_bytes, mime_type, ingest_info = normalize_image(image_bytes)
+        print(f"Normalized image: {ingest_info['original_size']} {ingest_info['original_bytes']} bytes "
+              f"-> {ingest_info['size']} {ingest_info['bytes']} bytes")
+        
         # Check API key first
-        api_key = os.environ.get("GEMINI_API_KEY")
-        if not api_key:
+        api_key = get_env("GEMINI_API_KEY")
+        if not api_key and classifier_client.requires_api_key:
             print("No API key found")
             return {
                 "error": "GEMINI_API_KEY not configured in .env file",
@@ -32,17 +216,7 @@ def classify_waste_image(image_file):
                 "confidence": 0
             }
         
-        # Initialize client (same as web version)
-        genai.configure(api_key=os.environ.get("GEMINI_API_KEY"))
-        
-        # Read image bytes
-        image_file.seek(0)
-        image_bytes = image_file.read()
-        
         # Use exact same model and prompt as web version
-        MODEL_NAME = "gemini-2.5-flash"
-        model = genai.GenerativeModel(MODEL_NAME)
-        
         prompt = """
 You are an expert waste and recycling classification AI used in India.
 
@@ -101,19 +275,11 @@ Respond ONLY in valid JSON using this exact format:
 
 """
 
-        # Call Gemini API with exact same structure as web version
-        response = model.generate_content(
-            [
-                prompt,
-                {
-                    "mime_type":"image/jpeg",
-                    "data":image_bytes
-                }
-            ]
-        )
+        # Call Gemini through the shared client (deadline + circuit breaker)
+        text = classifier_client.generate(api_key, prompt, image_bytes, mime_type)
         
         # Parse response exactly like web version
-        text = response.text.strip()
+        text = text.strip()
         print(f"Gemini Response: {text}")
         
         if text.startswith("```"):
@@ -151,6 +317,24 @@ Respond ONLY in valid JSON using this exact format:
         # Return the genuine result from Gemini
         return result
         
+    except CircuitOpenError as e:
+        print(f"Classification skipped: {e}")
+        return {
+            "waste_category": "single",
+            "materials_detected": [{"material": "unknown", "recyclable": False}],
+            "confidence": 0,
+            "error": str(e)
+        }
+        
+    except InvalidImageError as e:
+        print(f"Invalid Image: {e}")
+        return {
+            "waste_category": "single",
+            "materials_detected": [{"material": "unknown", "recyclable": False}],
+            "confidence": 0,
+            "error": f"Invalid image: {str(e)}"
+        }
+        
     except json.JSONDecodeError as e:
         print(f"JSON Parse Error: {e}")
         return {
@@ -91,6 +91,18 @@ DATABASES = {
     }
 }
 
+# Cache
+# Shared by every worker process so an invalidation (buyer stats, facets)
+# is seen by all of them; create the table with `python manage.py createcachetable`.
+# A Redis/memcached backend can replace it without code changes.
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+        'LOCATION': 'mainapp_cache',
+    }
+}
+
 
 # Password validation
 # https://docs.djangoproject.com/en/6.0/ref/settings/#auth-password-validators
@@ -169,3 +181,84 @@ REST_FRAMEWORK = {
         'rest_framework.filters.OrderingFilter',
     ],
 }
+
+# AI waste classification
+# Results are cached by SHA-256 of the image bytes: a per-process LRU in front
+# of the ClassificationCacheEntry table.
+CLASSIFIER_CACHE_LRU_SIZE = 256
+CLASSIFIER_CACHE_TTL_SECONDS = 60 * 60 * 24 * 30  # 30 days
+CLASSIFIER_CACHE_MAX_ENTRIES = 50000
+# Reuse the result of an earlier image whose perceptual hash is within this
+# many bits (out of 64). Set to None to disable near-duplicate reuse.
+CLASSIFIER_NEAR_DUPLICATE_MAX_DISTANCE = 6
+# Background classification of new waste reports
+CLASSIFIER_WORKERS = 4
+CLASSIFIER_QUEUE_MAX = 100
+# Jobs live only in the worker process; a pending/processing report older
+# than this is treated as lost (worker restart/crash) and may be requeued
+CLASSIFIER_JOB_TIMEOUT_SECONDS = 900
+# Image ingest: uploads are checked before decoding, then EXIF-rotated,
+# downscaled and re-encoded ('JPEG' or 'WEBP') before the remote call
+CLASSIFIER_IMAGE_MAX_BYTES = 20 * 1024 * 1024
+CLASSIFIER_IMAGE_MIN_EDGE = 32
+CLASSIFIER_IMAGE_MAX_PIXELS = 50_000_000
+CLASSIFIER_IMAGE_MAX_EDGE = 1024
+CLASSIFIER_IMAGE_FORMAT = 'JPEG'
+CLASSIFIER_IMAGE_QUALITY = 85
+# Classifier backend: 'remote' (Gemini only), 'local_first' (offline k-NN for
+# confident cases and during outages) or 'local_only'
+WASTE_CLASSIFIER_BACKEND = 'remote'
+LOCAL_CLASSIFIER_REFERENCE_PATH = BASE_DIR / 'classifier_reference.npz'
+LOCAL_CLASSIFIER_MIN_CONFIDENCE = 80
+# Batch classification endpoint: images per request and concurrent calls
+CLASSIFIER_BATCH_MAX_IMAGES = 20
+CLASSIFIER_BATCH_CONCURRENCY = 4
+# Remote classifier deadline and circuit breaker: after N consecutive
+# failures/timeouts calls fail fast for RESET seconds, then one probe is tried
+CLASSIFIER_REMOTE_TIMEOUT_SECONDS = 20
+CLASSIFIER_BREAKER_FAILURE_THRESHOLD = 5
+CLASSIFIER_BREAKER_RESET_SECONDS = 30
+# Classifier transport: 'gemini' (live), 'record' (live + save fixtures) or
+# 'replay' (serve fixtures offline with artificial latency/error rate)
+WASTE_CLASSIFIER_TRANSPORT = 'gemini'
+CLASSIFIER_FIXTURE_DIR = BASE_DIR / 'classifier_fixtures'
+CLASSIFIER_REPLAY_LATENCY_MS = 1500
+CLASSIFIER_REPLAY_JITTER_MS = 500
+CLASSIFIER_REPLAY_ERROR_RATE = 0.0
+# Directory for per-image lock files so identical classifications are coalesced
+# across worker processes on this host too (None = within each process only)
+CLASSIFIER_SINGLE_FLIGHT_LOCK_DIR = None
+
+# Resized photo derivatives (WasteReport.image, Buyer.shop_photo), rendered
+# in a background process pool after upload
+IMAGE_DERIVATIVE_WIDTHS = [160, 480, 960]
+IMAGE_DERIVATIVE_FORMATS = ['WEBP', 'JPEG']
+IMAGE_DERIVATIVE_QUALITY = 80
+IMAGE_DERIVATIVE_WORKERS = 2
+
+# Resumable (chunked) photo uploads: part files, max chunk size, session lifetime
+UPLOAD_SESSION_DIR = BASE_DIR / 'upload_sessions'
+UPLOAD_CHUNK_MAX_BYTES = 8 * 1024 * 1024
+UPLOAD_SESSION_TTL_HOURS = 24
+
+# Store uploaded photos/licenses once per distinct content, reference counted
+# (run `manage.py dedupe_media` once to convert files uploaded before)
+MEDIA_CONTENT_ADDRESSED = True
+# gc_orphaned_media leaves files younger than this alone (uploads in progress)
+MEDIA_GC_GRACE_HOURS = 24
+# "Near me" search for pending waste (/api/waste-reports/nearby/)
+GEO_DEFAULT_RADIUS_KM = 10
+GEO_MAX_RADIUS_KM = 100
+# Buyer recommendations for a waste report (/api/waste-reports/{id}/recommended_buyers/):
+# distance at which closeness stops counting, window for the completion rate,
+# and how long the in-process candidate index is reused
+RECOMMENDATION_RADIUS_KM = 50
+RECOMMENDATION_COMPLETION_DAYS = 30
+RECOMMENDATION_INDEX_TTL = 300
+# Saved searches (/api/saved-searches/): standing filters per buyer
+SAVED_SEARCH_MAX_PER_BUYER = 20
+# Marketplace facet counts (/api/waste-reports/facets/) are cached this long per filter set
+FACETS_CACHE_SECONDS = 30
+# Buyer stats (/api/buyers/stats/, buyer dashboard) are cached per buyer this long;
+# pickup request/history changes drop the entry
+BUYER_STATS_CACHE_SECONDS = 300